@@ -0,0 +1,78 @@
+"""
+Tool calls per second for the booking and loyalty MCP tools, comparing the
+original connect-per-call pattern with the pooled connections.
+
+Run from the repository root:
+    python benchmarks/bench_connection_pool.py [calls]
+"""
+import os
+import runpy
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CALLS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+sys.path.insert(0, str(REPO_ROOT))
+
+# Build fresh demo databases in a scratch directory with the repo's setup scripts
+workdir = tempfile.mkdtemp(prefix="bench_pool_")
+os.makedirs(os.path.join(workdir, "utils"))
+os.chdir(workdir)
+runpy.run_path(str(REPO_ROOT / "utils" / "booking_db.py"))
+runpy.run_path(str(REPO_ROOT / "utils" / "loyalty_db.py"))
+os.environ["BOOKING_DB_PATH"] = os.path.join(workdir, "utils", "booking.db")
+os.environ["LOYALTY_DB_PATH"] = os.path.join(workdir, "utils", "loyalty.db")
+
+from utils import booking_mcp_server, loyalty_mcp_server  # noqa: E402
+
+
+# --- Baseline: a fresh connection, commit and close per call ---
+def legacy_get_loyalty_points(name):
+    conn = sqlite3.connect(os.environ["LOYALTY_DB_PATH"])
+    cur = conn.cursor()
+    cur.execute("SELECT loyalty_points FROM customers WHERE name = ?", (name,))
+    row = cur.fetchone()
+    conn.close()
+    return row
+
+def legacy_increase_loyalty_points(name, points):
+    conn = sqlite3.connect(os.environ["LOYALTY_DB_PATH"])
+    cur = conn.cursor()
+    cur.execute("UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ?", (points, name))
+    conn.commit()
+    conn.close()
+
+def legacy_add_reservation(name, reservation_time, party_size, outside):
+    conn = sqlite3.connect(os.environ["BOOKING_DB_PATH"])
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
+        (name, reservation_time, party_size, outside)
+    )
+    conn.commit()
+    conn.close()
+
+
+def rate(fn, *args):
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        fn(*args)
+    return CALLS / (time.perf_counter() - start)
+
+
+cases = [
+    ("get_loyalty_points", legacy_get_loyalty_points, loyalty_mcp_server.get_loyalty_points, ("John Doe",)),
+    ("increase_loyalty_points", legacy_increase_loyalty_points, loyalty_mcp_server.increase_loyalty_points, ("John Doe", 1)),
+    ("add_reservation", legacy_add_reservation, booking_mcp_server.add_reservation, ("Zoe", "2025-06-27 19:00", 2, False)),
+]
+
+print(f"{CALLS} calls per tool, databases in {workdir}")
+print(f"{'tool':<26}{'before (calls/s)':>18}{'after (calls/s)':>18}{'speedup':>10}")
+for name, before_fn, after_fn, args in cases:
+    before = rate(before_fn, *args)
+    after = rate(after_fn, *args)
+    print(f"{name:<26}{before:>18.0f}{after:>18.0f}{after / before:>9.1f}x")
@@ -0,0 +1,91 @@
+"""
+Throughput of concurrent loyalty point updates: a connection and commit per
+call (original tools), pooled per-call transactions, and the group-commit
+write queue used by increase_loyalty_points.
+
+Run from the repository root:
+    python benchmarks/bench_group_commit.py [writers] [updates_per_writer]
+
+With the default synchronous=NORMAL, WAL commits do not fsync and the gain
+mostly comes from fewer lock hand-offs; run with SQLITE_SYNCHRONOUS=FULL to
+see the effect when every commit is flushed to disk.
+"""
+import os
+import runpy
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+WRITERS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+UPDATES = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+sys.path.insert(0, str(REPO_ROOT))
+
+workdir = tempfile.mkdtemp(prefix="bench_group_commit_")
+os.makedirs(os.path.join(workdir, "utils"))
+os.chdir(workdir)
+runpy.run_path(str(REPO_ROOT / "utils" / "loyalty_db.py"))
+os.environ["LOYALTY_DB_PATH"] = os.path.join(workdir, "utils", "loyalty.db")
+
+from utils import loyalty_mcp_server  # noqa: E402
+
+with loyalty_mcp_server.db.transaction() as cur:
+    cur.executemany(
+        "INSERT INTO customers (name, address, loyalty_points) VALUES (?, ?, 0)",
+        ((f"Customer {i}", f"Street {i}") for i in range(WRITERS))
+    )
+
+
+# --- Baseline: the original tool body, one connection and commit per call ---
+def legacy_increase(name, points):
+    conn = sqlite3.connect(os.environ["LOYALTY_DB_PATH"])
+    try:
+        cur = conn.cursor()
+        cur.execute("UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ?", (points, name))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pooled_increase(name, points):
+    with loyalty_mcp_server.db.transaction() as cur:
+        cur.execute("UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ?", (points, name))
+
+
+def run(fn):
+    errors = []
+
+    def writer(i):
+        for _ in range(UPDATES):
+            try:
+                fn(f"Customer {i}", 1)
+            except sqlite3.OperationalError as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(WRITERS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return WRITERS * UPDATES / elapsed, len(errors)
+
+
+print(f"{WRITERS} writers x {UPDATES} updates, database in {workdir}")
+print(f"{'mode':<34}{'updates/s':>12}{'errors':>8}")
+for label, fn in [
+    ("connect + commit per call", legacy_increase),
+    ("pooled transaction per call", pooled_increase),
+    ("group commit (increase_loyalty_points)", loyalty_mcp_server.increase_loyalty_points),
+]:
+    rate, errors = run(fn)
+    print(f"{label:<34}{rate:>12.0f}{errors:>8}")
+
+writer = loyalty_mcp_server.points_writer
+print(f"group commit: {writer.operations} updates in {writer.commits} commits "
+      f"({writer.operations / max(writer.commits, 1):.1f} per commit)")
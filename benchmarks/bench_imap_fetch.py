@@ -0,0 +1,60 @@
+"""
+Mailbox sync time against the local IMAP stand-in: one `FETCH n (RFC822)`
+per message (original email_fetcher.py) versus the batched BODYSTRUCTURE +
+text-part fetch in imap_fetch.py.
+
+Run from the repository root:
+    python benchmarks/bench_imap_fetch.py [messages] [round_trip_ms] [mbit_per_s]
+
+The per-message baseline runs on a sample of at most 300 messages and is
+extrapolated to the whole mailbox.
+"""
+import email
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+ROUND_TRIP = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.02
+BANDWIDTH = float(sys.argv[3]) * 1e6 / 8 if len(sys.argv) > 3 else 50e6 / 8
+SAMPLE = min(MESSAGES, 300)
+
+sys.path.insert(0, str(REPO_ROOT / "workflows" / "email-digest"))
+
+from imap_fetch import decode_part, fetch_messages, text_parts  # noqa: E402
+from imap_stub import FakeIMAP, synthetic_mailbox  # noqa: E402
+
+mailbox = synthetic_mailbox(MESSAGES, seed=7)
+print(f"{MESSAGES} messages, {sum(map(len, mailbox)) / 1e6:.0f} MB, "
+      f"{ROUND_TRIP * 1000:.0f} ms round trip, {BANDWIDTH * 8 / 1e6:.0f} Mbit/s")
+
+
+# --- Baseline: the original loop ---
+imap = FakeIMAP(mailbox, latency=ROUND_TRIP, bandwidth=BANDWIDTH)
+start = time.perf_counter()
+_, found = imap.search(None, "ALL")
+for num in found[0].split()[:SAMPLE]:
+    _, data = imap.fetch(num, "(RFC822)")
+    msg = email.message_from_bytes(data[0][1])
+    for part in msg.walk():
+        if part.get_content_type() == "text/plain" and "attachment" not in str(part.get("Content-Disposition")):
+            part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8", errors="ignore")
+per_message = (time.perf_counter() - start) / SAMPLE
+baseline = per_message * MESSAGES
+baseline_bytes = imap.bytes_sent / SAMPLE * MESSAGES
+
+# --- Batched fetch ---
+imap = FakeIMAP(mailbox, latency=ROUND_TRIP, bandwidth=BANDWIDTH)
+imap.index()  # server-side parsing is not part of the client's time
+start = time.perf_counter()
+_, found = imap.uid("SEARCH", "ALL")
+for fetched in fetch_messages(imap, found[0].split()):
+    for part in text_parts(fetched.parts):
+        decode_part(part, fetched.bodies[part.section])
+batched = time.perf_counter() - start
+
+print(f"{'method':<24}{'seconds':>10}{'round trips':>14}{'MB':>10}")
+print(f"{'RFC822 per message':<24}{baseline:>10.1f}{MESSAGES + 1:>14}{baseline_bytes / 1e6:>10.1f}   (extrapolated from {SAMPLE})")
+print(f"{'batched text parts':<24}{batched:>10.1f}{imap.commands:>14}{imap.bytes_sent / 1e6:>10.1f}")
+print(f"speedup: {baseline / batched:.0f}x")
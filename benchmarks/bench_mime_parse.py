@@ -0,0 +1,55 @@
+"""
+Parsing throughput for mailbox backfills: serial `parse_raw` versus the
+process pool in parse_pool.py, on a synthetic mbox corpus, and a backfill
+over the local IMAP stand-in where fetching and parsing overlap.
+
+Run from the repository root:
+    python benchmarks/bench_mime_parse.py [messages] [round_trip_ms]
+"""
+import mailbox
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+ROUND_TRIP = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.05
+
+sys.path.insert(0, str(REPO_ROOT / "workflows" / "email-digest"))
+
+from imap_stub import FakeIMAP, synthetic_mailbox  # noqa: E402
+from parse_pool import fetch_raw, iter_mbox, parse_messages  # noqa: E402
+
+if __name__ == "__main__":
+    corpus = synthetic_mailbox(MESSAGES, seed=11, attachment_kb=50)
+    path = os.path.join(tempfile.mkdtemp(prefix="bench_mime_"), "corpus.mbox")
+    box = mailbox.mbox(path)
+    for raw in corpus:
+        box.add(raw)
+    box.close()
+    cores = os.cpu_count() or 1
+    print(f"{MESSAGES} messages, {os.path.getsize(path) / 1e6:.0f} MB mbox, {cores} CPU core(s)")
+
+    # --- CPU only: parse an mbox file ---
+    print(f"\n{'mbox parse':<24}{'seconds':>10}{'msgs/s':>10}")
+    reference = None
+    for workers in sorted({1, 2, 4, cores}):
+        start = time.perf_counter()
+        records = list(parse_messages(iter_mbox(path), workers=workers))
+        elapsed = time.perf_counter() - start
+        if reference is None:
+            reference = records
+        assert records == reference, "results differ from the serial parse"
+        print(f"{f'{workers} worker(s)':<24}{elapsed:>10.2f}{MESSAGES / elapsed:>10.0f}")
+
+    # --- Backfill: fetch over IMAP and parse ---
+    print(f"\n{f'IMAP backfill ({ROUND_TRIP * 1000:.0f} ms RTT)':<24}{'seconds':>10}{'msgs/s':>10}")
+    for label, workers in (("fetch, then parse", 1), (f"pipelined, {max(cores, 2)} workers", max(cores, 2))):
+        imap = FakeIMAP(corpus, latency=ROUND_TRIP, bandwidth=50e6 / 8)
+        start = time.perf_counter()
+        records = list(parse_messages(fetch_raw(imap, imap.uids), workers=workers))
+        elapsed = time.perf_counter() - start
+        assert [r._replace(uid=0) for r in records] == [r._replace(uid=0) for r in reference]
+        print(f"{label:<24}{elapsed:>10.2f}{MESSAGES / elapsed:>10.0f}")
@@ -0,0 +1,76 @@
+"""
+Latency of the filtered, paginated reservation tools and the availability
+check as the table grows, next to the full-table list_reservations.
+
+Run from the repository root:
+    python benchmarks/bench_reservation_queries.py [max_rows]
+"""
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+MAX_ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+SIZES = [n for n in (10_000, 100_000, 1_000_000, 10_000_000) if n <= MAX_ROWS]
+
+sys.path.insert(0, str(REPO_ROOT))
+
+# Build fresh demo databases in a scratch directory with the repo's setup scripts
+workdir = tempfile.mkdtemp(prefix="bench_reservations_")
+os.makedirs(os.path.join(workdir, "utils"))
+os.chdir(workdir)
+runpy.run_path(str(REPO_ROOT / "utils" / "booking_db.py"))
+os.environ["BOOKING_DB_PATH"] = os.path.join(workdir, "utils", "booking.db")
+
+from utils import booking_mcp_server  # noqa: E402
+from utils.reservation_time import to_epoch  # noqa: E402
+
+NAMES = ["Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi", "Ivan", "Judy"]
+EPOCH = datetime(2025, 1, 1)
+random.seed(0)
+
+
+def seed(count):
+    rows = (
+        (
+            f"{random.choice(NAMES)} {i}",
+            to_epoch(EPOCH + timedelta(minutes=15 * random.randrange(365 * 24 * 4))),
+            random.randint(1, 8),
+            random.random() < 0.3,
+        )
+        for i in range(count)
+    )
+    with booking_mcp_server.db.transaction() as cur:
+        cur.executemany(
+            "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+
+def timed(fn, *args, repeat=50, **kwargs):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        out = fn(*args, **kwargs)
+    return (time.perf_counter() - start) / repeat * 1000, out
+
+
+window_start = EPOCH + timedelta(days=180, hours=18)
+window_end = window_start + timedelta(days=7)
+
+print(f"{'rows':>10}{'window (ms)':>14}{'prefix (ms)':>14}{'page 2 (ms)':>14}{'availability (ms)':>19}{'list all (ms)':>16}")
+total = 4
+for size in SIZES:
+    seed(size - total)
+    total = size
+    window_ms, first_page = timed(booking_mcp_server.find_reservations, start=window_start, end=window_end)
+    prefix_ms, _ = timed(booking_mcp_server.find_reservations, name_prefix="Grace 12")
+    cursor = first_page.rsplit("next cursor: ", 1)[-1]
+    page_ms, _ = timed(booking_mcp_server.find_reservations, start=window_start, end=window_end, cursor=cursor)
+    avail_ms, _ = timed(booking_mcp_server.check_availability, window_start, 6, outside=True)
+    list_ms, _ = timed(booking_mcp_server.list_reservations, repeat=1)
+    print(f"{size:>10}{window_ms:>14.3f}{prefix_ms:>14.3f}{page_ms:>14.3f}{avail_ms:>19.3f}{list_ms:>16.1f}")
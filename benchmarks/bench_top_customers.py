@@ -0,0 +1,68 @@
+"""
+top_customers and customer_rank at scale: full scan vs the loyalty_points
+index, and the loyalty server's tools (uncached) on top of it.
+
+Run from the repository root:
+    python benchmarks/bench_top_customers.py [customers]
+"""
+import os
+import random
+import runpy
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+CUSTOMERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+sys.path.insert(0, str(REPO_ROOT))
+
+workdir = tempfile.mkdtemp(prefix="bench_top_customers_")
+os.makedirs(os.path.join(workdir, "utils"))
+os.chdir(workdir)
+runpy.run_path(str(REPO_ROOT / "utils" / "loyalty_db.py"))
+os.environ["LOYALTY_DB_PATH"] = os.path.join(workdir, "utils", "loyalty.db")
+
+from utils import loyalty_mcp_server  # noqa: E402
+
+random.seed(0)
+with loyalty_mcp_server.db.transaction() as cur:
+    cur.executemany(
+        "INSERT INTO customers (name, address, loyalty_points) VALUES (?, ?, ?)",
+        ((f"Customer {i}", f"Street {i}", int(random.paretovariate(1.5) * 10) - 10) for i in range(CUSTOMERS))
+    )
+conn = loyalty_mcp_server.db.connection()
+
+
+def timed(fn, *args, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def top_full_scan():
+    conn.execute("SELECT name, address, loyalty_points FROM customers NOT INDEXED "
+                 "ORDER BY loyalty_points DESC LIMIT 5").fetchall()
+
+def top_indexed():
+    conn.execute("SELECT name, address, loyalty_points FROM customers "
+                 "ORDER BY loyalty_points DESC LIMIT 5").fetchall()
+
+def uncached(tool, *args):
+    loyalty_mcp_server.cache.invalidate(set(), -1, 0)  # drop all entries
+    tool(*args)
+
+
+median_customer = f"Customer {CUSTOMERS // 2}"
+top_customer = conn.execute("SELECT name FROM customers ORDER BY loyalty_points DESC LIMIT 1").fetchone()[0]
+
+print(f"{CUSTOMERS} customers, databases in {workdir}")
+print(f"top 5, full scan + sort:            {timed(top_full_scan, repeat=5):10.3f} ms")
+print(f"top 5, loyalty_points index:        {timed(top_indexed):10.3f} ms")
+print(f"top 5, top_customers:               {timed(uncached, loyalty_mcp_server.top_customers):10.3f} ms")
+print(f"rank, customer_rank (top):          {timed(uncached, loyalty_mcp_server.customer_rank, top_customer):10.3f} ms")
+print(f"rank, customer_rank (median):       {timed(uncached, loyalty_mcp_server.customer_rank, median_customer, repeat=20):10.3f} ms")
+print(f"rank, customer_rank (cached):       {timed(loyalty_mcp_server.customer_rank, median_customer):10.3f} ms")
+print(f"increase_loyalty_points:            {timed(loyalty_mcp_server.increase_loyalty_points, median_customer, 1):10.3f} ms")
@@ -0,0 +1,95 @@
+"""
+First-tool-call latency per agent: spawning the loyalty server over stdio
+(what the notebook's MultiServerMCPClient config does) vs connecting to an
+already running streamable-HTTP server.
+
+Run from the repository root:
+    python benchmarks/bench_transport_latency.py [agents]
+"""
+import asyncio
+import os
+import runpy
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from mcp.client.streamable_http import streamablehttp_client
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+AGENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+SERVER = str(REPO_ROOT / "utils" / "loyalty_mcp_server.py")
+
+sys.path.insert(0, str(REPO_ROOT))  # the setup script imports utils.db_snapshot
+
+workdir = tempfile.mkdtemp(prefix="bench_transport_")
+os.makedirs(os.path.join(workdir, "utils"))
+os.chdir(workdir)
+runpy.run_path(str(REPO_ROOT / "utils" / "loyalty_db.py"))
+DEVNULL = open(os.devnull, "w")
+env = {**os.environ, "LOYALTY_DB_PATH": os.path.join(workdir, "utils", "loyalty.db")}
+
+
+async def first_call(session: ClientSession):
+    await session.initialize()
+    await session.call_tool("get_loyalty_points", {"name": "John Doe"})
+
+
+async def stdio_agent() -> float:
+    start = time.perf_counter()
+    params = StdioServerParameters(command=sys.executable, args=[SERVER], env=env, cwd=workdir)
+    async with stdio_client(params, errlog=DEVNULL) as (read, write):
+        async with ClientSession(read, write) as session:
+            await first_call(session)
+            return time.perf_counter() - start
+
+
+async def http_agent(url: str) -> float:
+    start = time.perf_counter()
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await first_call(session)
+            return time.perf_counter() - start
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def main():
+    stdio = [await stdio_agent() for _ in range(AGENTS)]
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, SERVER, "--transport", "streamable-http", "--port", str(port)],
+        env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/mcp"
+        for _ in range(100):  # wait until the server accepts connections
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                await asyncio.sleep(0.1)
+        await http_agent(url)  # warm-up
+        http = [await http_agent(url) for _ in range(AGENTS)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{AGENTS} agents, first tool call latency (ms)")
+    print(f"{'transport':<28}{'median':>10}{'mean':>10}{'max':>10}")
+    for label, samples in [("stdio (spawn per client)", stdio), ("streamable-http (warm)", http)]:
+        ms = [s * 1000 for s in samples]
+        print(f"{label:<28}{statistics.median(ms):>10.1f}{statistics.mean(ms):>10.1f}{max(ms):>10.1f}")
+
+
+asyncio.run(main())
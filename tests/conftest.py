@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# utils/ and the email-digest workflow are plain script directories
+for path in (ROOT, ROOT / "utils", ROOT / "workflows" / "email-digest"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
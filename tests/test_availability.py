@@ -0,0 +1,80 @@
+import runpy
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+from availability import AREAS, SLOT_SECONDS, free_tables, is_available, next_free_slot, tables_in_use
+from conftest import ROOT
+from reservation_time import to_epoch
+
+T = to_epoch(datetime(2030, 1, 1, 19, 0))
+SEATS = AREAS[False]["seats_per_table"]
+INSIDE = AREAS[False]["tables"]
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "booking_db.py"))
+    conn = sqlite3.connect("utils/booking.db")
+    yield conn
+    conn.close()
+
+
+def _book(conn, start, tables, outside=False):
+    conn.execute(
+        "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES ('Guest', ?, ?, ?)",
+        (start, tables * SEATS, outside)
+    )
+
+
+def test_overlapping_bookings_at_capacity(conn):
+    # Three bookings overlapping at T + 30 min take every inside table
+    _book(conn, T - 3600, INSIDE // 2)
+    _book(conn, T, INSIDE - INSIDE // 2 - 1)
+    _book(conn, T + 1800, 1)
+    assert tables_in_use(conn, T, False) == INSIDE
+    assert free_tables(conn, T, False) == 0
+    assert not is_available(conn, T, 1, False)
+    # Once the first booking ends there is room again, and the peak counts
+    # the whole new slot, not just its start
+    assert tables_in_use(conn, T + 3600, False) == INSIDE - INSIDE // 2
+    assert tables_in_use(conn, T - 1800, False) == INSIDE
+
+
+def test_back_to_back_bookings_share_the_boundary(conn):
+    _book(conn, T - SLOT_SECONDS, INSIDE)  # full house ending exactly at T
+    _book(conn, T + SLOT_SECONDS, INSIDE)  # and another starting as T's slot ends
+    assert tables_in_use(conn, T, False) == 0
+    assert is_available(conn, T, INSIDE * SEATS, False)
+    # A minute off either way, one of them overlaps the slot
+    assert not is_available(conn, T - 60, 1, False)
+    assert not is_available(conn, T + 60, 1, False)
+
+
+def test_release_and_acquisition_at_the_same_instant(conn):
+    # Inside T's slot, one full house leaves at T + 30 min as the next one arrives
+    _book(conn, T + 1800 - SLOT_SECONDS, INSIDE)
+    _book(conn, T + 1800, INSIDE)
+    assert tables_in_use(conn, T, False) == INSIDE  # not 2 * INSIDE
+    _book(conn, T + 1800 - SLOT_SECONDS, 1)
+    assert tables_in_use(conn, T, False) == INSIDE + 1
+
+
+def test_inside_and_outside_are_separate(conn):
+    _book(conn, T, AREAS[True]["tables"], outside=True)
+    assert not is_available(conn, T, 1, True)
+    assert is_available(conn, T, INSIDE * SEATS, False)
+    assert free_tables(conn, T, True) == 0 and free_tables(conn, T, False) == INSIDE
+    assert next_free_slot(conn, T, 1, True) == T + SLOT_SECONDS
+    assert next_free_slot(conn, T, 1, False) == T
+    assert next_free_slot(conn, T, (AREAS[True]["tables"] + 1) * SEATS, True) is None
+
+
+def test_pending_bookings_count(conn):
+    pending = [(T - 1800, (INSIDE - 1) * SEATS), (T + SLOT_SECONDS, INSIDE * SEATS)]
+    assert tables_in_use(conn, T, False, pending) == INSIDE - 1
+    assert is_available(conn, T, SEATS, False, pending)
+    assert not is_available(conn, T, SEATS + 1, False, pending)
@@ -0,0 +1,46 @@
+import runpy
+import sqlite3
+
+from conftest import ROOT
+from reservation_time import to_epoch
+
+
+def test_v1_migration_keeps_unparseable_times(tmp_path, monkeypatch, capsys):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    # Database as created before the epoch migration, with a row from the injection demo
+    conn = sqlite3.connect("utils/booking.db")
+    conn.execute("""
+    CREATE TABLE reservations (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        reservation_time DATETIME NOT NULL,
+        party_size INTEGER NOT NULL,
+        outside BOOLEAN DEFAULT FALSE
+    )""")
+    conn.executemany(
+        "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
+        [("Alice", "2025-06-27 18:30", 2, False), ("Eve", "0x4556452d534e45414b59", 1, False)]
+    )
+    conn.commit()
+    conn.close()
+
+    runpy.run_path(str(ROOT / "utils" / "booking_db.py"))
+
+    conn = sqlite3.connect("utils/booking.db")
+    assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+    rows = dict(conn.execute("SELECT name, reservation_time FROM reservations"))
+    assert rows == {"Alice": to_epoch("2025-06-27 18:30"), "Eve": "0x4556452d534e45414b59"}
+    assert "Reservation 2: kept unparseable reservation_time" in capsys.readouterr().out
+
+
+def test_fresh_database_is_at_the_latest_version(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "booking_db.py"))
+    conn = sqlite3.connect("utils/booking.db")
+    assert conn.execute("PRAGMA user_version").fetchone() == (2,)
+    assert conn.execute("SELECT version FROM reservations_version").fetchone() == (0,)
+    # Running the setup again changes nothing
+    runpy.run_path(str(ROOT / "utils" / "booking_db.py"))
+    assert conn.execute("SELECT count(*) FROM reservations").fetchone() == (4,)
@@ -0,0 +1,156 @@
+import importlib
+import runpy
+import sqlite3
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def booking(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "booking_db.py"))
+    runpy.run_path(str(ROOT / "utils" / "loyalty_db.py"))
+    monkeypatch.setenv("BOOKING_DB_PATH", str(tmp_path / "utils" / "booking.db"))
+    monkeypatch.setenv("LOYALTY_DB_PATH", str(tmp_path / "utils" / "loyalty.db"))
+    sys.modules.pop("booking_mcp_server", None)
+    return importlib.import_module("booking_mcp_server")
+
+
+def _count(path="utils/booking.db"):
+    return sqlite3.connect(path).execute("SELECT count(*) FROM reservations").fetchone()[0]
+
+
+def test_party_size_below_one_is_rejected(booking):
+    before = _count()
+    for party_size in (0, -3):
+        assert booking.add_reservation("Zoe", "2025-06-27 12:00", party_size) == \
+            f"Cannot book {party_size} people: invalid party size."
+    assert "invalid party size" in booking.add_reservations_batch(
+        [booking.Reservation(name="Zoe", reservation_time="2025-06-27 12:00", party_size=0)]
+    )
+    assert "invalid party size" in booking.check_availability("2025-06-27 12:00", 0)
+    assert "invalid party size" in booking.find_next_free_slot(0, "2025-06-27 12:00")
+    assert _count() == before
+    assert booking.add_reservation("Zoe", "2025-06-27 12:00", 2).startswith("Reservation for Zoe")
+    assert _count() == before + 1
+
+
+def _pages(booking, **filters):
+    lines, cursor = [], None
+    while True:
+        out = booking.find_reservations(limit=1, cursor=cursor, **filters).splitlines()
+        assert out[0] == "Reservations:"
+        if not out[-1].startswith("More results available"):
+            return lines + out[1:]
+        lines += out[1:-1]
+        cursor = out[-1].rsplit("next cursor: ", 1)[-1]
+
+
+def test_find_reservations_pages_through_text_times(booking):
+    con = sqlite3.connect("utils/booking.db")
+    with con:
+        con.execute("INSERT INTO reservations (name, reservation_time, party_size, outside) "
+                    "VALUES ('Zed', '0x68A4B2C0', 2, 0)")
+    pages = _pages(booking)
+    assert pages == booking.find_reservations(limit=200).splitlines()[1:]
+    assert pages[-1] == "Zed at 0x68A4B2C0 for 2 people inside"
+
+
+def test_find_reservations_pages_by_name_prefix(booking):
+    for i, time in enumerate(["2025-06-28 12:00", "2025-06-27 12:00", "2025-06-29 12:00"]):
+        booking.add_reservation(f"Pat {2 - i % 2}", time, 2)
+    pages = _pages(booking, name_prefix="Pat ")
+    assert pages == [
+        "Pat 1 at 2025-06-27 12:00 for 2 people inside",
+        "Pat 2 at 2025-06-28 12:00 for 2 people inside",
+        "Pat 2 at 2025-06-29 12:00 for 2 people inside",
+    ]
+    assert _pages(booking, name_prefix="Pat ", outside=False) == pages
+
+
+def test_find_reservations_rejects_foreign_cursor(booking):
+    for cursor in ("17", "[1, 2, 3]", '["Aaron", 0, 1]'):
+        out = booking.find_reservations(name_prefix="Pat", cursor=cursor)
+        assert out.startswith("Invalid cursor")
+    for cursor in ("[null, 1]", "[1, 1]", "not json"):
+        out = booking.find_reservations(start="2025-06-27 00:00", cursor=cursor)
+        assert out.startswith("Invalid cursor")
+
+
+def test_loyalty_database_is_attached_read_only(booking):
+    booking.add_reservation("John Doe", "2025-07-01 19:00", 2)
+    out = booking.find_reservations_with_loyalty(start="2025-06-27 00:00", end="2025-07-02 00:00")
+    assert "Alice at 2025-06-27 18:30 for 2 people inside, not a loyalty customer" in out
+    assert "John Doe at 2025-07-01 19:00 for 2 people inside, Loyalty Points: 150, Address: Doe Street 2, Example City" in out
+
+    conn = booking.joined.connection()
+    with pytest.raises(sqlite3.OperationalError, match="readonly"):
+        conn.execute("UPDATE loyalty.customers SET loyalty_points = 0")
+    conn.rollback()
+    assert sqlite3.connect("utils/loyalty.db").execute("SELECT min(loyalty_points) FROM customers").fetchone() == (100,)
+
+
+def test_book_top_customers(booking):
+    for count in (0, -2):
+        assert booking.book_top_customers("2025-07-01 19:00", count) == \
+            f"Cannot book the top {count} customers: count must be at least 1."
+    before = _count()
+    assert booking.book_top_customers("2025-07-01 19:00", 5).splitlines() == [
+        "Booked 2 of the top 2 customers at 2025-07-01 19:00:",
+        "John Doe (150 points): booked",
+        "Max Mustermann (100 points): booked",
+    ]
+    assert _count() == before + 2
+
+
+def test_list_reservations_is_complete_unless_paged(booking):
+    everything = booking.list_reservations().splitlines()
+    assert everything[0] == "All Reservations:" and len(everything) == 5
+
+    pages, cursor = [], None
+    while True:
+        out = booking.list_reservations(max_rows=3, cursor=cursor).splitlines()
+        if not out[-1].startswith("More results available"):
+            pages += out[1:]
+            break
+        pages += out[1:-1]
+        cursor = out[-1].rsplit("next cursor: ", 1)[-1]
+    assert pages == everything[1:]
+
+
+def test_batch_reports_partial_failures_by_index(booking):
+    R = booking.Reservation
+    full = booking.AREAS[False]["tables"] * booking.AREAS[False]["seats_per_table"]
+    out = booking.add_reservations_batch([
+        R(name="Late", reservation_time="2030-01-01 20:00", party_size=full),  # overlaps Early
+        R(name="Zero", reservation_time="2030-01-01 19:00", party_size=0),
+        R(name="Early", reservation_time="2030-01-01 19:00", party_size=4),
+        R(name="Tie", reservation_time="2030-01-01 19:00", party_size=full - 4),
+        R(name="Garden", reservation_time="2030-01-01 20:00", party_size=4, outside=True),
+    ])
+    # Checked in start order, ties in list order: Early and Tie fill the room before Late
+    assert out.splitlines() == [
+        "Added reservations: 3 of 5.",
+        "Rejected: #0: no free inside table at 2030-01-01 20:00; #1: invalid party size",
+    ]
+    rows = sqlite3.connect("utils/booking.db").execute(
+        "SELECT name FROM reservations WHERE reservation_time >= ? ORDER BY id", (booking.to_epoch("2030-01-01 00:00"),)
+    ).fetchall()
+    assert [name for (name,) in rows] == ["Early", "Tie", "Garden"]  # inserted in list order
+
+
+def test_batch_checks_against_earlier_starts_in_any_list_order(booking):
+    R = booking.Reservation
+    # Each party needs more than half of the outside tables, so no two may overlap
+    party = booking.AREAS[True]["seats_per_table"] * (booking.AREAS[True]["tables"] // 2 + 1)
+    times = [f"2030-01-01 {h}:00" for h in (21, 18, 20, 19, 22)]
+    out = booking.add_reservations_batch([R(name=f"G{i}", reservation_time=t, party_size=party, outside=True)
+                                          for i, t in enumerate(times)])
+    assert out.splitlines() == [
+        "Added reservations: 3 of 5.",
+        "Rejected: #0: no free outside table at 2030-01-01 21:00; #3: no free outside table at 2030-01-01 19:00",
+    ]
@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import aclosing
+
+from digest_batch import run_batch
+
+
+class SlowWorkflow:
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = 0
+        self.cancelled = 0
+
+    async def ainvoke(self, state, config=None):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.seconds[state["n"]])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"n": state["n"]}
+
+
+def test_results_and_timeouts():
+    workflow = SlowWorkflow({0: 0.01, 1: 5, 2: 0.02})
+
+    async def main():
+        return [r async for r in run_batch(workflow, range(3), key=str, to_input=lambda n: {"n": n}, timeout=0.2)]
+
+    results = {r.key: r for r in asyncio.run(main())}
+    assert results["0"].output == {"n": 0} and results["2"].ok
+    assert isinstance(results["1"].error, TimeoutError)
+
+
+def test_stopping_early_cancels_outstanding_runs():
+    workflow = SlowWorkflow({0: 0.01, 1: 5, 2: 5, 3: 5})
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        default_executor = loop._default_executor
+        async with aclosing(run_batch(workflow, range(4), key=str, to_input=lambda n: {"n": n},
+                                      max_concurrency=4)) as results:
+            async for result in results:
+                break
+        assert loop._default_executor is default_executor  # the loop's executor is left alone
+        return result, {t for t in asyncio.all_tasks() if t is not asyncio.current_task()}
+
+    result, leftover = asyncio.run(main())
+    assert result.key == "0"
+    assert workflow.cancelled == 3
+    assert not leftover
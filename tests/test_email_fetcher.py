@@ -0,0 +1,56 @@
+import hashlib
+import random
+from email.message import EmailMessage
+
+import pytest
+
+from email_fetcher import _StreamDecoder, save_attachment
+from imap_fetch import decode_transfer, fetch_messages, parse_fetch_response
+from imap_stub import FakeIMAP
+
+NOTES = "Café menu = soup, bread & wine.\n" + "A line long enough to need a soft line break " * 4 + "\n" * 2 + "ende=\n"
+
+
+def _mailbox():
+    msg = EmailMessage()
+    msg["From"] = "alice@example.com"
+    msg["Subject"] = "Files"
+    msg.set_content("See attached.\n")
+    msg.add_attachment(random.Random(0).randbytes(300), maintype="application", subtype="octet-stream",
+                       filename="data.bin")
+    msg.add_attachment(NOTES, cte="quoted-printable", filename="notes.txt")
+    mail = FakeIMAP([msg.as_bytes()], latency=0)
+    parts = next(fetch_messages(mail, [b"1"])).parts
+    return mail, {p.encoding: p for p in parts if p.is_attachment}
+
+
+def _raw(mail, part) -> bytes:
+    _, data = mail.uid("FETCH", "1", f"(BODY.PEEK[{part.section}])")
+    return parse_fetch_response(data)[0][f"BODY[{part.section}]"]
+
+
+@pytest.mark.parametrize("encoding", ["base64", "quoted-printable"])
+def test_stream_decoder_matches_whole_payload_at_every_split(encoding):
+    mail, parts = _mailbox()
+    raw = _raw(mail, parts[encoding])
+    expected = decode_transfer(raw, encoding)
+    assert expected == (NOTES.encode() if encoding == "quoted-printable" else random.Random(0).randbytes(300))
+    for size in range(1, len(raw) + 2):
+        decoder = _StreamDecoder(encoding)
+        chunks = [raw[i:i + size] for i in range(0, len(raw), size)] or [b""]
+        decoded = b"".join(decoder.feed(c, final=i == len(chunks) - 1) for i, c in enumerate(chunks))
+        assert decoded == expected, size
+
+
+@pytest.mark.parametrize("encoding", ["base64", "quoted-printable"])
+def test_save_attachment_at_every_chunk_size(encoding, tmp_path):
+    mail, parts = _mailbox()
+    part = parts[encoding]
+    expected = decode_transfer(_raw(mail, part), encoding)
+    for chunk_size in range(1, part.size + 2):
+        attachment = save_attachment(mail, 1, part, str(tmp_path), chunk_size)
+        assert attachment.sha256 == hashlib.sha256(expected).hexdigest(), chunk_size
+    # Stored once, under the content hash
+    assert [p.name for p in tmp_path.iterdir()] == [attachment.sha256 + (".bin" if encoding == "base64" else ".txt")]
+    with open(attachment.path, "rb") as f:
+        assert f.read() == expected
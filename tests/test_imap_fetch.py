@@ -0,0 +1,72 @@
+from imap_fetch import decode_part, parse_bodystructure, parse_fetch_response, text_parts
+
+# Shaped like imaplib's IMAP4.uid("FETCH", ...) data: a (prefix, literal) tuple
+# per literal, the rest of the line as bytes, one entry per message
+
+HEADER = b"From: alice@example.com\r\nSubject: Hello\r\n\r\n"
+
+MIXED = (
+    b'((("TEXT" "PLAIN" ("CHARSET" "utf-8") NIL NIL "QUOTED-PRINTABLE" 12 1 NIL NIL NIL NIL)'
+    b'("TEXT" "HTML" ("CHARSET" "utf-8") NIL NIL "7BIT" 30 1 NIL NIL NIL NIL) "ALTERNATIVE" ("BOUNDARY" "b2") NIL NIL NIL)'
+    b'("MESSAGE" "RFC822" NIL NIL NIL "7BIT" 400 ("Tue, 1 Jul 2025 08:00:00 +0200" "Original" NIL NIL NIL NIL NIL NIL NIL NIL)'
+    b' ("TEXT" "PLAIN" ("CHARSET" "us-ascii") NIL NIL "7BIT" 20 1 NIL NIL NIL NIL) 12 NIL ("ATTACHMENT" ("FILENAME" "fwd.eml")) NIL NIL)'
+    b'("APPLICATION" "PDF" ("NAME" "=?utf-8?q?r=C3=A9sum=C3=A9.pdf?=") NIL NIL "BASE64" 27668 NIL ("ATTACHMENT" ("FILENAME" "report.pdf")) NIL NIL)'
+    b' "MIXED" ("BOUNDARY" "b1") NIL NIL NIL)'
+)
+
+
+def test_header_fields_literal_and_bodystructure():
+    data = [
+        (b'1 (UID 7 RFC822.SIZE 1234 BODY[HEADER.FIELDS (FROM SUBJECT)] {%d}' % len(HEADER), HEADER),
+        b' BODYSTRUCTURE ' + MIXED + b')',
+        (b'2 (UID 9 RFC822.SIZE 99 BODY[HEADER.FIELDS (FROM SUBJECT)] {%d}' % len(HEADER), HEADER),
+        b' BODYSTRUCTURE ("TEXT" "PLAIN" NIL NIL NIL "7BIT" 5 1 NIL NIL NIL NIL))',
+    ]
+    first, second = parse_fetch_response(data)
+    assert first["UID"] == "7" and first["RFC822.SIZE"] == "1234"
+    assert first["BODY[HEADER.FIELDS (FROM SUBJECT)]"] == HEADER
+    assert second["UID"] == "9"
+    assert [(p.section, p.content_type) for p in parse_bodystructure(second["BODYSTRUCTURE"])] == [("1", "text/plain")]
+
+
+def test_nested_multipart_and_message_rfc822():
+    (message,) = parse_fetch_response([b'1 (UID 7 BODYSTRUCTURE ' + MIXED + b')'])
+    parts = parse_bodystructure(message["BODYSTRUCTURE"])
+    assert [(p.section, p.content_type, p.size) for p in parts] == [
+        ("1.1", "text/plain", 12),
+        ("1.2", "text/html", 30),
+        ("2", "message/rfc822", 400),  # a leaf: the forwarded message's parts are not listed
+        ("3", "application/pdf", 27668),
+    ]
+    assert parts[0].params == {"charset": "utf-8"} and parts[0].encoding == "quoted-printable"
+    assert (parts[2].disposition, parts[2].filename) == ("attachment", "fwd.eml")
+    assert (parts[3].disposition, parts[3].filename) == ("attachment", "report.pdf")
+    assert [p.section for p in text_parts(parts)] == ["1.1"]
+
+
+def test_body_section_literals_split_across_items():
+    body = b"Hi=\r\n there\r\n"
+    data = [
+        (b'1 (UID 7 BODY[1.1] {%d}' % len(body), body),
+        (b' BODY[1.2] {4}', b"<p/>"),
+        b')',
+    ]
+    (message,) = parse_fetch_response(data)
+    assert message["BODY[1.1]"] == body and message["BODY[1.2]"] == b"<p/>"
+
+
+def test_literal_strings_inside_bodystructure_are_decoded():
+    data = [
+        (b'1 (UID 7 BODYSTRUCTURE ({4}', b"TEXT"),
+        (b' "PLAIN" ("charset" {5}', b"utf-8"),
+        (b') NIL NIL {16}', b"quoted-printable"),
+        (b' 9 1 NIL ("inline" ("filename" {8}', b"note.txt"),
+        b')) NIL NIL))',
+    ]
+    (message,) = parse_fetch_response(data)
+    (part,) = parse_bodystructure(message["BODYSTRUCTURE"])
+    assert part.content_type == "text/plain"
+    assert part.params == {"charset": "utf-8"}
+    assert part.encoding == "quoted-printable"
+    assert (part.disposition, part.filename) == ("inline", "note.txt")
+    assert decode_part(part, b"caf=C3=A9") == "café"
@@ -0,0 +1,73 @@
+import time
+
+from langchain_core.outputs import ChatGeneration
+
+from fake_llm import FakeChatModel
+from llm_cache import LLMCache, count_hits
+
+MODEL = FakeChatModel(latency=0)
+
+
+def _ask(cache, prompt, llm_string="fake"):
+    """Answer from the cache, else from the fake model, and store the answer."""
+    hit = cache.lookup(prompt, llm_string)
+    if hit:
+        return hit[0].message
+    response = MODEL.invoke(prompt)
+    cache.update(prompt, llm_string, [ChatGeneration(message=response)])
+    return response
+
+
+def test_hits_and_misses(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"))
+    with count_hits() as hits:
+        first = _ask(cache, "Summarise the inbox")
+        assert _ask(cache, "Summarise   the\ninbox").content == first.content  # whitespace is normalised
+        _ask(cache, "Summarise the inbox", llm_string="other model")
+        with cache.bypass():
+            _ask(cache, "Summarise the inbox")
+    assert hits == [1]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)  # bypassed lookups are not counted
+    assert stats["hit_rate"] == 0.333 and stats["bytes"] > 0
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"), enabled=False)
+    _ask(cache, "hello")
+    _ask(cache, "hello")
+    assert cache.stats()["entries"] == 0 and cache.hits == cache.misses == 0
+
+
+def test_evicts_least_recently_used_by_size(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"))
+    _ask(cache, "prompt 0")
+    entry = cache.stats()["bytes"]
+    cache.max_bytes = 3 * entry + entry // 2  # room for three entries
+    for i in range(1, 3):
+        time.sleep(0.01)
+        _ask(cache, f"prompt {i}")
+    time.sleep(0.01)
+    _ask(cache, "prompt 0")  # used again, so prompt 1 is now the oldest
+    time.sleep(0.01)
+    _ask(cache, "prompt 3")
+
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] <= cache.max_bytes and stats["evictions"] == 1
+    assert cache.lookup("prompt 1", "fake") is None
+    assert cache.lookup("prompt 0", "fake") is not None
+
+
+def test_evicts_by_count_and_age(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"), max_entries=2)
+    for i in range(4):
+        time.sleep(0.01)
+        _ask(cache, f"prompt {i}")
+    assert cache.stats()["entries"] == 2 and cache.evictions == 2
+
+    cache.max_age = 0
+    assert cache.lookup("prompt 3", "fake") is None
+    assert cache.evictions == 3
@@ -0,0 +1,73 @@
+import importlib
+import runpy
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def loyalty(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "loyalty_db.py"))
+    monkeypatch.setenv("LOYALTY_DB_PATH", str(tmp_path / "utils" / "loyalty.db"))
+    sys.modules.pop("loyalty_mcp_server", None)
+    module = importlib.import_module("loyalty_mcp_server")
+    yield module
+    module.points_writer.close()
+    module.db.close()
+
+
+def test_rank_ties_and_updates(loyalty):
+    loyalty.add_customer("Ada", "Ada Lane 1", 150)
+    loyalty.add_customer("Bea", "Bea Road 2", 20)
+    # John Doe and Ada tie at 150 points, ahead of Max (100) and Bea (20)
+    assert loyalty.customer_rank("Ada") == "Customer Ada is ranked #1 of 4 customers."
+    assert loyalty.customer_rank("John Doe") == "Customer John Doe is ranked #1 of 4 customers."
+    assert loyalty.customer_rank("Max Mustermann") == "Customer Max Mustermann is ranked #3 of 4 customers."
+    assert loyalty.customer_rank("Nobody") == "No customer found with name Nobody."
+
+    loyalty.increase_loyalty_points("Bea", 200)
+    assert loyalty.customer_rank("Bea") == "Customer Bea is ranked #1 of 4 customers."
+    assert loyalty.customer_rank("Ada") == "Customer Ada is ranked #2 of 4 customers."
+    loyalty.delete_customer("Bea")
+    assert loyalty.customer_rank("Ada") == "Customer Ada is ranked #1 of 3 customers."
+
+
+def test_top_customers_orders_ties_by_name_and_pages(loyalty):
+    loyalty.add_customer("Ada", "Ada Lane 1", 150)
+    first = loyalty.top_customers(limit=2, output_format="tsv", fields=["rank", "name", "loyalty_points"])
+    assert first.splitlines()[:3] == ["rank\tname\tloyalty_points", "1\tAda\t150", "2\tJohn Doe\t150"]
+    cursor = first.rsplit("next cursor: ", 1)[-1].strip()
+    assert loyalty.top_customers(limit=2, cursor=cursor).splitlines()[1:] == [
+        "Max Mustermann, Address: Musterstrasse 1, Musterstadt, Loyalty Points: 100"
+    ]
+
+    loyalty.set_loyalty_points("Max Mustermann", 500)
+    assert loyalty.top_customers(limit=1).splitlines()[1].startswith("Max Mustermann")
+
+
+def _names(result):
+    return [line.split(",")[0] for line in result.splitlines()[1:]]
+
+
+def test_search_ranks_exact_and_prefix_matches_first(loyalty):
+    loyalty.add_customer("Anna Mustermann-Weber", "Hauptstrasse 5, Bern", 10)
+    loyalty.add_customer("Mustermann", "Seeweg 3, Zug", 5)
+    loyalty.add_customer("Mustermann & Co", "Industrie 9, Basel", 5)
+    names = _names(loyalty.search_customers("mustermann"))
+    assert names[:2] == ["Mustermann", "Mustermann & Co"]  # exact name, then name prefix
+    assert sorted(names[2:]) == ["Anna Mustermann-Weber", "Max Mustermann"]
+    assert _names(loyalty.search_customers("Max Mustermann")) == ["Max Mustermann"]
+    # Any word, when no customer has all of them
+    assert sorted(_names(loyalty.search_customers("Max Weber"))) == ["Anna Mustermann-Weber", "Max Mustermann"]
+    assert loyalty.search_customers("Mr") == "Search query needs at least one word of 3 or more letters."
+
+
+def test_search_typo_fallback_drops_weak_trigram_matches(loyalty):
+    # "Mustremann" shares only "str"/"tre" with John Doe's "Doe Street 2"
+    assert _names(loyalty.search_customers("Mustremann")) == ["Max Mustermann"]
+    assert _names(loyalty.search_customers("Jhon Doee")) == ["John Doe"]
+    assert loyalty.search_customers("xyzzy") == "No customers matching xyzzy."
@@ -0,0 +1,69 @@
+import asyncio
+
+from digest_batch import run_batch
+from email_fetcher import iter_messages
+from imap_stub import FakeIMAP, synthetic_mailbox
+from mail_sync import SyncState
+from threads import group_threads
+
+
+class FailingWorkflow:
+    """Stands in for the digest graph; fails for topics containing `fail_on`."""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+
+    async def ainvoke(self, state, config=None):
+        if self.fail_on is not None and self.fail_on in state["topic"]:
+            raise RuntimeError("digest failed")
+        return {"decision": "True"}
+
+
+async def _digest(workflow, threads, state):
+    """What orchastration_example_mail.digest_mailbox does with the results."""
+    failed_uids = []
+    async for result in run_batch(workflow, threads, key=lambda t: t.key, to_input=lambda t: {"topic": t.subject},
+                                  timeout=5):
+        if result.ok:
+            for message_id in result.item.message_ids:
+                state.mark_processed(message_id, result.output["decision"])
+        else:
+            failed_uids.extend(m.uid for m in result.item.messages)
+    state.advance("me", "INBOX", [m.uid for t in threads for m in t.messages], failed_uids)
+
+
+def _sync(mail, state):
+    return list(iter_messages(mail, "INBOX", state=state, account="me", advance=False))
+
+
+def test_failed_thread_is_fetched_again(tmp_path):
+    mail = FakeIMAP(synthetic_mailbox(6, reply_share=0, attachment_share=0), latency=0)
+    state = SyncState(str(tmp_path / "state.db"))
+
+    records = _sync(mail, state)
+    assert [r.uid for r in records] == [1, 2, 3, 4, 5, 6]
+    failing = records[2]
+    asyncio.run(_digest(FailingWorkflow(fail_on=failing.subject), group_threads(records), state))
+    assert state.checkpoint("me", "INBOX")[1] == 2
+
+    # Next run: only the failed message comes back, the others are skipped as processed
+    records = _sync(mail, state)
+    assert [r.message_id for r in records] == [failing.message_id]
+    asyncio.run(_digest(FailingWorkflow(), group_threads(records), state))
+    assert state.checkpoint("me", "INBOX")[1] == 3
+
+    # Once it went through, the checkpoint catches up with the mail that arrives later
+    mail.append(synthetic_mailbox(7, reply_share=0, attachment_share=0)[-1])
+    records = _sync(mail, state)
+    assert [r.uid for r in records] == [7]
+    asyncio.run(_digest(FailingWorkflow(), group_threads(records), state))
+    assert state.checkpoint("me", "INBOX")[1] == 7
+    assert _sync(mail, state) == []
+
+
+def test_interrupted_run_keeps_checkpoint(tmp_path):
+    mail = FakeIMAP(synthetic_mailbox(4, reply_share=0, attachment_share=0), latency=0)
+    state = SyncState(str(tmp_path / "state.db"))
+    assert len(_sync(mail, state)) == 4
+    # Nothing was digested (e.g. the process was killed): everything is fetched again
+    assert len(_sync(mail, state)) == 4
@@ -0,0 +1,56 @@
+import random
+from email.message import EmailMessage
+
+from email_fetcher import iter_messages
+from imap_stub import FakeIMAP, synthetic_mailbox
+from parse_pool import parse_messages, parse_raw
+
+
+def _nested_message() -> bytes:
+    """multipart/mixed: alternative text, a forwarded message with its own attachment, a PDF."""
+    forwarded = EmailMessage()
+    forwarded["From"] = "carol@example.org"
+    forwarded["Subject"] = "Original"
+    forwarded.set_content("Forwarded body")
+    forwarded.add_attachment(b"inner" * 100, maintype="application", subtype="octet-stream", filename="inner.bin")
+
+    msg = EmailMessage()
+    msg["From"] = "alice@example.com"
+    msg["To"] = "me@example.com, bob@example.com"
+    msg["Subject"] = "Fwd: Original"
+    msg["Date"] = "Tue, 01 Jul 2025 08:00:00 +0200"
+    msg["Message-ID"] = "<nested@example.com>"
+    msg.set_content("See below.\n")
+    msg.add_alternative("<p>See below.</p>", subtype="html")
+    msg.add_attachment(forwarded, filename="original.eml")
+    msg.add_attachment(random.Random(0).randbytes(20480), maintype="application", subtype="pdf", filename="report.pdf")
+    return msg.as_bytes()
+
+
+def _fetched(raw_messages):
+    mail = FakeIMAP(raw_messages, latency=0)
+    return list(iter_messages(mail, "INBOX"))
+
+
+def _without_hashes(record):
+    return record._replace(attachments=[a._replace(sha256=None) for a in record.attachments])
+
+
+def test_parse_raw_matches_bodystructure_fetch():
+    raw = _nested_message()
+    (fetched,) = _fetched([raw])
+    parsed = parse_raw(raw, fetched.uid)
+
+    assert [(a.section, a.filename, a.content_type) for a in parsed.attachments] == [
+        ("2", "original.eml", "message/rfc822"),
+        ("3", "report.pdf", "application/pdf"),
+    ]
+    assert parsed.attachments[1].size > 20480  # encoded (base64) size, as the server reports it
+    assert _without_hashes(parsed) == fetched
+
+
+def test_parse_messages_matches_fetch_on_synthetic_mailbox():
+    raw_messages = synthetic_mailbox(20, seed=3, attachment_share=0.5, attachment_kb=4)
+    fetched = _fetched(raw_messages)
+    parsed = list(parse_messages(enumerate(raw_messages, start=1), workers=1))
+    assert [_without_hashes(r) for r in parsed] == fetched
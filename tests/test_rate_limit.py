@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+import pytest
+from langchain_core.outputs import ChatGeneration
+
+from fake_llm import FakeChatModel, RateLimitError
+from llm_cache import LLMCache
+from rate_limit import RateLimiter, TokenBucket
+
+
+class FlakyModel(FakeChatModel):
+    """Fails the first `failures` calls with `error`, then answers like the fake model."""
+
+    def __init__(self, error, failures=1, **kwargs):
+        super().__init__(**kwargs)
+        self.error = error
+        self.failures = failures
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        return await super().ainvoke(messages, config, **kwargs)
+
+
+class CachedModel:
+    """The fake model behind an LLMCache, as the chat model's cache= does it."""
+
+    def __init__(self, model, cache):
+        self.model, self.cache = model, cache
+
+    async def ainvoke(self, messages, **kwargs):
+        hit = self.cache.lookup(messages, "fake")
+        if hit:
+            return hit[0].message
+        response = await self.model.ainvoke(messages)
+        self.cache.update(messages, "fake", [ChatGeneration(message=response)])
+        return response
+
+
+def test_bucket_bursts_then_refills():
+    bucket = TokenBucket(600, capacity=3)  # 10 per second
+
+    async def main():
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert 0.15 <= elapsed < 0.4  # three at once, then one per 0.1s
+
+
+def test_429_waits_for_retry_after_once():
+    model = FakeChatModel(rpm=1, latency=0)
+    limiter = RateLimiter(rpm=60, tpm=1_000_000, base_delay=0.01)
+
+    async def main():
+        await limiter.ainvoke(model, "first")
+        model.provider.sent[0] -= 59.8  # the provider's minute ends in 0.2s
+        start = time.monotonic()
+        await limiter.ainvoke(model, "second")
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(main())
+    assert model.provider.rate_limited == 1 and limiter.retries == 1
+    assert 0.2 <= elapsed < 0.35  # retry-after plus jitter, not waited twice
+
+
+def test_transient_errors_back_off_and_give_up():
+    limiter = RateLimiter(rpm=6000, tpm=1_000_000, max_retries=2, base_delay=0.05)
+    model = FlakyModel(TimeoutError(), failures=2, latency=0)
+    assert asyncio.run(limiter.ainvoke(model, "hello")).content.startswith("Fake section")
+    assert limiter.retries == 2
+
+    model = FlakyModel(TimeoutError(), failures=3, latency=0)
+    with pytest.raises(TimeoutError):
+        asyncio.run(limiter.ainvoke(model, "hello"))
+    for attempt in range(1, 8):
+        assert 0 <= limiter.backoff(attempt) <= min(limiter.max_delay, 0.05 * 2 ** (attempt - 1))
+    assert 3 <= limiter.backoff(1, RateLimitError(3)) <= 3.05
+
+
+def test_failed_calls_return_their_token_estimate():
+    limiter = RateLimiter(rpm=6000, tpm=1000, output_tokens=100)
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.ainvoke(FlakyModel(ValueError("bad request")), "x" * 400))
+    assert limiter.tokens.tokens == pytest.approx(1000, abs=1)
+
+
+def test_cache_hits_are_refunded(tmp_path):
+    cache = LLMCache(str(tmp_path / "cache.db"))
+    model = CachedModel(FakeChatModel(latency=0), cache)
+    limiter = RateLimiter(rpm=6, tpm=600, output_tokens=100)
+
+    async def main():
+        first = await limiter.ainvoke(model, "same prompt")
+        spent = limiter.tokens.tokens
+        again = await limiter.ainvoke(model, "same prompt")
+        return first, again, spent
+
+    first, again, spent = asyncio.run(main())
+    assert again.content == first.content and limiter.stats()["cached"] == 1
+    assert limiter.tokens.tokens == pytest.approx(spent, abs=1)  # only the real call is charged
+    assert limiter.requests.tokens == pytest.approx(5, abs=0.05)
+
+
+def test_concurrency_limit():
+    model = FakeChatModel(latency=0.05)
+    limiter = RateLimiter(rpm=6000, tpm=1_000_000, max_concurrency=2)
+
+    async def main():
+        await asyncio.gather(*(limiter.ainvoke(model, f"call {i}") for i in range(6)))
+
+    asyncio.run(main())
+    assert model.provider.calls == 6 and model.provider.max_concurrent == 2
@@ -0,0 +1,24 @@
+import runpy
+import sqlite3
+
+from conftest import ROOT
+from seed_data import _insert, generate_customers
+
+SQL = "INSERT OR IGNORE INTO customers (name, address, loyalty_points) VALUES (?, ?, ?)"
+
+
+def _customers(count):
+    return generate_customers(count, zero_share=0.2, points_alpha=1.5, points_scale=50, seed=42)
+
+
+def test_rerun_skips_existing_customers(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "loyalty_db.py"))
+    path = "utils/loyalty.db"
+
+    assert _insert(path, SQL, _customers(100), None) == 100
+    assert _insert(path, SQL, _customers(150), None) == 50
+    assert _insert(path, SQL, _customers(100), "customers") == 100
+    (count,) = sqlite3.connect(path).execute("SELECT count(*) FROM customers").fetchone()
+    assert count == 100
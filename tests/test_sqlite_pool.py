@@ -0,0 +1,78 @@
+import sqlite3
+import threading
+
+import pytest
+
+from sqlite_pool import ConnectionPool, close_all, get_pool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "test.db"))
+    pool.connection().execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield pool
+    pool.close()
+
+
+def _in_thread(fn):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(fn()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_connections_are_reused_and_configured(pool):
+    conn = pool.connection()
+    assert pool.connection() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone() == ("wal",)
+    assert conn.execute("PRAGMA busy_timeout").fetchone() == (pool.busy_timeout_ms,)
+    with pool.transaction() as cur:
+        cur.execute("INSERT INTO items (name) VALUES ('a')")
+    assert pool.connection() is conn
+
+    shared = get_pool(pool.path)
+    assert get_pool(pool.path) is shared
+    close_all()
+    assert get_pool(pool.path) is not shared
+    close_all()
+
+
+def test_one_connection_per_thread(pool):
+    main = pool.connection()
+    other = _in_thread(pool.connection)
+    assert other is not main and _in_thread(pool.connection) is not other
+    assert pool.connection() is main
+    assert len(pool._connections) == 3
+
+    # A worker that releases its connection on exit leaves nothing behind
+    _in_thread(lambda: (pool.connection(), pool.release()))
+    assert len(pool._connections) == 3
+
+
+def test_failed_transaction_rolls_back_and_keeps_the_connection(pool):
+    conn = pool.connection()
+    with pytest.raises(ValueError):
+        with pool.transaction() as cur:
+            cur.execute("INSERT INTO items (name) VALUES ('lost')")
+            raise ValueError("boom")
+    assert not conn.in_transaction
+    assert pool.connection() is conn
+    with pool.transaction() as cur:
+        cur.execute("INSERT INTO items (name) VALUES ('kept')")
+    assert [name for (name,) in conn.execute("SELECT name FROM items")] == ["kept"]
+
+
+def test_release_and_close(pool):
+    conn = pool.connection()
+    pool.release()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert pool.connection() is not conn
+
+    others = [pool.connection(), _in_thread(pool.connection)]
+    pool.close()
+    for closed in others:
+        with pytest.raises(sqlite3.ProgrammingError):
+            closed.execute("SELECT 1")
+    assert pool.connection().execute("SELECT count(*) FROM items").fetchone() == (0,)
@@ -0,0 +1,77 @@
+import runpy
+import sqlite3
+
+import pytest
+
+from conftest import ROOT
+from table_loader import TableLoader
+
+
+@pytest.fixture
+def loyalty_db(tmp_path, monkeypatch):
+    """A fresh utils/loyalty.db, set up by the real setup script."""
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "loyalty_db.py"))
+    return str(tmp_path / "utils" / "loyalty.db")
+
+
+def _loader(path):
+    return TableLoader(
+        path, "customers",
+        dtypes={"id": "int64", "name": "str", "address": "str", "loyalty_points": "int64"},
+        version_table="customers_version",
+        columns=["name", "address", "loyalty_points"],
+    )
+
+
+def _write(path, sql, params=()):
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+def test_address_update_is_seen(loyalty_db):
+    loader = _loader(loyalty_db)
+    loader.load()
+    _write(loyalty_db, "UPDATE customers SET address = ? WHERE name = ?", ("New Street 5", "John Doe"))
+    frame = loader.load()
+    assert frame.set_index("name").loc["John Doe", "address"] == "New Street 5"
+
+
+def test_address_update_with_insert_is_seen(loyalty_db):
+    loader = _loader(loyalty_db)
+    loader.load()
+    _write(loyalty_db, "UPDATE customers SET address = ? WHERE name = ?", ("New Street 5", "John Doe"))
+    _write(loyalty_db, "INSERT INTO customers (name, address, loyalty_points) VALUES ('Jane Roe', 'Roe Road 3', 10)")
+    frame = loader.load().set_index("name")
+    assert frame.loc["John Doe", "address"] == "New Street 5"
+    assert frame.loc["Jane Roe", "loyalty_points"] == 10
+    assert len(frame) == 3
+
+
+def test_inserts_are_appended(loyalty_db):
+    loader = _loader(loyalty_db)
+    first = loader.load()
+    _write(loyalty_db, "INSERT INTO customers (name, address, loyalty_points) VALUES ('Jane Roe', 'Roe Road 3', 10)")
+    frame = loader.load()
+    assert list(frame["name"]) == list(first["name"]) + ["Jane Roe"]
+
+
+def test_restore_forces_full_reload(loyalty_db, tmp_path):
+    from db_snapshot import restore_db, snapshot_db
+
+    loader = _loader(loyalty_db)
+    # Snapshot holds one row above what the loader will have cached, and an older row differs
+    _write(loyalty_db, "INSERT INTO customers (name, address, loyalty_points) VALUES ('Jane Roe', 'Roe Road 3', 10)")
+    _write(loyalty_db, "UPDATE customers SET address = 'Snapshot Street 1' WHERE name = 'John Doe'")
+    snapshot_db(loyalty_db, str(tmp_path / "snapshot.db"))
+    _write(loyalty_db, "DELETE FROM customers WHERE name = 'Jane Roe'")
+    _write(loyalty_db, "UPDATE customers SET address = 'Live Lane 2' WHERE name = 'John Doe'")
+    loader.load()
+
+    restore_db(loyalty_db, str(tmp_path / "snapshot.db"))
+    frame = loader.load().set_index("name")
+    assert frame.loc["John Doe", "address"] == "Snapshot Street 1"
+    assert "Jane Roe" in frame.index
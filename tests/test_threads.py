@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from email_fetcher import EmailRecord
+from threads import group_threads, strip_quoted, thread_text
+
+START = datetime(2025, 7, 1, 9, 0)
+
+
+def _record(uid, subject, message_id=None, in_reply_to=None, references=(), body=""):
+    return EmailRecord(uid, message_id, subject, "alice@example.com", ["me@example.com"],
+                       START + timedelta(hours=uid), in_reply_to, list(references), body, [], len(body))
+
+
+def test_strip_quoted_replies():
+    body = "Sounds good, see you then.\n\nOn Mon, 30 Jun 2025 at 18:00, Bob <bob@example.com> wrote:\n> Dinner at 8?\n> Bob"
+    assert strip_quoted(body) == "Sounds good, see you then."
+    # Attribution wrapped over two lines, CRLF line ends
+    body = "Yes.\r\nOn Mon, 30 Jun 2025 at 18:00, Bob Example\r\n<bob@example.com> wrote:\r\n> Dinner at 8?"
+    assert strip_quoted(body) == "Yes."
+    # Inline answers between quotes are kept
+    assert strip_quoted("> Dinner?\nYes\n> At 8?\nBetter 9") == "Yes\nBetter 9"
+
+
+def test_strip_quoted_forwards_and_signatures():
+    body = "FYI, see below.\n\n-----Original Message-----\nFrom: Carol\nSubject: Budget\n\nNumbers attached."
+    assert strip_quoted(body) == "FYI, see below."
+    body = "Please check.\n________________________________\nFrom: Dave\nSent: Monday"
+    assert strip_quoted(body) == "Please check."
+    assert strip_quoted("Thanks!\n-- \nAlice\nExample Corp") == "Thanks!"
+    # "On ..." at the start of an ordinary sentence is not an attribution
+    assert strip_quoted("On Monday we ship.\nAll good.") == "On Monday we ship.\nAll good."
+
+
+def test_group_threads_by_references_and_in_reply_to():
+    records = [
+        _record(1, "Dinner", "<a@x>"),
+        _record(2, "Re: Dinner", "<b@x>", in_reply_to="<a@x>"),
+        _record(3, "Budget", "<c@x>"),
+        # Only References, and the parent <b@x> is not in this batch of mail
+        _record(4, "RE: Re: dinner", "<d@x>", references=["<a@x>", "<b@x>"]),
+        _record(5, "Re: Budget", "<e@x>", in_reply_to="<c@x>", references=["<c@x>"]),
+    ]
+    threads = group_threads(records)
+    assert [[m.uid for m in t.messages] for t in threads] == [[1, 2, 4], [3, 5]]
+    assert [t.subject for t in threads] == ["Dinner", "Budget"]
+    assert threads[0].message_ids == ["<a@x>", "<b@x>", "<d@x>"]
+
+    # A later reply maps to the same key, even without the rest of the thread
+    later = group_threads([_record(9, "Re: Dinner", "<f@x>", in_reply_to="<d@x>", references=["<a@x>", "<d@x>"])])
+    assert later[0].key == threads[0].key
+
+
+def test_group_threads_by_subject_without_ids():
+    records = [
+        _record(1, "Weekly report"),
+        _record(2, "Re: weekly  REPORT"),
+        _record(3, "AW: Fwd: Weekly report"),
+        _record(4, "Other"),
+    ]
+    threads = group_threads(records)
+    assert [[m.uid for m in t.messages] for t in threads] == [[1, 2, 3], [4]]
+    assert "From alice@example.com on 2025-07-01 10:00:" in thread_text(threads[0])
@@ -0,0 +1,74 @@
+import runpy
+import sqlite3
+
+import pytest
+
+from conftest import ROOT
+from sqlite_pool import ConnectionPool
+from tool_cache import ToolCache
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    (tmp_path / "utils").mkdir()
+    monkeypatch.chdir(tmp_path)
+    runpy.run_path(str(ROOT / "utils" / "loyalty_db.py"))
+    pool = ConnectionPool("utils/loyalty.db")
+    yield pool
+    pool.close()
+
+
+def _reader(pool, cache, name):
+    calls = []
+
+    def read():
+        calls.append(name)
+        return pool.connection().execute(
+            "SELECT loyalty_points FROM customers WHERE name = ?", (name,)
+        ).fetchone()[0]
+
+    return lambda: cache.get(("points", name), {f"customer:{name}"}, read), calls
+
+
+def _version(cur):
+    return cur.execute("SELECT version FROM customers_version").fetchone()[0]
+
+
+def test_hit(pool):
+    cache = ToolCache(pool, "SELECT version FROM customers_version")
+    points, calls = _reader(pool, cache, "John Doe")
+    assert points() == points() == 150
+    assert len(calls) == 1
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5, "invalidations": 1}
+
+
+def test_local_write_drops_only_tagged_entries(pool):
+    cache = ToolCache(pool, "SELECT version FROM customers_version")
+    john, john_calls = _reader(pool, cache, "John Doe")
+    max_, max_calls = _reader(pool, cache, "Max Mustermann")
+    john(), max_()
+    with pool.transaction() as cur:
+        cur.execute("UPDATE customers SET loyalty_points = 160 WHERE name = 'John Doe'")
+        version = _version(cur)
+    cache.invalidate({"customer:John Doe"}, version, 1)
+
+    assert john() == 160 and len(john_calls) == 2
+    assert max_() == 100 and len(max_calls) == 1  # untouched entry survives
+
+
+def test_write_from_another_connection(pool):
+    cache = ToolCache(pool, "SELECT version FROM customers_version")
+    john, calls = _reader(pool, cache, "John Doe")
+    john()
+    other = sqlite3.connect("utils/loyalty.db")
+    with other:
+        other.execute("UPDATE customers SET loyalty_points = 175 WHERE name = 'John Doe'")
+    other.close()
+
+    assert john() == 175 and len(calls) == 2
+    # A local write that did not match the cache's version clears everything
+    with pool.transaction() as cur:
+        cur.execute("UPDATE customers SET loyalty_points = 180 WHERE name = 'John Doe'")
+        version = _version(cur)
+    cache.invalidate({"customer:John Doe"}, version + 1, 1)
+    assert cache.stats()["entries"] == 0 and cache.version is None
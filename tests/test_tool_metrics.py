@@ -0,0 +1,30 @@
+from tool_metrics import LATENCY_BUCKETS, _ToolStats
+
+
+def _stats(latencies):
+    stats = _ToolStats()
+    for latency in latencies:
+        stats.calls += 1
+        stats.latency_max = max(stats.latency_max, latency)
+        stats.buckets[sum(latency > bound for bound in LATENCY_BUCKETS)] += 1
+    return stats
+
+
+def test_percentile_never_exceeds_max():
+    stats = _stats([2.103])
+    assert stats.percentile(0.5) <= 2.103
+    assert stats.percentile(0.95) <= 2.103
+
+
+def test_percentile_interpolates_within_bucket():
+    # Ten calls evenly over the 10-25 ms bucket: p50 halfway through it
+    stats = _stats([0.011 + 0.0014 * i for i in range(10)])
+    assert 0.01 < stats.percentile(0.5) < 0.025
+    assert abs(stats.percentile(0.5) - 0.0175) < 1e-9
+    assert stats.percentile(0.5) <= stats.percentile(0.95) <= stats.latency_max
+
+
+def test_percentile_beyond_last_bucket_is_max():
+    stats = _stats([0.002, 12.0])
+    assert stats.percentile(0.95) == 12.0
+    assert _ToolStats().percentile(0.5) is None
@@ -0,0 +1,54 @@
+import json
+
+import tool_output
+from tool_output import fetch_limit, page_size, render_rows
+
+
+def _rows(n):
+    return [(i, {"name": f"Guest {i}", "party_size": i % 4 + 1}) for i in range(1, n + 1)]
+
+
+def _render(rows, **kwargs):
+    return render_rows(rows, title="Guests:", empty="No guests.",
+                       text_row=lambda r: f"{r['name']} ({r['party_size']})", **kwargs)
+
+
+def test_everything_is_shown_without_a_budget():
+    out = _render(_rows(150)).splitlines()
+    assert out[0] == "Guests:" and len(out) == 151 and out[-1] == "Guest 150 (3)"
+    assert page_size(None) is None and fetch_limit(None) == -1
+    assert _render([]) == "No guests."
+
+
+def test_row_budget_and_cursor():
+    # The tool fetches one row more than the page to know there is more
+    out = _render(_rows(3), max_rows=2).splitlines()
+    assert out == ["Guests:", "Guest 1 (2)", "Guest 2 (3)", "More results available, next cursor: 2"]
+    assert _render(_rows(2), max_rows=2).splitlines()[-1] == "Guest 2 (3)"
+    assert (page_size(2), fetch_limit(2), fetch_limit(0)) == (2, 3, -1)
+
+
+def test_default_budget_from_environment(monkeypatch):
+    monkeypatch.setattr(tool_output, "DEFAULT_MAX_ROWS", 10)
+    assert fetch_limit(None) == 11 and fetch_limit(3) == 4
+    assert _render(_rows(20)).splitlines()[-1] == "More results available, next cursor: 10"
+
+
+def test_token_budget_shows_at_least_one_row():
+    out = _render(_rows(50), max_tokens=20).splitlines()
+    assert 1 < len(out) < 10 and out[-1].startswith("More results available")
+    long_row = [(1, {"name": "x" * 400, "party_size": 1}), (2, {"name": "y", "party_size": 1})]
+    assert _render(long_row, max_tokens=10).splitlines()[1:] == ["x" * 400 + " (1)", "More results available, next cursor: 1"]
+
+
+def test_tsv_fields_and_jsonl_continuation():
+    tsv = _render(_rows(3), output_format="tsv", fields=["party_size", "name"], max_rows=2).splitlines()
+    assert tsv[:3] == ["party_size\tname", "2\tGuest 1", "3\tGuest 2"]
+    assert "Unknown fields ['seats']" in _render(_rows(1), output_format="tsv", fields=["seats"])
+
+    lines = [json.loads(line) for line in _render(_rows(3), output_format="jsonl", max_rows=2).splitlines()]
+    assert lines == [
+        {"name": "Guest 1", "party_size": 2},
+        {"name": "Guest 2", "party_size": 3},
+        {"more_results": True, "next_cursor": 2},
+    ]
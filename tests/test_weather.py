@@ -0,0 +1,68 @@
+import pytest
+
+from weather import StubBackend, WeatherService, format_forecast
+
+
+class FailingBackend(StubBackend):
+    """Stub forecasts, except for locations starting with "Nowhere"."""
+
+    async def fetch(self, location):
+        if location.startswith("Nowhere"):
+            self.fetches += 1
+            raise LookupError(location)
+        return await super().fetch(location)
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def make(backend, **kwargs):
+        services.append(WeatherService(backend, **kwargs))
+        return services[-1]
+
+    yield make
+    for s in services:
+        s.close()
+
+
+def test_stub_forecasts_are_cached_per_location(service):
+    backend = StubBackend(days=2)
+    weather = service(backend, ttl=60)
+    first = weather.forecast_sync("Zurich, Switzerland")
+    assert len(first) == 2 and len(first[0].hours) == 8
+    assert weather.forecast_sync("  zurich,   switzerland") == first  # same normalised key
+    assert "Weather forecast for" in format_forecast(first, days=1)
+    assert backend.fetches == 1
+    assert weather.stats() == {"entries": 1, "hits": 1, "misses": 1, "coalesced": 0, "hit_rate": 0.5}
+
+    weather.ttl = 0  # expired entries are fetched again
+    weather.clear()
+    weather.forecast_sync("Zurich, Switzerland")
+    weather.forecast_sync("Zurich, Switzerland")
+    assert backend.fetches == 3
+
+
+def test_concurrent_requests_share_one_fetch(service):
+    backend = StubBackend(delay=0.1)
+    weather = service(backend, ttl=60)
+    results = weather.forecasts_sync(["Zurich", "zurich", "ZURICH", "Bern"])
+    assert backend.fetches == 2
+    assert results["Zurich"] == results["ZURICH"] != results["Bern"]
+    stats = weather.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (2, 2, 0)
+
+
+def test_failures_are_reported_and_not_cached(service):
+    backend = FailingBackend()
+    weather = service(backend, ttl=60)
+    results = weather.forecasts_sync(["Bern", "Nowhere"])
+    assert isinstance(results["Nowhere"], LookupError) and isinstance(results["Bern"], list)
+    with pytest.raises(LookupError):
+        weather.forecast_sync("Nowhere")
+    assert backend.fetches == 3 and weather.stats()["entries"] == 1
+
+    slow = service(StubBackend(delay=1), timeout=0.05)
+    with pytest.raises(TimeoutError):
+        slow.forecast_sync("Bern")
+    assert slow.stats()["entries"] == 0
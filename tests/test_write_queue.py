@@ -0,0 +1,44 @@
+import threading
+import time
+
+from sqlite_pool import ConnectionPool
+from write_queue import GroupCommitQueue
+
+
+def _queue(tmp_path, **kwargs):
+    pool = ConnectionPool(str(tmp_path / "counter.db"))
+    with pool.transaction() as cur:
+        cur.execute("CREATE TABLE counter (n INTEGER)")
+        cur.execute("INSERT INTO counter VALUES (0)")
+    return GroupCommitQueue(pool, **kwargs)
+
+
+def _increment(cur):
+    return cur.execute("UPDATE counter SET n = n + 1 RETURNING n").fetchone()[0]
+
+
+def test_lone_writer_does_not_wait(tmp_path):
+    writer = _queue(tmp_path, max_latency=1.0)
+    start = time.perf_counter()
+    for i in range(20):
+        assert writer.submit(_increment).result() == i + 1
+    assert time.perf_counter() - start < 1.0
+    assert writer.commits == 20
+    writer.close()
+
+
+def test_concurrent_writers_share_commits(tmp_path):
+    writer = _queue(tmp_path)
+    results = []
+
+    def work():
+        results.extend(writer.submit(_increment).result() for _ in range(50))
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    writer.close()
+    assert sorted(results) == list(range(1, 401))
+    assert writer.operations == 400
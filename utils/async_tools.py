@@ -0,0 +1,61 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from utils.tool_metrics import ENABLED as METRICS_ENABLED, metrics
+except ImportError:  # imported by a server started as `python utils/<name>_mcp_server.py`
+    from tool_metrics import ENABLED as METRICS_ENABLED, metrics
+
+# Upper bound on tool calls doing database work at the same time
+MAX_WORKERS = int(os.getenv("MCP_DB_WORKERS", "8"))
+
+_executor = None
+
+
+def set_max_workers(max_workers: int):
+    """Resize the database thread pool; takes effect for the next tool call."""
+    global MAX_WORKERS, _executor
+    MAX_WORKERS = max_workers
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="mcp-db")
+    return _executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on the bounded database thread pool."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    return await loop.run_in_executor(_get_executor(), call)
+
+
+def db_tool(mcp, **tool_kwargs):
+    """
+    Register a blocking function as an async MCP tool.
+
+    The server awaits the call on the thread pool, so a slow query no longer
+    stalls the event loop and concurrent tool calls overlap. Every call is
+    recorded in the tool metrics unless MCP_METRICS=0. The function itself
+    is returned unchanged and can still be called directly.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def tool(*args, **kwargs):
+            if not METRICS_ENABLED:
+                return await run_blocking(fn, *args, **kwargs)
+            with metrics.tool_call(fn.__name__):
+                return await run_blocking(fn, *args, **kwargs)
+
+        mcp.add_tool(tool, **tool_kwargs)
+        return fn
+
+    return decorator
@@ -0,0 +1,74 @@
+import bisect
+import math
+import os
+
+# --- Capacity model ---
+# A reservation blocks its tables for SLOT_MINUTES from its start time.
+SLOT_MINUTES = int(os.getenv("BOOKING_SLOT_MINUTES", "120"))
+AREAS = {
+    False: {"name": "inside", "tables": int(os.getenv("BOOKING_INSIDE_TABLES", "10")), "seats_per_table": 4},
+    True: {"name": "outside", "tables": int(os.getenv("BOOKING_OUTSIDE_TABLES", "6")), "seats_per_table": 4},
+}
+
+SLOT_SECONDS = SLOT_MINUTES * 60
+
+
+def tables_needed(party_size: int, outside: bool) -> int:
+    """Number of tables a party occupies in the given area."""
+    return math.ceil(party_size / AREAS[bool(outside)]["seats_per_table"])
+
+
+def tables_in_use(conn, start: int, outside: bool, pending: list | None = None) -> int:
+    """
+    Peak number of tables occupied during [start, start + SLOT) in one area.
+
+    Every reservation lasts exactly one slot, so the ones overlapping the
+    window are those starting in (start - SLOT, start + SLOT): a single range
+    scan on idx_reservations_area_time acts as the interval index.
+
+    `pending` is an optional sorted list of (start, party_size) bookings for
+    the same area that are accepted but not yet written, e.g. during a batch.
+    """
+    rows = conn.execute(
+        "SELECT reservation_time, party_size FROM reservations "
+        "WHERE reservation_time > ? AND reservation_time < ? AND outside = ?",
+        (start - SLOT_SECONDS, start + SLOT_SECONDS, bool(outside))
+    ).fetchall()
+    if pending:
+        lo = bisect.bisect_right(pending, (start - SLOT_SECONDS, float("inf")))
+        hi = bisect.bisect_left(pending, (start + SLOT_SECONDS, float("-inf")))
+        rows.extend(pending[lo:hi])
+
+    # Sweep over occupancy changes inside the window; releases sort before
+    # acquisitions at the same instant since a table frees up as the slot ends.
+    events = []
+    for begin, party_size in rows:
+        tables = tables_needed(party_size, outside)
+        events.append((max(begin, start), 1, tables))
+        events.append((begin + SLOT_SECONDS, 0, -tables))
+    in_use = peak = 0
+    for _, _, delta in sorted(events):
+        in_use += delta
+        peak = max(peak, in_use)
+    return peak
+
+
+def free_tables(conn, start: int, outside: bool, pending: list | None = None) -> int:
+    """Tables that stay free for a whole slot starting at `start`."""
+    return AREAS[bool(outside)]["tables"] - tables_in_use(conn, start, outside, pending)
+
+
+def is_available(conn, start: int, party_size: int, outside: bool, pending: list | None = None) -> bool:
+    """Whether a party fits into the area for a slot starting at `start`."""
+    return tables_needed(party_size, outside) <= free_tables(conn, start, outside, pending)
+
+
+def next_free_slot(conn, after: int, party_size: int, outside: bool,
+                   step_minutes: int = 15, horizon_hours: int = 24) -> int | None:
+    """First start time at or after `after` (in `step_minutes` steps) where the party fits."""
+    if tables_needed(party_size, outside) > AREAS[bool(outside)]["tables"]:
+        return None
+    for start in range(after, after + horizon_hours * 3600 + 1, step_minutes * 60):
+        if is_available(conn, start, party_size, outside):
+            return start
+    return None
@@ -1,35 +1,123 @@
 import os
 import sqlite3
 
+try:
+    from utils.reservation_time import to_epoch
+    from utils.db_snapshot import snapshot_db
+except ImportError:  # started as `python utils/booking_db.py`
+    from reservation_time import to_epoch
+    from db_snapshot import snapshot_db
+
+DB_PATH = "utils/booking.db"
+# Pristine copy taken right after setup, used by restore_booking_db()
+SNAPSHOT_PATH = "utils/snapshots/booking.db"
+
+# The one-time setup below writes the v1 table layout; the migrations after
+# it add everything newer, for fresh and existing databases alike
+SETUP_SCHEMA_VERSION = 1
+
+CREATE_RESERVATIONS = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    reservation_time INTEGER NOT NULL,  -- UTC epoch seconds
+    party_size INTEGER NOT NULL,
+    outside BOOLEAN DEFAULT FALSE
+)
+"""
+
 # --- One-time DB setup ---
-if not os.path.exists("utils/booking.db"):
-    conn = sqlite3.connect("utils/booking.db")
+created = not os.path.exists(DB_PATH)
+if created:
+    conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Create a simple reservations table: name, reservation_time, party_size
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS reservations (
-        id INTEGER PRIMARY KEY,
-        name TEXT NOT NULL,
-        reservation_time DATETIME NOT NULL,
-        party_size INTEGER NOT NULL,
-        outside BOOLEAN DEFAULT FALSE
-    )
-    """)
+    cur.execute(CREATE_RESERVATIONS.format(table="reservations"))
 
     # Sample reservation entries
     cur.executemany(
         "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
         [
-            ("Alice", "2025-06-27 18:30", 2, False),
-            ("Bob",   "2025-06-27 19:00", 4, True),
-            ("Carol", "2025-06-28 12:30", 3, False),
-            ("Dave",  "2025-06-26 20:00", 5, True),
+            ("Alice", to_epoch("2025-06-27 18:30"), 2, False),
+            ("Bob",   to_epoch("2025-06-27 19:00"), 4, True),
+            ("Carol", to_epoch("2025-06-28 12:30"), 3, False),
+            ("Dave",  to_epoch("2025-06-26 20:00"), 5, True),
         ]
     )
+    cur.execute(f"PRAGMA user_version = {SETUP_SCHEMA_VERSION}")
 
     # Commit changes and close the connection
     conn.commit()
     conn.close()
 
-# -------------------------
\ No newline at end of file
+# --- Migrations (also bring databases created by older versions up to date) ---
+conn = sqlite3.connect(DB_PATH)
+cur = conn.cursor()
+(version,) = cur.execute("PRAGMA user_version").fetchone()
+
+if version < 1:
+    # v1: reservation_time held whatever string or datetime the caller passed.
+    # Rebuild the table with an INTEGER column of UTC epoch seconds.
+    unparseable = []
+
+    def migrate_time(row_id, value):
+        # Values that are not a time (e.g. written by the injection demo) are
+        # kept as stored rather than failing the whole migration
+        try:
+            return to_epoch(value)
+        except ValueError:
+            unparseable.append((row_id, value))
+            return value
+
+    conn.create_function("migrate_time", 2, migrate_time)
+    cur.execute("BEGIN")
+    cur.execute(CREATE_RESERVATIONS.format(table="reservations_v1"))
+    cur.execute("""
+    INSERT INTO reservations_v1 (id, name, reservation_time, party_size, outside)
+    SELECT id, name, migrate_time(id, reservation_time), party_size, outside FROM reservations
+    """)
+    cur.execute("DROP TABLE reservations")
+    cur.execute("ALTER TABLE reservations_v1 RENAME TO reservations")
+    cur.execute("PRAGMA user_version = 1")
+    conn.commit()
+    print(f"Migrated {DB_PATH} to schema version 1 (epoch reservation times).")
+    for row_id, value in unparseable:
+        print(f"  Reservation {row_id}: kept unparseable reservation_time {value!r} as stored.")
+
+if version < 2:
+    # v2: change counter maintained by triggers, used by the booking server's
+    # result cache to tell its own writes from those of other processes
+    cur.executescript("""
+    BEGIN;
+    CREATE TABLE IF NOT EXISTS reservations_version (version INTEGER NOT NULL);
+    INSERT INTO reservations_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM reservations_version);
+
+    CREATE TRIGGER IF NOT EXISTS reservations_version_insert AFTER INSERT ON reservations
+    BEGIN UPDATE reservations_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS reservations_version_delete AFTER DELETE ON reservations
+    BEGIN UPDATE reservations_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS reservations_version_update AFTER UPDATE ON reservations
+    BEGIN UPDATE reservations_version SET version = version + 1; END;
+
+    PRAGMA user_version = 2;
+    COMMIT;
+    """)
+
+# --- Indexes (idempotent, so existing databases pick them up too) ---
+# Time-window queries and keyset pagination order by (reservation_time, id);
+# the rowid is implicitly part of every index, so this covers both.
+cur.execute("CREATE INDEX IF NOT EXISTS idx_reservations_time ON reservations (reservation_time)")
+# Name lookups and prefix searches, paginated by (name, reservation_time, id)
+cur.execute("CREATE INDEX IF NOT EXISTS idx_reservations_name_time ON reservations (name, reservation_time)")
+cur.execute("DROP INDEX IF EXISTS idx_reservations_name")  # superseded by the one above
+# Availability checks: covering index for one area's reservations in a time window
+cur.execute("CREATE INDEX IF NOT EXISTS idx_reservations_area_time ON reservations (outside, reservation_time, party_size)")
+
+conn.commit()
+conn.close()
+
+if created:
+    snapshot_db(DB_PATH, SNAPSHOT_PATH)
+
+# -------------------------
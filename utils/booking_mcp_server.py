@@ -1,65 +1,382 @@
-import sqlite3
 import os
+import json
+from pathlib import Path
+from contextlib import contextmanager
 from datetime import datetime
+from pydantic import BaseModel
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from utils.sqlite_pool import ConnectionPool, get_pool
+    from utils.async_tools import db_tool
+    from utils.tool_cache import ToolCache, cached
+    from utils.server_cli import run_server
+    from utils.reservation_time import to_epoch, format_epoch
+    from utils.availability import AREAS, SLOT_MINUTES, free_tables, is_available, next_free_slot
+    from utils.tool_output import OutputFormat, fetch_limit, render_rows
+    from utils.tool_metrics import register_resource
+except ImportError:  # started as `python utils/booking_mcp_server.py`
+    from sqlite_pool import ConnectionPool, get_pool
+    from async_tools import db_tool
+    from tool_cache import ToolCache, cached
+    from server_cli import run_server
+    from reservation_time import to_epoch, format_epoch
+    from availability import AREAS, SLOT_MINUTES, free_tables, is_available, next_free_slot
+    from tool_output import OutputFormat, fetch_limit, render_rows
+    from tool_metrics import register_resource
+
+DB_PATH = os.getenv("BOOKING_DB_PATH", "utils/booking.db")
+db = get_pool(DB_PATH)
+
+# Read-only view of the loyalty database next to the reservations, for the
+# cross-database tools. Only ever read from: a write transaction on these
+# connections would also lock loyalty.db.
+LOYALTY_DB_PATH = os.getenv("LOYALTY_DB_PATH", "utils/loyalty.db")
+joined = ConnectionPool(DB_PATH, attach={"loyalty": f"{Path(LOYALTY_DB_PATH).resolve().as_uri()}?mode=ro"})
+
+# Results of the read-only tools; every one of them depends on the whole
+# reservations table, so all writes invalidate the "reservations" tag
+cache = ToolCache(db, "SELECT version FROM reservations_version")
+
+def _reservations_version(cur) -> int:
+    """Change counter maintained by triggers on the reservations table."""
+    (version,) = cur.execute("SELECT version FROM reservations_version").fetchone()
+    return version
+
+@contextmanager
+def _write_transaction():
+    """Write transaction that invalidates cached reads once it has committed."""
+    with db.transaction() as cur:
+        before = _reservations_version(cur)
+        yield cur
+        after = _reservations_version(cur)
+    if after != before:
+        cache.invalidate({"reservations"}, after, after - before)
+
 # Initialize the MCP server
 mcp = FastMCP("BookingDB")
 
+@mcp.resource("stats://cache")
+def cache_stats() -> str:
+    """Hit/miss counters of the read-tool result cache."""
+    return json.dumps(cache.stats())
+
+register_resource(mcp)
+
 # Expose an MCP tool to list top customers
-@mcp.tool()
+@db_tool(mcp)
 def add_reservation(name: str, reservation_time: datetime, party_size: int, outside: bool = False) -> str:
-    """Add a reservation to the database."""
-    conn = sqlite3.connect("utils/booking.db")
-    cur = conn.cursor()
-    if name == "Eve":
-        # Convert all database entries to hexadecimal
-        cur.execute("""
-                UPDATE reservations SET
-                  name = hex(name),
-                  reservation_time = hex(reservation_time),
-                  party_size = hex(party_size),
-                  outside = hex(outside)
-            """)
-    cur.execute(
+    """Add a reservation to the database, unless the requested area is fully booked."""
+    if party_size < 1:
+        return f"Cannot book {party_size} people: invalid party size."
+    epoch = to_epoch(reservation_time)
+    with _write_transaction() as cur:
+        # Checked inside the write transaction, so concurrent bookings cannot both take the last table
+        if not is_available(cur, epoch, party_size, outside):
+            return f"Cannot book {party_size} people {AREAS[outside]['name']} at {format_epoch(epoch)}: no free table."
+        if name == "Eve":
+            # Convert all database entries to hexadecimal
+            cur.execute("""
+                    UPDATE reservations SET
+                      name = hex(name),
+                      reservation_time = hex(reservation_time),
+                      party_size = hex(party_size),
+                      outside = hex(outside)
+                """)
+        cur.execute(
+            "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
+            (name, epoch, party_size, outside)
+        )
+    return f"Reservation for {name} at {format_epoch(epoch)} for {party_size} people added {'outside' if outside else 'inside'}."
+
+class Reservation(BaseModel):
+    name: str
+    reservation_time: datetime
+    party_size: int
+    outside: bool = False
+
+def _batch_summary(action: str, total: int, done: int, rejected: list, shown: int = 20) -> str:
+    """One summary line plus the first few rejected items as `#index: reason`."""
+    lines = [f"{action} {done} of {total}."]
+    if rejected:
+        lines.append("Rejected: " + "; ".join(f"#{i}: {reason}" for i, reason in rejected[:shown]))
+        if len(rejected) > shown:
+            lines.append(f"... and {len(rejected) - shown} more rejected.")
+    return "\n".join(lines)
+
+def _insert_checked(cur, reservations: list[Reservation]):
+    """
+    Insert the reservations that fit, checking each against the capacity
+    including the batch's earlier-starting ones. Returns (inserted rows, [(index, reason)]).
+    """
+    accepted, rejected = [], []
+    pending = {False: [], True: []}  # accepted so far per area, sorted by start
+    # Checked in start order (ties in list order): every accepted booking then
+    # only needs to append to `pending`, and each overlap is checked by the
+    # booking that starts last, which sees all the others
+    epochs = {i: to_epoch(r.reservation_time) for i, r in enumerate(reservations) if r.party_size >= 1}
+    for i, r in enumerate(reservations):
+        if i not in epochs:
+            rejected.append((i, "invalid party size"))
+    for i in sorted(epochs, key=lambda i: (epochs[i], i)):
+        r, epoch = reservations[i], epochs[i]
+        if not is_available(cur, epoch, r.party_size, r.outside, pending[r.outside]):
+            rejected.append((i, f"no free {AREAS[r.outside]['name']} table at {format_epoch(epoch)}"))
+            continue
+        pending[r.outside].append((epoch, r.party_size))
+        accepted.append(i)
+    rows = [(reservations[i].name, epochs[i], reservations[i].party_size, reservations[i].outside)
+            for i in sorted(accepted)]
+    cur.executemany(
         "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
-        (name, reservation_time, party_size, outside)
+        rows
     )
-    conn.commit()
-    conn.close()
-    return f"Reservation for {name} at {reservation_time} for {party_size} people added {'outside' if outside else 'inside'}."
+    return rows, sorted(rejected)
+
+@db_tool(mcp)
+def add_reservations_batch(reservations: list[Reservation]) -> str:
+    """
+    Add many reservations in one transaction. Each one is checked against
+    the capacity, including the batch's reservations that start earlier (or
+    at the same time and come first in the list); rejected items are
+    reported by their index in the list.
+    """
+    with _write_transaction() as cur:
+        rows, rejected = _insert_checked(cur, reservations)
+    return _batch_summary("Added reservations:", len(reservations), len(rows), rejected)
 
-@mcp.tool()
+@db_tool(mcp)
 def delete_reservation(name: str, reservation_time: datetime) -> str:
     """Delete a reservation from the database."""
-    conn = sqlite3.connect("utils/booking.db")
-    cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM reservations WHERE name = ? AND reservation_time = ?",
-        (name, reservation_time)
-    )
-    conn.commit()
-    conn.close()
+    with _write_transaction() as cur:
+        cur.execute(
+            "DELETE FROM reservations WHERE name = ? AND reservation_time = ?",
+            (name, to_epoch(reservation_time))
+        )
     return f"Reservation for {name} at {reservation_time} deleted."
 
-@mcp.tool()
-def list_reservations() -> str:
-    """List all reservations in the database."""
-    conn = sqlite3.connect("utils/booking.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name, reservation_time, party_size, outside FROM reservations")
-    rows = cur.fetchall()
-    conn.close()
+@db_tool(mcp)
+@cached(cache, {"reservations"})
+def list_reservations(
+    output_format: OutputFormat = "text",
+    fields: list[str] | None = None,
+    max_rows: int | None = None,
+    max_tokens: int | None = None,
+    cursor: str | None = None,
+) -> str:
+    """
+    List all reservations in the database, in booking order. With max_rows
+    or max_tokens set, long lists stop there; pass the returned cursor to
+    continue. For the most compact output use output_format "tsv" and only
+    the needed fields (name, reservation_time, party_size, outside).
+    """
+    rows = db.connection().execute(
+        "SELECT id, name, reservation_time, party_size, outside FROM reservations "
+        "WHERE id > ? ORDER BY id LIMIT ?",
+        (int(cursor or 0), fetch_limit(max_rows))
+    ).fetchall()
+
+    return render_rows(
+        (
+            (id_, {"name": name, "reservation_time": format_epoch(reservation_time),
+                   "party_size": party_size, "outside": bool(outside)})
+            for id_, name, reservation_time, party_size, outside in rows
+        ),
+        title="All Reservations:",
+        empty="No reservations found.",
+        text_row=lambda r: f"{r['name']} at {r['reservation_time']} for {r['party_size']} people {'outside' if r['outside'] else 'inside'}",
+        output_format=output_format, fields=fields, max_rows=max_rows, max_tokens=max_tokens,
+    )
+
+def _reservation_filters(start, end, name_prefix, outside, table: str = "reservations", seek: bool = False):
+    """
+    Build a WHERE clause that the time and name indexes can serve. With
+    `seek` the lower bound of the leading index column (the name prefix, else
+    start) is left to the caller's cursor condition, so the index seeks to it.
+    """
+    clauses, params = [], []
+    if start is not None and not (seek and not name_prefix):
+        clauses.append(f"{table}.reservation_time >= ?")
+        params.append(to_epoch(start))
+    if end is not None:
+        clauses.append(f"{table}.reservation_time < ?")
+        params.append(to_epoch(end))
+    if name_prefix:
+        # A range instead of LIKE so the (case-sensitive) name index is used
+        if not seek:
+            clauses.append(f"{table}.name >= ?")
+            params.append(name_prefix)
+        clauses.append(f"{table}.name < ?")
+        params.append(name_prefix[:-1] + chr(ord(name_prefix[-1]) + 1))
+    if outside is not None:
+        # With a name prefix, keep the planner on the name index ("+" hides outside from the area index)
+        clauses.append(f"+{table}.outside = ?" if name_prefix else f"{table}.outside = ?")
+        params.append(outside)
+    return clauses, params
+
+@db_tool(mcp)
+@cached(cache, {"reservations"})
+def find_reservations(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    name_prefix: str | None = None,
+    outside: bool | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> str:
+    """
+    Find reservations in a time window [start, end), optionally filtered by
+    a case-sensitive name prefix and inside/outside seating. Results are
+    ordered by time (by name, then time, when filtering by name prefix) and
+    paginated: pass the returned cursor to get the next page.
+    """
+    limit = max(1, min(limit, 200))
+    # Page in the order of the index that serves the query, so a page never
+    # sorts all matches: (name, reservation_time) for prefixes, else reservation_time
+    key = ["name", "reservation_time", "id"] if name_prefix else ["reservation_time", "id"]
+    after = None
+    if cursor:
+        try:
+            after = json.loads(cursor)
+        except ValueError:
+            pass
+        # The cursor replaces the lower bound of the window, so it must not lie below it
+        if not isinstance(after, list) or len(after) != len(key) or (
+            not (isinstance(after[0], str) and after[0] >= name_prefix) if name_prefix
+            else not isinstance(after[0], (int, str))
+            or start is not None and isinstance(after[0], int) and after[0] < to_epoch(start)
+        ):
+            return f"Invalid cursor: {cursor!r}. Pass the cursor returned by the previous call with the same filters."
+    clauses, params = _reservation_filters(start, end, name_prefix, outside, seek=after is not None)
+    if after is not None:
+        # A row value the index can seek to, also for times stored as text
+        clauses.append(f"({', '.join(key)}) > ({', '.join('?' * len(key))})")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = db.connection().execute(
+        f"SELECT id, name, reservation_time, party_size, outside FROM reservations {where} "
+        f"ORDER BY {', '.join(key)} LIMIT ?",
+        (*params, limit + 1)
+    ).fetchall()
 
     if not rows:
         return "No reservations found."
 
-    result = ["All Reservations:"]
-    for row in rows:
-        name, reservation_time, party_size, outside = row
-        result.append(f"{name} at {reservation_time} for {party_size} people {'outside' if outside else 'inside'}")
-    
+    result = ["Reservations:"]
+    for _, name, reservation_time, party_size, outside_seat in rows[:limit]:
+        result.append(f"{name} at {format_epoch(reservation_time)} for {party_size} people {'outside' if outside_seat else 'inside'}")
+    if len(rows) > limit:
+        last_id, last_name, last_time, _, _ = rows[limit - 1]
+        # JSON keeps the stored types, also for times written outside the tools (text)
+        last = {"id": last_id, "name": last_name, "reservation_time": last_time}
+        result.append(f"More results available, next cursor: {json.dumps([last[k] for k in key])}")
+
     return "\n".join(result)
 
+@db_tool(mcp)
+@cached(cache, {"reservations"})
+def count_reservations(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    name_prefix: str | None = None,
+    outside: bool | None = None,
+) -> str:
+    """Count reservations matching the same filters as find_reservations."""
+    clauses, params = _reservation_filters(start, end, name_prefix, outside)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    (count,) = db.connection().execute(
+        f"SELECT COUNT(*) FROM reservations {where}", params
+    ).fetchone()
+    return f"{count} reservations found."
+
+@db_tool(mcp)
+@cached(cache, {"reservations"})
+def check_availability(reservation_time: datetime, party_size: int, outside: bool = False) -> str:
+    """Check whether a party fits inside or outside for a reservation starting at the given time."""
+    if party_size < 1:
+        return f"Not available: invalid party size {party_size}."
+    epoch = to_epoch(reservation_time)
+    conn = db.connection()
+    area = AREAS[outside]["name"]
+    free = free_tables(conn, epoch, outside)
+    if is_available(conn, epoch, party_size, outside):
+        return f"Available: {free} of {AREAS[outside]['tables']} {area} tables are free at {format_epoch(epoch)} for {SLOT_MINUTES} minutes."
+    return f"Not available: only {free} {area} tables are free at {format_epoch(epoch)}, not enough for {party_size} people."
+
+@db_tool(mcp)
+@cached(cache, {"reservations"})
+def find_next_free_slot(party_size: int, after: datetime, outside: bool = False, horizon_hours: int = 24) -> str:
+    """Find the earliest reservation time at or after the given time where the party fits."""
+    if party_size < 1:
+        return f"No free slot for {party_size} people: invalid party size."
+    start = next_free_slot(db.connection(), to_epoch(after), party_size, outside, horizon_hours=horizon_hours)
+    area = AREAS[outside]["name"]
+    if start is None:
+        return f"No free {area} slot for {party_size} people within {horizon_hours} hours after {format_epoch(to_epoch(after))}."
+    return f"Next free {area} slot for {party_size} people: {format_epoch(start)}."
+
+# --- Cross-database tools (reservations joined with loyalty customers) ---
+# Not cached: the result cache only tracks changes to the reservations table.
+
+@db_tool(mcp)
+def find_reservations_with_loyalty(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    name_prefix: str | None = None,
+    limit: int = 20,
+) -> str:
+    """
+    Find reservations in a time window [start, end) together with each
+    guest's loyalty points and address, if the guest is a loyalty customer.
+    """
+    limit = max(1, min(limit, 200))
+    clauses, params = _reservation_filters(start, end, name_prefix, None, table="r")
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = joined.connection().execute(
+        f"""
+        SELECT r.name, r.reservation_time, r.party_size, r.outside, c.loyalty_points, c.address
+        FROM reservations r LEFT JOIN loyalty.customers c ON c.name = r.name
+        {where}
+        ORDER BY r.reservation_time, r.id LIMIT ?
+        """,
+        (*params, limit)
+    ).fetchall()
+
+    if not rows:
+        return "No reservations found."
+
+    result = ["Reservations:"]
+    for name, reservation_time, party_size, outside, loyalty_points, address in rows:
+        member = f"Loyalty Points: {loyalty_points}, Address: {address}" if loyalty_points is not None else "not a loyalty customer"
+        result.append(f"{name} at {format_epoch(reservation_time)} for {party_size} people {'outside' if outside else 'inside'}, {member}")
+    return "\n".join(result)
+
+@db_tool(mcp)
+def book_top_customers(reservation_time: datetime, count: int = 1, party_size: int = 2, outside: bool = False) -> str:
+    """
+    Reserve a table at the given time for each of the `count` customers with
+    the most loyalty points, subject to the usual capacity check.
+    """
+    if count < 1:
+        return f"Cannot book the top {count} customers: count must be at least 1."
+    top = joined.connection().execute(
+        "SELECT name, loyalty_points FROM loyalty.customers ORDER BY loyalty_points DESC LIMIT ?",
+        (count,)
+    ).fetchall()
+    if not top:
+        return "No loyalty customers found."
+
+    with _write_transaction() as cur:
+        rows, rejected = _insert_checked(
+            cur, [Reservation(name=name, reservation_time=reservation_time, party_size=party_size, outside=outside)
+                  for name, _ in top]
+        )
+    reasons = dict(rejected)
+    lines = [f"Booked {len(rows)} of the top {len(top)} customers at {format_epoch(to_epoch(reservation_time))}:"]
+    for i, (name, loyalty_points) in enumerate(top):
+        status = f"not booked, {reasons[i]}" if i in reasons else "booked"
+        lines.append(f"{name} ({loyalty_points} points): {status}")
+    return "\n".join(lines)
+
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    run_server(mcp, default_port=8001)
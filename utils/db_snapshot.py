@@ -0,0 +1,72 @@
+import argparse
+import os
+import sqlite3
+
+# Change counters that caches use to detect writes
+VERSION_TABLES = ("reservations_version", "customers_version")
+
+
+def _counters(conn) -> dict:
+    counters = {}
+    for table in VERSION_TABLES:
+        try:
+            (counters[table],) = conn.execute(f"SELECT version FROM {table}").fetchone()
+        except sqlite3.OperationalError:
+            pass  # not part of this database
+    return counters
+
+
+def snapshot_db(path: str, snapshot_path: str):
+    """
+    Write a consistent copy of the database at `path` to `snapshot_path`
+    using SQLite's online backup API, so it is safe while servers are running.
+    """
+    os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+    src = sqlite3.connect(path)
+    dst = sqlite3.connect(snapshot_path)
+    try:
+        src.backup(dst)
+    finally:
+        dst.close()
+        src.close()
+
+
+def restore_db(path: str, snapshot_path: str):
+    """
+    Replace the contents of the database at `path` with `snapshot_path`.
+
+    The backup API copies pages into the live database, so open connections
+    (MCP servers, DataFrame loaders) keep working and see the restored data.
+    Change counters are moved past their pre-restore values by more than the
+    table has rows, so caches keyed on them cannot mistake restored data for
+    what they already hold, nor for a few appended rows (see TableLoader).
+    """
+    if not os.path.exists(snapshot_path):
+        raise FileNotFoundError(f"No snapshot at {snapshot_path}")
+    dst = sqlite3.connect(path)
+    src = sqlite3.connect(snapshot_path)
+    try:
+        before = _counters(dst)
+        src.backup(dst)
+        after = _counters(dst)
+        for table, version in after.items():
+            (rows,) = dst.execute(f"SELECT count(*) FROM {table.removesuffix('_version')}").fetchone()
+            dst.execute(f"UPDATE {table} SET version = ?", (max(version, before.get(table, 0)) + rows + 1,))
+        dst.commit()
+    finally:
+        src.close()
+        dst.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snapshot or restore a demo database.")
+    parser.add_argument("action", choices=["snapshot", "restore"])
+    parser.add_argument("database", help="e.g. utils/booking.db")
+    parser.add_argument("snapshot", help="e.g. utils/snapshots/booking-1m.db")
+    args = parser.parse_args()
+
+    if args.action == "snapshot":
+        snapshot_db(args.database, args.snapshot)
+    else:
+        restore_db(args.database, args.snapshot)
+    print(f"{args.action.capitalize()} done: {args.database} {'->' if args.action == 'snapshot' else '<-'} {args.snapshot}")
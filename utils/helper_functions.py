@@ -1,3 +1,4 @@
+import os
 import logging
 import sqlite3
 import pandas as pd
@@ -15,6 +16,9 @@ from langchain_core.tools import BaseTool, tool as create_tool
 from langchain_core.runnables import RunnableConfig
 from langgraph.types import interrupt 
 from langgraph.prebuilt.interrupt import HumanInterruptConfig, HumanInterrupt
+from utils.reservation_time import TIMEZONE, to_epoch
+from utils.table_loader import TableLoader
+from utils.db_snapshot import restore_db
 
 logging.getLogger('httpx').setLevel(logging.WARNING)
 logging.getLogger('httpcore').setLevel(logging.WARNING)
@@ -29,33 +33,60 @@ def get_current_time() -> str:
     formatted = now.strftime("%A, %B %d, %Y at %H:%M")
     return f"It is currently {formatted}."
 
-def list_reservations_df():
-    conn = sqlite3.connect("utils/booking.db")
-    df = pd.read_sql(
-        "SELECT id, name, reservation_time, party_size, outside FROM reservations",
-        conn
+def _decode_reservation_time(df):
+    # Stored as UTC epoch seconds: one vectorized cast, shown in local time
+    df["reservation_time"] = (
+        pd.to_datetime(df["reservation_time"].astype("int64"), unit="s", utc=True)
+        .dt.tz_convert(TIMEZONE)
+        .dt.tz_localize(None)
     )
-    conn.close()
-    if not df.empty and not "Eve" in df["name"].values:
-        df["reservation_time"] = pd.to_datetime(df["reservation_time"], format='mixed')
-        df["outside"] = df["outside"].astype(bool)
     return df
 
-def list_customers_df():
-    conn = sqlite3.connect("utils/loyalty.db")
-    df = pd.read_sql(
-        "SELECT name, address, loyalty_points FROM customers",
-        conn
-    )
-    conn.close()
-    if not df.empty:
-        df["loyalty_points"] = df["loyalty_points"].astype(int)
-    return df
+_reservations = TableLoader(
+    "utils/booking.db", "reservations",
+    dtypes={"id": "int64", "name": "str", "reservation_time": "int64", "party_size": "int64", "outside": "bool"},
+    version_table="reservations_version",
+    decode=_decode_reservation_time,
+)
+
+_customers = TableLoader(
+    "utils/loyalty.db", "customers",
+    dtypes={"id": "int64", "name": "str", "address": "str", "loyalty_points": "int64"},
+    version_table="customers_version",
+    columns=["name", "address", "loyalty_points"],
+)
+
+def list_reservations_df(dtype_backend: str | None = None):
+    """
+    All reservations as a DataFrame. Repeated calls only read what changed;
+    pass dtype_backend="pyarrow" for Arrow-backed columns.
+    """
+    return _reservations.load(dtype_backend)
+
+def list_customers_df(dtype_backend: str | None = None):
+    """
+    All customers as a DataFrame. Repeated calls only read what changed;
+    pass dtype_backend="pyarrow" for Arrow-backed columns.
+    """
+    return _customers.load(dtype_backend)
+
+def iter_reservations_df(chunksize: int = 100_000, dtype_backend: str | None = None):
+    """Yield all reservations in DataFrame chunks, for tables too large to load at once."""
+    return _reservations.iter_chunks(chunksize, dtype_backend)
+
+def iter_customers_df(chunksize: int = 100_000, dtype_backend: str | None = None):
+    """Yield all customers in DataFrame chunks, for tables too large to load at once."""
+    return _customers.iter_chunks(chunksize, dtype_backend)
 
-def restore_booking_db():
+def restore_booking_db(snapshot: str = "utils/snapshots/booking.db"):
     """
-    Restore the booking database to its original state
+    Restore the booking database to its original state, or to any other
+    snapshot taken with utils/db_snapshot.py
     """
+    if os.path.exists(snapshot):
+        restore_db("utils/booking.db", snapshot)
+        return
+    # Databases set up before snapshots existed: re-seed the rows
     conn = sqlite3.connect("utils/booking.db")
     cur = conn.cursor()
     cur.execute("DELETE FROM reservations")  # Clear existing data
@@ -63,19 +94,24 @@ def restore_booking_db():
     cur.executemany(
         "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
         [
-            ("Alice", "2025-06-27 18:30", 2, False),
-            ("Bob",   "2025-06-27 19:00", 4, True),
-            ("Carol", "2025-06-28 12:30", 3, False),
-            ("Dave",  "2025-06-26 20:00", 5, True),
+            ("Alice", to_epoch("2025-06-27 18:30"), 2, False),
+            ("Bob",   to_epoch("2025-06-27 19:00"), 4, True),
+            ("Carol", to_epoch("2025-06-28 12:30"), 3, False),
+            ("Dave",  to_epoch("2025-06-26 20:00"), 5, True),
         ]
     )
     conn.commit()
     conn.close()
 
-def restore_loyalty_db():
+def restore_loyalty_db(snapshot: str = "utils/snapshots/loyalty.db"):
     """
-    Restore the loyalty database to its original state
+    Restore the loyalty database to its original state, or to any other
+    snapshot taken with utils/db_snapshot.py
     """
+    if os.path.exists(snapshot):
+        restore_db("utils/loyalty.db", snapshot)
+        return
+    # Databases set up before snapshots existed: re-seed the rows
     conn = sqlite3.connect("utils/loyalty.db")
     cur = conn.cursor()
     cur.execute("DELETE FROM customers")  # Clear existing data
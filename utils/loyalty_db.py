@@ -1,9 +1,19 @@
 import os
 import sqlite3
 
+try:
+    from utils.db_snapshot import snapshot_db
+except ImportError:  # started as `python utils/loyalty_db.py`
+    from db_snapshot import snapshot_db
+
+DB_PATH = "utils/loyalty.db"
+# Pristine copy taken right after setup, used by restore_loyalty_db()
+SNAPSHOT_PATH = "utils/snapshots/loyalty.db"
+
 # --- One-time DB setup ---
-if not os.path.exists("utils/loyalty.db"):
-    conn = sqlite3.connect("utils/loyalty.db")
+created = not os.path.exists(DB_PATH)
+if created:
+    conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
 
     # Create a simple customers table: name, address, loyalty_points
@@ -29,4 +39,76 @@ if not os.path.exists("utils/loyalty.db"):
     conn.commit()
     conn.close()
 
-# -------------------------
\ No newline at end of file
+# --- Migrations (also bring databases created by older versions up to date) ---
+conn = sqlite3.connect(DB_PATH)
+cur = conn.cursor()
+(version,) = cur.execute("PRAGMA user_version").fetchone()
+
+if version < 1:
+    # v1: index for top_customers / zero_loyalty_customers, plus a change
+    # counter that lets the loyalty server keep its cached results in sync
+    cur.executescript("""
+    BEGIN;
+    CREATE INDEX IF NOT EXISTS idx_customers_points ON customers (loyalty_points);
+
+    CREATE TABLE IF NOT EXISTS customers_version (version INTEGER NOT NULL);
+    INSERT INTO customers_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM customers_version);
+
+    CREATE TRIGGER IF NOT EXISTS customers_version_insert AFTER INSERT ON customers
+    BEGIN UPDATE customers_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS customers_version_delete AFTER DELETE ON customers
+    BEGIN UPDATE customers_version SET version = version + 1; END;
+    CREATE TRIGGER IF NOT EXISTS customers_version_update AFTER UPDATE OF name, loyalty_points ON customers
+    BEGIN UPDATE customers_version SET version = version + 1; END;
+
+    PRAGMA user_version = 1;
+    COMMIT;
+    """)
+
+if version < 2:
+    # v2: trigram full-text index over name and address for search_customers,
+    # kept in sync with the customers table by triggers
+    cur.executescript("""
+    BEGIN;
+    CREATE VIRTUAL TABLE IF NOT EXISTS customers_fts USING fts5(
+        name, address, content='customers', content_rowid='id', tokenize='trigram'
+    );
+    INSERT INTO customers_fts (customers_fts) VALUES ('rebuild');
+
+    CREATE TRIGGER IF NOT EXISTS customers_fts_insert AFTER INSERT ON customers
+    BEGIN
+        INSERT INTO customers_fts (rowid, name, address) VALUES (new.id, new.name, new.address);
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_fts_delete AFTER DELETE ON customers
+    BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+    END;
+    CREATE TRIGGER IF NOT EXISTS customers_fts_update AFTER UPDATE OF name, address ON customers
+    BEGIN
+        INSERT INTO customers_fts (customers_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+        INSERT INTO customers_fts (rowid, name, address) VALUES (new.id, new.name, new.address);
+    END;
+
+    PRAGMA user_version = 2;
+    COMMIT;
+    """)
+
+if version < 3:
+    # v3: count every UPDATE, not just name/loyalty_points changes, so cached
+    # reads (tool cache, table loader) also see address changes
+    cur.executescript("""
+    BEGIN;
+    DROP TRIGGER IF EXISTS customers_version_update;
+    CREATE TRIGGER customers_version_update AFTER UPDATE ON customers
+    BEGIN UPDATE customers_version SET version = version + 1; END;
+
+    PRAGMA user_version = 3;
+    COMMIT;
+    """)
+
+conn.close()
+
+if created:
+    snapshot_db(DB_PATH, SNAPSHOT_PATH)
+
+# -------------------------
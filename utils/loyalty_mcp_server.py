@@ -1,91 +1,257 @@
 import sqlite3
 import os
+import re
+import json
+import atexit
 from datetime import datetime
+from pydantic import BaseModel
 from mcp.server.fastmcp import FastMCP
 
+try:
+    from utils.sqlite_pool import get_pool
+    from utils.async_tools import db_tool
+    from utils.tool_cache import ToolCache, cached
+    from utils.server_cli import run_server
+    from utils.write_queue import GroupCommitQueue
+    from utils.tool_output import OutputFormat, fetch_limit, render_rows
+    from utils.tool_metrics import register_resource
+except ImportError:  # started as `python utils/loyalty_mcp_server.py`
+    from sqlite_pool import get_pool
+    from async_tools import db_tool
+    from tool_cache import ToolCache, cached
+    from server_cli import run_server
+    from write_queue import GroupCommitQueue
+    from tool_output import OutputFormat, fetch_limit, render_rows
+    from tool_metrics import register_resource
+
+DB_PATH = os.getenv("LOYALTY_DB_PATH", "utils/loyalty.db")
+db = get_pool(DB_PATH)
+
+def _customers_version(cur) -> int:
+    """Change counter maintained by triggers on the customers table."""
+    (version,) = cur.execute("SELECT version FROM customers_version").fetchone()
+    return version
+
+# Results of the read-only tools, tagged "customers" (whole-table reads)
+# or "customer:<name>" (single-customer reads)
+cache = ToolCache(db, "SELECT version FROM customers_version")
+
+def _committed(version: int, changes: list):
+    """Propagate committed (name, points) changes to the result cache."""
+    cache.invalidate({"customers", *(f"customer:{name}" for name, _ in changes)}, version, len(changes))
+
+# Point updates from concurrent sessions go through one writer thread that
+# group-commits them, instead of every call competing for the write lock.
+# Updates queued while a commit runs form the next batch, so by default the
+# writer never waits for more (LOYALTY_WRITE_LATENCY_MS lingers on slow disks).
+points_writer = GroupCommitQueue(
+    db,
+    max_batch=int(os.getenv("LOYALTY_WRITE_BATCH", "256")),
+    max_latency=float(os.getenv("LOYALTY_WRITE_LATENCY_MS", "0")) / 1000,
+    before_commit=lambda cur, changes: (_customers_version(cur), [c for c in changes if c is not None]),
+    after_commit=lambda state: _committed(*state),
+)
+
+atexit.register(points_writer.close)
+
+def _update_points(name: str, sql: str, params: tuple):
+    """Queue a point update for one customer; returns (name, new points) or None if not found."""
+    def op(cur):
+        rows = cur.execute(sql, params).fetchall()
+        return (name, rows[0][0]) if rows else None
+    return points_writer.submit(op).result()
+
 # Initialize the MCP server
 mcp = FastMCP("LoyaltyDB")
 
-@mcp.tool()
+@mcp.resource("stats://cache")
+def cache_stats() -> str:
+    """Hit/miss counters of the read-tool result cache."""
+    return json.dumps(cache.stats())
+
+register_resource(mcp)
+
+@db_tool(mcp)
 def add_customer(name: str, address: str, loyalty_points: int = 0) -> str:
     """Add a customer to the loyalty database."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO customers (name, address, loyalty_points) VALUES (?, ?, ?)",
-            (name, address, loyalty_points)
-        )
-        conn.commit()
-        return f"Customer {name} added successfully."
+        with db.transaction() as cur:
+            cur.execute(
+                "INSERT INTO customers (name, address, loyalty_points) VALUES (?, ?, ?)",
+                (name, address, loyalty_points)
+            )
+            version = _customers_version(cur)
     except sqlite3.IntegrityError:
         return f"Customer with name {name} already exists."
-    finally:
-        conn.close()
-
-@mcp.tool()
-def list_customers() -> str:
-    """List all customers in the loyalty database."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name, address, loyalty_points FROM customers")
-    rows = cur.fetchall()
-    conn.close()
+    _committed(version, [(name, loyalty_points)])
+    return f"Customer {name} added successfully."
+
+def _customer_line(row: dict) -> str:
+    return f"{row['name']}, Address: {row['address']}, Loyalty Points: {row['loyalty_points']}"
+
+@db_tool(mcp)
+@cached(cache, {"customers"})
+def list_customers(
+    output_format: OutputFormat = "text",
+    fields: list[str] | None = None,
+    max_rows: int | None = None,
+    max_tokens: int | None = None,
+    cursor: str | None = None,
+) -> str:
+    """
+    List all customers in the loyalty database. With max_rows or max_tokens
+    set, long lists stop there; pass the returned cursor to continue.
+    For the most compact output use output_format "tsv" and only the needed
+    fields (name, address, loyalty_points). To find one customer, use
+    search_customers instead.
+    """
+    rows = db.connection().execute(
+        "SELECT id, name, address, loyalty_points FROM customers WHERE id > ? ORDER BY id LIMIT ?",
+        (int(cursor or 0), fetch_limit(max_rows))
+    ).fetchall()
+
+    return render_rows(
+        ((id_, {"name": name, "address": address, "loyalty_points": loyalty_points})
+         for id_, name, address, loyalty_points in rows),
+        title="Customers:",
+        empty="No customers found.",
+        text_row=_customer_line,
+        output_format=output_format, fields=fields, max_rows=max_rows, max_tokens=max_tokens,
+    )
+
+def _search(conn, match: str, query: str, limit: int) -> list:
+    """FTS matches for `match`: a name equal to `query` first, then names starting with it, then by bm25."""
+    prefix = re.sub(r"([%_\\])", r"\\\1", query.strip()) + "%"
+    return conn.execute(
+        """
+        SELECT c.name, c.address, c.loyalty_points
+        FROM customers_fts JOIN customers c ON c.id = customers_fts.rowid
+        WHERE customers_fts MATCH ?
+        ORDER BY c.name = ? COLLATE NOCASE DESC, c.name LIKE ? ESCAPE '\\' DESC, bm25(customers_fts, 10.0, 1.0)
+        LIMIT ?
+        """,
+        (match, query.strip(), prefix, limit)
+    ).fetchall()
+
+def _trigram_score(row, trigrams: set) -> int:
+    """Query trigrams found in the name (counted twice) and the address."""
+    name, address = row[0].casefold(), (row[1] or "").casefold()
+    return sum(2 * (t in name) + (t in address) for t in trigrams)
+
+@db_tool(mcp)
+@cached(cache, {"customers"})
+def search_customers(query: str, limit: int = 5) -> str:
+    """
+    Find customers whose name or address resembles `query` (e.g. "Mr. Mustermann"),
+    best matches first. Use it to look up the exact customer name instead of
+    listing all customers.
+    """
+    # The trigram index matches substrings of 3+ characters, case-insensitively
+    words = [w for w in re.findall(r"\w+", query) if len(w) >= 3]
+    if not words:
+        return "Search query needs at least one word of 3 or more letters."
+
+    conn = db.connection()
+    phrases = [f'"{w}"' for w in words]
+    # All words first (selective), then any word
+    rows = _search(conn, " AND ".join(phrases), query, limit)
+    if not rows and len(phrases) > 1:
+        rows = _search(conn, " OR ".join(phrases), query, limit)
+    if not rows:
+        # Nothing contains any word verbatim: rank by shared trigrams to catch
+        # typos, and drop candidates that only share a few ("Mustremann" and
+        # "Street" both contain "str")
+        trigrams = {w.casefold()[i:i + 3] for w in words for i in range(len(w) - 2)}
+        candidates = _search(conn, " OR ".join(f'"{t}"' for t in sorted(trigrams)), query, limit * 10)
+        scored = sorted(((_trigram_score(row, trigrams), row) for row in candidates), key=lambda x: -x[0])
+        best = scored[0][0] if scored else 0
+        rows = [row for score, row in scored if score * 2 >= best][:limit]
 
     if not rows:
-        return "No customers found."
+        return f"No customers matching {query}."
 
-    result = ["Customers:"]
-    for row in rows:
-        name, address, loyalty_points = row
+    result = [f"Customers matching {query}:"]
+    for name, address, loyalty_points in rows:
         result.append(f"{name}, Address: {address}, Loyalty Points: {loyalty_points}")
-    
     return "\n".join(result)
 
-@mcp.tool()
+@db_tool(mcp)
 def increase_loyalty_points(name: str, points: int) -> str:
     """Increase loyalty points for a customer."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ?", (points, name))
-    if cur.rowcount == 0:
+    change = _update_points(
+        name, "UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ? RETURNING loyalty_points", (points, name)
+    )
+    if change is None:
         return f"No customer found with name {name}."
-    conn.commit()
-    conn.close()
     return f"Loyalty points increased by {points} for customer {name}."
 
-@mcp.tool()
+@db_tool(mcp)
 def decrease_loyalty_points(name: str, points: int) -> str:
     """Decrease loyalty points for a customer."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("UPDATE customers SET loyalty_points = loyalty_points - ? WHERE name = ?", (points, name))
-    if cur.rowcount == 0:
+    change = _update_points(
+        name, "UPDATE customers SET loyalty_points = loyalty_points - ? WHERE name = ? RETURNING loyalty_points", (points, name)
+    )
+    if change is None:
         return f"No customer found with name {name}."
-    conn.commit()
-    conn.close()
     return f"Loyalty points decreased by {points} for customer {name}."
 
-@mcp.tool()
+@db_tool(mcp)
 def set_loyalty_points(name: str, points: int) -> str:
     """Set loyalty points for a customer."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("UPDATE customers SET loyalty_points = ? WHERE name = ?", (points, name))
-    if cur.rowcount == 0:
+    change = _update_points(
+        name, "UPDATE customers SET loyalty_points = ? WHERE name = ? RETURNING loyalty_points", (points, name)
+    )
+    if change is None:
         return f"No customer found with name {name}."
-    conn.commit()
-    conn.close()
     return f"Loyalty points set to {points} for customer {name}."
 
-@mcp.tool()
+class PointsAdjustment(BaseModel):
+    name: str
+    delta: int
+
+def _select_in(cur, sql: str, values: list, chunk: int = 500) -> list:
+    """Run `sql` (containing one `IN ({})`) over `values` in chunks below SQLite's variable limit."""
+    rows = []
+    for i in range(0, len(values), chunk):
+        part = values[i:i + chunk]
+        rows.extend(cur.execute(sql.format(", ".join("?" * len(part))), part).fetchall())
+    return rows
+
+@db_tool(mcp)
+def adjust_loyalty_points_batch(adjustments: list[PointsAdjustment]) -> str:
+    """
+    Add (positive delta) or remove (negative delta) loyalty points for many
+    customers in one transaction. Several entries for the same customer are
+    summed; unknown customers are reported by their index in the list.
+    """
+    deltas = {}
+    for a in adjustments:
+        deltas[a.name] = deltas.get(a.name, 0) + a.delta
+    with db.transaction() as cur:
+        known = {name for (name,) in _select_in(cur, "SELECT name FROM customers WHERE name IN ({})", list(deltas))}
+        cur.executemany(
+            "UPDATE customers SET loyalty_points = loyalty_points + ? WHERE name = ?",
+            [(delta, name) for name, delta in deltas.items() if name in known]
+        )
+        changes = _select_in(cur, "SELECT name, loyalty_points FROM customers WHERE name IN ({})", list(known))
+        version = _customers_version(cur)
+    _committed(version, changes)
+
+    rejected = [i for i, a in enumerate(adjustments) if a.name not in known]
+    lines = [f"Adjusted loyalty points for {len(known)} customers ({len(adjustments)} entries)."]
+    if rejected:
+        shown = ", ".join(f"#{i} {adjustments[i].name}" for i in rejected[:20])
+        more = f" and {len(rejected) - 20} more" if len(rejected) > 20 else ""
+        lines.append(f"No customer found for: {shown}{more}.")
+    return "\n".join(lines)
+
+@db_tool(mcp)
+@cached(cache, lambda name: {f"customer:{name}"})
 def get_loyalty_points(name: str) -> str:
     """Get the loyalty points for a customer."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("SELECT loyalty_points FROM customers WHERE name = ?", (name,))
-    row = cur.fetchone()
-    conn.close()
+    row = db.connection().execute(
+        "SELECT loyalty_points FROM customers WHERE name = ?", (name,)
+    ).fetchone()
 
     if row is None:
         return f"No customer found with name {name}."
@@ -93,33 +259,56 @@ def get_loyalty_points(name: str) -> str:
     loyalty_points = row[0]
     return f"Customer {name} has {loyalty_points} loyalty points."
 
-@mcp.tool()
-def top_customers(limit: int = 5) -> str:
-    """List the top customers by loyalty points."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name, address, loyalty_points FROM customers ORDER BY loyalty_points DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
+@db_tool(mcp)
+@cached(cache, {"customers"})
+def top_customers(
+    limit: int = 5,
+    output_format: OutputFormat = "text",
+    fields: list[str] | None = None,
+    max_tokens: int | None = None,
+    cursor: str | None = None,
+) -> str:
+    """
+    List the top customers by loyalty points, `limit` at a time; pass the
+    returned cursor to get the next ones. output_format "tsv" with a subset
+    of the fields (rank, name, address, loyalty_points) is the most compact.
+    """
+    offset = int(cursor or 0)
+    # Walks the loyalty_points index from the top; ties are ordered by name
+    ranked = db.connection().execute(
+        "SELECT name, address, loyalty_points FROM customers ORDER BY loyalty_points DESC, name LIMIT ? OFFSET ?",
+        (fetch_limit(limit), offset)
+    ).fetchall()
 
-    if not rows:
-        return "No customers found."
+    return render_rows(
+        ((offset + i + 1, {"rank": offset + i + 1, "name": name, "address": address, "loyalty_points": points})
+         for i, (name, address, points) in enumerate(ranked)),
+        title="Top Customers:",
+        empty="No customers found.",
+        text_row=_customer_line,
+        output_format=output_format, fields=fields, max_rows=limit, max_tokens=max_tokens,
+    )
 
-    result = ["Top Customers:"]
-    for row in rows:
-        name, address, loyalty_points = row
-        result.append(f"{name}, Address: {address}, Loyalty Points: {loyalty_points}")
-    
-    return "\n".join(result)
+@db_tool(mcp)
+@cached(cache, {"customers"})
+def customer_rank(name: str) -> str:
+    """Get a customer's rank in the loyalty program (1 = most points)."""
+    conn = db.connection()
+    row = conn.execute("SELECT COALESCE(loyalty_points, 0) FROM customers WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return f"No customer found with name {name}."
+    # Ties share a rank; the count is a range scan of the loyalty_points index
+    (ahead,) = conn.execute("SELECT COUNT(*) FROM customers WHERE loyalty_points > ?", row).fetchone()
+    (total,) = conn.execute("SELECT COUNT(*) FROM customers").fetchone()
+    return f"Customer {name} is ranked #{ahead + 1} of {total} customers."
 
-@mcp.tool()
+@db_tool(mcp)
+@cached(cache, {"customers"})
 def zero_loyalty_customers() -> str:
     """List of addresses of customers with zero loyalty points."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM customers WHERE loyalty_points = 0")
-    rows = cur.fetchall()
-    conn.close()
+    rows = db.connection().execute(
+        "SELECT name FROM customers WHERE loyalty_points = 0"
+    ).fetchall()
 
     if not rows:
         return "No customers with zero loyalty points found."
@@ -130,17 +319,16 @@ def zero_loyalty_customers() -> str:
     
     return "\n".join(result)
 
-@mcp.tool()
+@db_tool(mcp)
 def delete_customer(name: str) -> str:
     """Delete a customer from the loyalty database."""
-    conn = sqlite3.connect("utils/loyalty.db")
-    cur = conn.cursor()
-    cur.execute("DELETE FROM customers WHERE name = ?", (name,))
-    if cur.rowcount == 0:
-        return f"No customer found with name {name}."
-    conn.commit()
-    conn.close()
+    with db.transaction() as cur:
+        cur.execute("DELETE FROM customers WHERE name = ?", (name,))
+        if cur.rowcount == 0:
+            return f"No customer found with name {name}."
+        version = _customers_version(cur)
+    _committed(version, [(name, None)])
     return f"Customer {name} deleted successfully."
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
\ No newline at end of file
+    run_server(mcp, default_port=8002)
@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+# Reservation times are stored as integer UTC epoch seconds. Naive inputs
+# are interpreted as local time at the restaurant.
+TIMEZONE = ZoneInfo("Europe/Zurich")
+
+
+def to_epoch(value) -> int:
+    """
+    Normalise a reservation time to integer UTC epoch seconds.
+
+    Accepts datetimes, ISO-8601 strings (with or without seconds, "T" or
+    space separated, optional UTC offset) and numbers that already are epochs.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid reservation time: {value!r}")
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lstrip("-").isdigit():
+            return int(text)
+        try:
+            value = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            raise ValueError(f"Invalid reservation time: {value!r}") from None
+    if not isinstance(value, datetime):
+        raise ValueError(f"Invalid reservation time: {value!r}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=TIMEZONE)
+    return int(value.timestamp())
+
+
+def from_epoch(epoch: int) -> datetime:
+    """Convert stored epoch seconds to a naive local datetime."""
+    return datetime.fromtimestamp(epoch, timezone.utc).astimezone(TIMEZONE).replace(tzinfo=None)
+
+
+def format_epoch(epoch: int) -> str:
+    """Format stored epoch seconds for display, e.g. "2025-06-27 18:30"."""
+    if not isinstance(epoch, int):
+        # Rows written outside the tools are shown as they are stored
+        return str(epoch)
+    return from_epoch(epoch).strftime("%Y-%m-%d %H:%M")
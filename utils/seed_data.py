@@ -0,0 +1,146 @@
+"""
+Fill the demo databases with large amounts of realistic synthetic data for
+load tests. Run the setup scripts first, then e.g. from the repository root:
+
+    python utils/seed_data.py --reservations 1000000 --customers 1000000
+
+Take a snapshot afterwards (utils/db_snapshot.py) so a test run can be reset
+in seconds instead of re-seeding.
+"""
+import argparse
+import itertools
+import math
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+
+try:
+    from utils.reservation_time import to_epoch
+except ImportError:  # started as `python utils/seed_data.py`
+    from reservation_time import to_epoch
+
+FIRST_NAMES = [
+    "Anna", "Luca", "Mia", "Noah", "Lena", "Leon", "Sofia", "Elias", "Laura", "David",
+    "Emma", "Jonas", "Lea", "Finn", "Nina", "Marco", "Sara", "Tim", "Julia", "Jan",
+    "Alice", "Bob", "Carol", "Dave", "Giulia", "Matteo", "Chiara", "Samuel", "Elena", "Nico",
+]
+LAST_NAMES = [
+    "Müller", "Meier", "Schmid", "Keller", "Weber", "Huber", "Schneider", "Meyer", "Steiner", "Fischer",
+    "Gerber", "Brunner", "Baumann", "Frei", "Zimmermann", "Moser", "Widmer", "Wyss", "Graf", "Roth",
+    "Rossi", "Bianchi", "Ferrari", "Romano", "Colombo", "Ricci", "Marino", "Greco", "Bruno", "Gallo",
+]
+STREETS = ["Bahnhofstrasse", "Seestrasse", "Dorfstrasse", "Hauptstrasse", "Kirchweg", "Schulstrasse", "Limmatquai"]
+CITIES = ["Zurich", "Winterthur", "Uster", "Dübendorf", "Dietikon", "Wetzikon", "Kloten", "Baden"]
+
+# Start times in minutes after midnight, 15-minute steps
+LUNCH_SLOTS = list(range(11 * 60 + 30, 14 * 60 + 1, 15))
+DINNER_SLOTS = list(range(17 * 60 + 30, 22 * 60 + 1, 15))
+
+
+def _party_size(rng, mean: float) -> int:
+    """1 + Poisson(mean - 1), capped at 12: mostly couples and small groups."""
+    lam, k, p = max(mean - 1, 0.01), 0, 1.0
+    limit = math.exp(-lam)
+    while True:
+        p *= rng.random()
+        if p <= limit:
+            return min(1 + k, 12)
+        k += 1
+
+
+def generate_reservations(count: int, *, start: date, days: int, lunch_share: float,
+                          weekend_boost: float, party_mean: float, outside_share: float, seed: int):
+    """Yield (name, epoch, party_size, outside) rows."""
+    rng = random.Random(seed)
+    day_list = [start + timedelta(days=i) for i in range(days)]
+    weights = [weekend_boost if d.weekday() >= 4 else 1.0 for d in day_list]  # Fri-Sun
+    midnights = [to_epoch(datetime(d.year, d.month, d.day)) for d in day_list]
+    # Terrace demand follows the seasons, peaking mid-July
+    outside_p = [min(1.0, outside_share * (1 + math.cos(2 * math.pi * (d.timetuple().tm_yday - 196) / 365)))
+                 for d in day_list]
+    for _ in range(count):
+        i = rng.choices(range(days), weights)[0]
+        minutes = rng.choice(LUNCH_SLOTS if rng.random() < lunch_share else DINNER_SLOTS)
+        yield (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            midnights[i] + minutes * 60,
+            _party_size(rng, party_mean),
+            rng.random() < outside_p[i],
+        )
+
+
+def generate_customers(count: int, *, zero_share: float, points_alpha: float, points_scale: int, seed: int):
+    """Yield (name, address, loyalty_points) rows with unique names and Pareto-distributed points."""
+    rng = random.Random(seed)
+    combos = list(itertools.product(FIRST_NAMES, LAST_NAMES))
+    rng.shuffle(combos)
+    for i in range(count):
+        first, last = combos[i % len(combos)]
+        round_ = i // len(combos)
+        name = f"{first} {last}" if round_ == 0 else f"{first} {last} {round_ + 1}"
+        address = f"{rng.choice(STREETS)} {rng.randint(1, 200)}, {rng.choice(CITIES)}"
+        points = 0 if rng.random() < zero_share else int(rng.paretovariate(points_alpha) * points_scale)
+        yield name, address, points
+
+
+def _insert(path: str, sql: str, rows, replace_table: str | None) -> int:
+    """Insert `rows` in one transaction; returns the number of rows actually inserted."""
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA synchronous=OFF")  # bulk load; a crash just means re-seeding
+        conn.execute("PRAGMA cache_size=-200000")
+        with conn:
+            if replace_table:
+                conn.execute(f"DELETE FROM {replace_table}")
+            return conn.executemany(sql, rows).rowcount
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the demo databases with synthetic data.")
+    parser.add_argument("--reservations", type=int, default=0)
+    parser.add_argument("--customers", type=int, default=0)
+    parser.add_argument("--booking-db", default="utils/booking.db")
+    parser.add_argument("--loyalty-db", default="utils/loyalty.db")
+    parser.add_argument("--replace", action="store_true", help="delete existing rows first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--start", type=date.fromisoformat, default=date(2025, 1, 1))
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--lunch-share", type=float, default=0.35)
+    parser.add_argument("--weekend-boost", type=float, default=1.6)
+    parser.add_argument("--party-mean", type=float, default=3.0)
+    parser.add_argument("--outside-share", type=float, default=0.3, help="yearly average, seasonal")
+    parser.add_argument("--zero-share", type=float, default=0.2, help="customers with no points")
+    parser.add_argument("--points-alpha", type=float, default=1.5, help="Pareto shape, smaller = heavier tail")
+    parser.add_argument("--points-scale", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.reservations:
+        inserted = _insert(
+            args.booking_db,
+            "INSERT INTO reservations (name, reservation_time, party_size, outside) VALUES (?, ?, ?, ?)",
+            generate_reservations(
+                args.reservations, start=args.start, days=args.days, lunch_share=args.lunch_share,
+                weekend_boost=args.weekend_boost, party_mean=args.party_mean,
+                outside_share=args.outside_share, seed=args.seed,
+            ),
+            "reservations" if args.replace else None,
+        )
+        print(f"Inserted {inserted} reservations into {args.booking_db}.")
+    if args.customers:
+        # Names are deterministic and unique, so a second run would collide:
+        # existing customers are kept and counted as skipped
+        inserted = _insert(
+            args.loyalty_db,
+            "INSERT OR IGNORE INTO customers (name, address, loyalty_points) VALUES (?, ?, ?)",
+            generate_customers(
+                args.customers, zero_share=args.zero_share, points_alpha=args.points_alpha,
+                points_scale=args.points_scale, seed=args.seed,
+            ),
+            "customers" if args.replace else None,
+        )
+        print(f"Inserted {inserted} customers into {args.loyalty_db}.")
+        if inserted < args.customers:
+            print(f"Skipped {args.customers - inserted} customers whose names already exist; "
+                  "pass --replace to delete the existing rows first.")
@@ -0,0 +1,41 @@
+import argparse
+import os
+
+try:
+    from utils.async_tools import MAX_WORKERS, set_max_workers
+    from utils.tool_metrics import start_export
+except ImportError:  # imported by a server started as `python utils/<name>_mcp_server.py`
+    from async_tools import MAX_WORKERS, set_max_workers
+    from tool_metrics import start_export
+
+
+def run_server(mcp, default_port: int, argv=None):
+    """
+    Start an MCP server over stdio (default, one process per client) or as a
+    long-lived streamable-HTTP server that many agents can share.
+
+    Every option can also be set through the environment: MCP_TRANSPORT,
+    MCP_HOST, MCP_PORT, MCP_DB_WORKERS and MCP_METRICS_FILE.
+    """
+    parser = argparse.ArgumentParser(description=f"{mcp.name} MCP server")
+    parser.add_argument("--transport", choices=["stdio", "streamable-http"],
+                        default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", default_port)))
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help="threads for concurrent database work")
+    parser.add_argument("--stateless", action="store_true",
+                        help="no per-session state, e.g. behind a load balancer")
+    parser.add_argument("--metrics-file", default=os.getenv("MCP_METRICS_FILE"),
+                        help="periodically write tool metrics here (.jsonl: JSON lines, else Prometheus textfile)")
+    parser.add_argument("--metrics-interval", type=float, default=15.0, help="seconds between metrics dumps")
+    args = parser.parse_args(argv)
+
+    set_max_workers(args.workers)
+    if args.metrics_file:
+        start_export(args.metrics_file, args.metrics_interval, labels={"server": mcp.name})
+    if args.transport == "streamable-http":
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        mcp.settings.stateless_http = args.stateless
+    mcp.run(transport=args.transport)
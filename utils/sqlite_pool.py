@@ -0,0 +1,145 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    from utils.tool_metrics import ENABLED as METRICS_ENABLED, InstrumentedConnection, metrics
+except ImportError:  # imported by a script started as `python utils/<name>.py`
+    from tool_metrics import ENABLED as METRICS_ENABLED, InstrumentedConnection, metrics
+
+# Pragmas can be tuned per deployment through environment variables
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # negative = KiB, so ~20 MB
+CACHED_STATEMENTS = int(os.getenv("SQLITE_CACHED_STATEMENTS", "256"))
+
+
+class ConnectionPool:
+    """
+    Long-lived SQLite connections to one database file, one per thread.
+
+    Connections are opened lazily, configured once (WAL journaling, busy
+    timeout, synchronous level, page cache size) and then reused, so a tool
+    call only pays for its statements. sqlite3 keeps a per-connection cache
+    of prepared statements, which is sized by `cached_statements`.
+
+    `attach` maps schema names to further databases attached to every
+    connection, e.g. {"loyalty": "file:/path/loyalty.db?mode=ro"} (URIs allowed).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        busy_timeout_ms: int = BUSY_TIMEOUT_MS,
+        synchronous: str = SYNCHRONOUS,
+        cache_size: int = CACHE_SIZE,
+        cached_statements: int = CACHED_STATEMENTS,
+        attach: dict | None = None,
+    ):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+        self.cache_size = cache_size
+        self.cached_statements = cached_statements
+        self.attach = attach or {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            uri=bool(self.attach),  # lets attached databases be opened read-only
+            factory=InstrumentedConnection if METRICS_ENABLED else sqlite3.Connection,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        conn.execute(f"PRAGMA cache_size={int(self.cache_size)}")
+        for schema, path in self.attach.items():
+            if not schema.isidentifier():
+                raise ValueError(f"Invalid schema name {schema!r}")
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a cursor inside a write transaction.
+
+        The write lock is taken up front (BEGIN IMMEDIATE) so concurrent
+        writers wait on busy_timeout instead of failing on lock upgrade.
+        Commits on success and rolls back on any exception.
+        """
+        conn = self.connection()
+        cur = conn.cursor()
+        start = time.perf_counter()
+        cur.execute("BEGIN IMMEDIATE")
+        if METRICS_ENABLED:
+            metrics.record_lock_wait(time.perf_counter() - start)
+        try:
+            yield cur
+            start = time.perf_counter()
+            conn.commit()
+            if METRICS_ENABLED:
+                metrics.record_sql(time.perf_counter() - start)
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def release(self):
+        """Close the calling thread's connection, e.g. when a worker thread exits."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                if conn in self._connections:
+                    self._connections.remove(conn)
+            conn.close()
+
+    def close(self):
+        """Close every connection opened by this pool."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+            self._local = threading.local()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path: str) -> ConnectionPool:
+    """Return the process-wide pool for `path`, creating it on first use."""
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = ConnectionPool(path)
+        return pool
+
+
+def close_all():
+    """Close all pools, e.g. before replacing a database file on disk."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
@@ -0,0 +1,114 @@
+import sqlite3
+import threading
+
+import pandas as pd
+
+
+class TableLoader:
+    """
+    Keeps the last DataFrame read from a table and refreshes it incrementally.
+
+    PRAGMA data_version tells whether any other connection committed since the
+    last load; if not, the cached frame is returned without touching the
+    table. Otherwise rows with an id above the cached maximum are fetched, and
+    if the table's trigger-maintained change counter moved by exactly that many
+    rows, nothing but inserts happened and they are appended. Any update or
+    delete falls back to a full reload, so the counter must move on every
+    INSERT, UPDATE and DELETE, whichever columns they touch.
+
+    Columns are cast to declared dtypes rather than left to inference,
+    optionally as Arrow-backed columns (dtype_backend="pyarrow", needs pyarrow).
+    """
+
+    def __init__(self, path: str, table: str, dtypes: dict, version_table: str,
+                 columns: list | None = None, decode=None):
+        self.path = path
+        self.table = table
+        self.dtypes = dtypes  # includes the integer "id" key column
+        self.version_table = version_table
+        self.columns = columns or list(dtypes)
+        self.decode = decode  # applied to every typed frame, e.g. epoch -> datetime
+        self._conn = None
+        self._lock = threading.Lock()
+        self._frame = None
+        self._backend = None
+        self._data_version = None
+        self._version = None
+        self._max_id = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        return self._conn
+
+    def _dtypes(self, dtype_backend):
+        if dtype_backend == "pyarrow":
+            return {col: "string[pyarrow]" if dtype == "str" else f"{dtype}[pyarrow]"
+                    for col, dtype in self.dtypes.items()}
+        return self.dtypes
+
+    def _read(self, conn, where: str = "", params=(), dtype_backend=None, chunksize=None):
+        sql = f"SELECT {', '.join(self.dtypes)} FROM {self.table} {where} ORDER BY id"
+        kwargs = {"dtype_backend": dtype_backend} if dtype_backend else {}
+        return pd.read_sql(sql, conn, params=params, chunksize=chunksize, **kwargs)
+
+    def _finish(self, frame, dtype_backend):
+        """Cast to the declared dtypes and decode; ValueError if stored values do not fit."""
+        for col, dtype in self.dtypes.items():
+            # SQLite is dynamically typed: text in a numeric column shows up as strings
+            if dtype != "str" and len(frame) and not pd.api.types.is_numeric_dtype(frame[col]):
+                raise ValueError(f"Non-numeric values in {self.table}.{col}")
+        frame = frame.astype(self._dtypes(dtype_backend))
+        if self.decode is not None:
+            frame = self.decode(frame)
+        return frame
+
+    def _table_version(self, conn):
+        try:
+            (version,) = conn.execute(f"SELECT version FROM {self.version_table}").fetchone()
+            return version
+        except sqlite3.OperationalError:  # database not migrated yet
+            return None
+
+    def load(self, dtype_backend: str | None = None) -> pd.DataFrame:
+        """Return the current table contents, reading as little as possible."""
+        with self._lock:
+            conn = self._connection()
+            (data_version,) = conn.execute("PRAGMA data_version").fetchone()
+            if self._frame is not None and self._backend == dtype_backend and data_version == self._data_version:
+                return self._frame[self.columns].copy()
+
+            conn.execute("BEGIN")  # one snapshot for the counter and the rows
+            try:
+                version = self._table_version(conn)
+                frame = None
+                if (self._frame is not None and self._backend == dtype_backend
+                        and version is not None and self._version is not None):
+                    new_rows = self._finish(self._read(conn, "WHERE id > ?", (self._max_id,), dtype_backend), dtype_backend)
+                    if version - self._version == len(new_rows):
+                        frame = pd.concat([self._frame, new_rows], ignore_index=True) if len(new_rows) else self._frame
+                if frame is None:
+                    frame = self._finish(self._read(conn, dtype_backend=dtype_backend), dtype_backend)
+            except (ValueError, TypeError, OverflowError):
+                # Values that do not fit the declared types (e.g. rows mangled
+                # outside the tools) are returned as stored, without caching
+                self._frame = None
+                return pd.read_sql(f"SELECT {', '.join(self.columns)} FROM {self.table}", conn)
+            finally:
+                conn.rollback()
+
+            self._frame = frame
+            self._backend = dtype_backend
+            self._data_version = data_version
+            self._version = version
+            self._max_id = int(frame["id"].max()) if len(frame) else -1
+            return frame[self.columns].copy()
+
+    def iter_chunks(self, chunksize: int = 100_000, dtype_backend: str | None = None):
+        """Yield the table in typed chunks of `chunksize` rows, without caching."""
+        conn = sqlite3.connect(self.path)
+        try:
+            for chunk in self._read(conn, dtype_backend=dtype_backend, chunksize=chunksize):
+                yield self._finish(chunk, dtype_backend)[self.columns]
+        finally:
+            conn.close()
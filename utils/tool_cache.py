@@ -0,0 +1,128 @@
+import functools
+import inspect
+import threading
+from collections import OrderedDict
+
+
+class ToolCache:
+    """
+    Read-through cache for the results of read-only MCP tools.
+
+    Entries are keyed by tool name and arguments and carry tags (e.g.
+    "customers", "customer:John Doe"); mutating tools invalidate the tags they
+    touch. Writes by other processes are detected with PRAGMA data_version,
+    which only changes when a *different* connection committed. In that case
+    the table's trigger-maintained change counter (`version_sql`) decides
+    whether the entries are still current, since the other connection may
+    just be another thread of this server.
+    """
+
+    def __init__(self, pool, version_sql: str, max_entries: int = 1024):
+        self.pool = pool
+        self.version_sql = version_sql
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.version = None  # change counter value the entries correspond to
+        self._entries = OrderedDict()  # key -> (tags, value)
+        self._generation = 0  # bumped on every invalidation
+        self._lock = threading.Lock()
+        self._seen = threading.local()  # (connection, data_version) per thread
+
+    def _validate(self):
+        conn = self.pool.connection()
+        (data_version,) = conn.execute("PRAGMA data_version").fetchone()
+        seen = getattr(self._seen, "value", None)
+        self._seen.value = (conn, data_version)
+        if self.version is not None and seen == (conn, data_version):
+            return  # no other connection committed since this thread last looked
+        (version,) = conn.execute(self.version_sql).fetchone()
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+
+    def _clear(self):
+        self._entries.clear()
+        self._generation += 1
+        self.invalidations += 1
+
+    def get(self, key, tags, compute):
+        """Return the cached value for `key`, computing and storing it on a miss."""
+        self._validate()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            generation = self._generation
+        value = compute()
+        with self._lock:
+            # Skip storing if something was invalidated while computing
+            if generation == self._generation:
+                self._entries[key] = (frozenset(tags), value)
+                if len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, tags, version: int, changed: int):
+        """
+        Drop entries tagged with any of `tags` after a committed write that
+        moved the change counter by `changed` to `version`. If the cache was
+        not at `version - changed`, someone else wrote too and all entries go.
+        """
+        tags = set(tags)
+        with self._lock:
+            self._generation += 1
+            if self.version is not None and self.version == version - changed:
+                for key in [k for k, (t, _) in self._entries.items() if t & tags]:
+                    del self._entries[key]
+                self.invalidations += 1
+                self.version = version
+            else:
+                self._clear()
+                self.version = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+def _freeze(value):
+    """Hashable form of a tool argument (lists become tuples)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def cached(cache: ToolCache, tags):
+    """
+    Cache a read-only tool in `cache`. `tags` is a set of tags or a function
+    of the tool's (default-filled) arguments returning one.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (fn.__name__, tuple((k, _freeze(v)) for k, v in bound.arguments.items()))
+            entry_tags = tags(**bound.arguments) if callable(tags) else tags
+            return cache.get(key, entry_tags, lambda: fn(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
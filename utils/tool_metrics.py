@@ -0,0 +1,260 @@
+import atexit
+import contextvars
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Set MCP_METRICS=0 to open plain, uninstrumented connections and record nothing
+ENABLED = os.getenv("MCP_METRICS", "1") != "0"
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Tool the current call belongs to; copied into worker threads with the context
+current_tool = contextvars.ContextVar("current_tool", default=None)
+
+# Work not done on behalf of a tool call, e.g. a group commit
+BACKGROUND = "_background"
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency_sum", "latency_max", "buckets",
+                 "sql_seconds", "statements", "rows", "lock_wait_seconds")
+
+    def __init__(self):
+        self.calls = self.errors = self.statements = self.rows = 0
+        self.latency_sum = self.latency_max = self.sql_seconds = self.lock_wait_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # last one is +Inf
+
+    def percentile(self, q: float) -> float | None:
+        """
+        Estimate of the q-quantile: linear interpolation inside the bucket
+        holding it, never above the largest latency observed.
+        """
+        if not self.calls:
+            return None
+        target, seen, lower = q * self.calls, 0, 0.0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            if count and seen + count >= target:
+                return min(lower + (bound - lower) * (target - seen) / count, self.latency_max)
+            seen += count
+            lower = bound
+        return self.latency_max
+
+
+class Metrics:
+    """
+    Per-tool counters: calls, errors, latency histogram, and the SQLite time,
+    statements, rows fetched and write-lock waits of the tool's queries.
+
+    Tool latency is measured around the whole async call, so it includes
+    waiting for a database worker thread. SQL time includes lock waits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools = {}
+
+    def _stats(self, tool: str | None) -> _ToolStats:
+        tool = tool or BACKGROUND
+        stats = self._tools.get(tool)
+        if stats is None:
+            stats = self._tools.setdefault(tool, _ToolStats())
+        return stats
+
+    @contextmanager
+    def tool_call(self, name: str):
+        """Measure one tool call and attribute the queries it runs to it."""
+        token = current_tool.set(name)
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            current_tool.reset(token)
+            with self._lock:
+                stats = self._stats(name)
+                stats.calls += 1
+                stats.errors += failed
+                stats.latency_sum += elapsed
+                stats.latency_max = max(stats.latency_max, elapsed)
+                i = 0
+                while i < len(LATENCY_BUCKETS) and elapsed > LATENCY_BUCKETS[i]:
+                    i += 1
+                stats.buckets[i] += 1
+
+    def record_sql(self, seconds: float, statements: int = 0, rows: int = 0):
+        with self._lock:
+            stats = self._stats(current_tool.get())
+            stats.sql_seconds += seconds
+            stats.statements += statements
+            stats.rows += rows
+
+    def record_lock_wait(self, seconds: float):
+        with self._lock:
+            self._stats(current_tool.get()).lock_wait_seconds += seconds
+
+    def snapshot(self) -> dict:
+        """Current counters per tool, with latencies in milliseconds."""
+        with self._lock:
+            return {
+                tool: {
+                    "calls": s.calls,
+                    "errors": s.errors,
+                    "latency_avg_ms": round(1000 * s.latency_sum / s.calls, 3) if s.calls else None,
+                    "latency_p50_ms": _ms(s.percentile(0.5)),
+                    "latency_p95_ms": _ms(s.percentile(0.95)),
+                    "latency_max_ms": round(1000 * s.latency_max, 3),
+                    "sql_ms": round(1000 * s.sql_seconds, 3),
+                    "statements": s.statements,
+                    "rows": s.rows,
+                    "lock_wait_ms": round(1000 * s.lock_wait_seconds, 3),
+                }
+                for tool, s in sorted(self._tools.items())
+            }
+
+    def prometheus(self, labels: dict | None = None) -> str:
+        """The counters in Prometheus text exposition format."""
+        base = "".join(f'{k}="{v}",' for k, v in (labels or {}).items())
+        out = []
+
+        def metric(name, kind, help_, samples):
+            out.append(f"# HELP {name} {help_}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples)
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+            metric("mcp_tool_calls_total", "counter", "Tool calls.",
+                   [f'mcp_tool_calls_total{{{base}tool="{t}"}} {s.calls}' for t, s in tools])
+            metric("mcp_tool_errors_total", "counter", "Tool calls that raised.",
+                   [f'mcp_tool_errors_total{{{base}tool="{t}"}} {s.errors}' for t, s in tools])
+            samples = []
+            for t, s in tools:
+                cumulative = 0
+                for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), s.buckets):
+                    cumulative += count
+                    samples.append(f'mcp_tool_latency_seconds_bucket{{{base}tool="{t}",le="{bound}"}} {cumulative}')
+                samples.append(f'mcp_tool_latency_seconds_sum{{{base}tool="{t}"}} {s.latency_sum}')
+                samples.append(f'mcp_tool_latency_seconds_count{{{base}tool="{t}"}} {s.calls}')
+            metric("mcp_tool_latency_seconds", "histogram", "Tool call latency.", samples)
+            metric("mcp_tool_sql_seconds_total", "counter", "Time spent in SQLite.",
+                   [f'mcp_tool_sql_seconds_total{{{base}tool="{t}"}} {s.sql_seconds}' for t, s in tools])
+            metric("mcp_tool_sql_statements_total", "counter", "SQL statements executed.",
+                   [f'mcp_tool_sql_statements_total{{{base}tool="{t}"}} {s.statements}' for t, s in tools])
+            metric("mcp_tool_rows_total", "counter", "Rows fetched.",
+                   [f'mcp_tool_rows_total{{{base}tool="{t}"}} {s.rows}' for t, s in tools])
+            metric("mcp_tool_lock_wait_seconds_total", "counter", "Time spent waiting for the write lock.",
+                   [f'mcp_tool_lock_wait_seconds_total{{{base}tool="{t}"}} {s.lock_wait_seconds}' for t, s in tools])
+        return "\n".join(out) + "\n"
+
+    def dump(self, path: str, labels: dict | None = None):
+        """
+        Append a JSON line with the counters to `path` if it ends in .jsonl,
+        otherwise (atomically) rewrite it as a Prometheus textfile.
+        """
+        if path.endswith(".jsonl"):
+            record = {"time": time.time(), **(labels or {}), "tools": self.snapshot()}
+            with open(path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        else:
+            tmp = f"{path}.tmp"
+            with open(tmp, "w") as f:
+                f.write(self.prometheus(labels))
+            os.replace(tmp, path)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(1000 * seconds, 3)
+
+
+metrics = Metrics()
+
+
+def start_export(path: str, interval: float = 15.0, labels: dict | None = None):
+    """Dump the metrics to `path` every `interval` seconds and at exit."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            metrics.dump(path, labels)
+
+    threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+    atexit.register(metrics.dump, path, labels)
+
+
+# --- SQLite instrumentation ---
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that reports its execution and fetch time to `metrics`."""
+
+    def execute(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().execute(*args)
+        finally:
+            metrics.record_sql(time.perf_counter() - start, statements=1)
+
+    def executemany(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().executemany(*args)
+        finally:
+            metrics.record_sql(time.perf_counter() - start, statements=1)
+
+    def executescript(self, *args):
+        start = time.perf_counter()
+        try:
+            return super().executescript(*args)
+        finally:
+            metrics.record_sql(time.perf_counter() - start, statements=1)
+
+    # Rows consumed by iterating over the cursor are not counted, to keep
+    # large scans (e.g. loading a whole table) free of per-row overhead.
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        metrics.record_sql(time.perf_counter() - start, rows=row is not None)
+        return row
+
+    def fetchmany(self, *args):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args)
+        metrics.record_sql(time.perf_counter() - start, rows=len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        metrics.record_sql(time.perf_counter() - start, rows=len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors, including those of execute(), are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, *args):
+        return self.cursor().execute(*args)
+
+    def executemany(self, *args):
+        return self.cursor().executemany(*args)
+
+    def executescript(self, *args):
+        return self.cursor().executescript(*args)
+
+
+def register_resource(mcp):
+    """Expose the counters of this server as the MCP resource stats://tools."""
+    @mcp.resource("stats://tools")
+    def tool_stats() -> str:
+        """Per-tool call counts, latencies, SQLite time, rows and lock waits."""
+        return json.dumps(metrics.snapshot())
@@ -0,0 +1,103 @@
+import itertools
+import json
+import os
+from typing import Literal
+
+# Budgets applied when a tool call does not set its own. Unset (the default)
+# means no limit, so list tools return everything unless asked to page.
+DEFAULT_MAX_ROWS = int(os.getenv("TOOL_MAX_ROWS", "0")) or None
+DEFAULT_MAX_TOKENS = int(os.getenv("TOOL_MAX_TOKENS", "0")) or None
+
+# "text": one sentence per row (readable), "tsv": header + tab-separated
+# values, "jsonl": one JSON object per row. tsv is usually the fewest tokens.
+OutputFormat = Literal["text", "tsv", "jsonl"]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English and code)."""
+    return len(text) // 4 + 1
+
+
+def page_size(max_rows: int | None) -> int | None:
+    """Rows per page for a requested `max_rows`, None for no limit."""
+    size = max_rows or DEFAULT_MAX_ROWS
+    return max(1, size) if size else None
+
+
+def fetch_limit(max_rows: int | None) -> int:
+    """SQL LIMIT for one page: one row more than the page, to detect further pages (-1: all rows)."""
+    size = page_size(max_rows)
+    return size + 1 if size else -1
+
+
+def project(columns: list[str], fields: list[str] | None) -> list[str]:
+    """The requested subset of `columns`, in the requested order; ValueError on unknown names."""
+    if not fields:
+        return columns
+    unknown = [f for f in fields if f not in columns]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, available: {columns}")
+    return list(fields)
+
+
+def render_rows(
+    rows,
+    *,
+    title: str,
+    empty: str,
+    text_row,
+    output_format: OutputFormat = "text",
+    fields: list[str] | None = None,
+    max_rows: int | None = None,
+    max_tokens: int | None = None,
+) -> str:
+    """
+    Render a list tool's result from (cursor, row) pairs, where `row` is a
+    dict of display values and `cursor` is what the tool accepts to continue
+    after that row.
+
+    Stops after `max_rows` rows or before the output would exceed `max_tokens`
+    (if either is set) and then appends a continuation line with the cursor of
+    the last row shown; in "jsonl" that line is a JSON object too.
+    `rows` may hold one row more than the page: that extra row only signals
+    that more data exists. `text_row` formats a row in "text" mode, where
+    `fields` is ignored.
+    """
+    max_rows = page_size(max_rows)
+    max_tokens = max_tokens or DEFAULT_MAX_TOKENS
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return empty
+
+    try:
+        columns = project(list(first[1]), fields)
+    except ValueError as e:
+        return str(e)
+    if output_format == "tsv":
+        header = "\t".join(columns)
+        line = lambda row: "\t".join(str(row[c]).replace("\t", " ").replace("\n", " ") for c in columns)
+    elif output_format == "jsonl":
+        header = None
+        line = lambda row: json.dumps({c: row[c] for c in columns}, ensure_ascii=False, default=str)
+    else:
+        header = title
+        line = text_row
+
+    lines = [header] if header else []
+    tokens = sum(estimate_tokens(text) for text in lines)
+    shown, last_cursor = 0, None
+    for cursor, row in itertools.chain([first], rows):
+        text = line(row)
+        tokens += estimate_tokens(text)
+        # Always show at least one row, however long
+        if shown and ((max_rows and shown >= max_rows) or (max_tokens and tokens > max_tokens)):
+            if output_format == "jsonl":
+                lines.append(json.dumps({"more_results": True, "next_cursor": last_cursor}, default=str))
+            else:
+                more = f", next cursor: {last_cursor}" if last_cursor is not None else ""
+                lines.append(f"More results available{more}")
+            break
+        lines.append(text)
+        shown, last_cursor = shown + 1, cursor
+    return "\n".join(lines)
@@ -0,0 +1,254 @@
+import asyncio
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from datetime import time as clock_time
+from typing import NamedTuple
+
+from langchain_core.tools import StructuredTool
+
+# Forecasts are reused for this long, per location
+TTL_SECONDS = float(os.getenv("WEATHER_TTL_SECONDS", "600"))
+TIMEOUT_SECONDS = float(os.getenv("WEATHER_TIMEOUT_SECONDS", "10"))
+MAX_CONCURRENCY = int(os.getenv("WEATHER_MAX_CONCURRENCY", "4"))
+
+
+class Hour(NamedTuple):
+    time: clock_time
+    temperature: int
+    description: str
+
+
+class Day(NamedTuple):
+    date: date
+    hours: list[Hour]
+
+
+# --- Backends: `async fetch(location) -> list[Day]` ---
+
+class PythonWeatherBackend:
+    """Forecasts from wttr.in through python-weather, reusing one client (HTTP session)."""
+
+    def __init__(self):
+        self._client = None
+
+    async def fetch(self, location: str) -> list[Day]:
+        import python_weather
+
+        if self._client is None:
+            self._client = python_weather.Client(unit=python_weather.METRIC)
+        weather = await self._client.get(location)
+        return [
+            Day(daily.date, [Hour(hourly.time, hourly.temperature, hourly.description) for hourly in daily])
+            for daily in weather
+        ]
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class StubBackend:
+    """Deterministic forecasts without network access, for tests and offline runs."""
+
+    DESCRIPTIONS = ["Sunny", "Partly cloudy", "Cloudy", "Light rain", "Clear"]
+
+    def __init__(self, delay: float = 0.0, days: int = 3):
+        self.delay = delay
+        self.days = days
+        self.fetches = 0
+
+    async def fetch(self, location: str) -> list[Day]:
+        await asyncio.sleep(self.delay)
+        self.fetches += 1
+        seed = zlib.crc32(location.casefold().encode())
+        today = datetime.now().date()
+        return [
+            Day(today + timedelta(days=d), [
+                Hour(clock_time(h), 10 + (seed + d * 3 + h) % 15, self.DESCRIPTIONS[(seed + d + h // 6) % len(self.DESCRIPTIONS)])
+                for h in range(0, 24, 3)
+            ])
+            for d in range(self.days)
+        ]
+
+    async def close(self):
+        pass
+
+
+class WeatherService:
+    """
+    Weather forecasts with a per-location TTL cache.
+
+    All backend calls run on one long-lived event loop in a background
+    thread, so the HTTP client is created once and reused, and the service
+    works the same from synchronous code and from inside a running loop
+    (e.g. Jupyter). Concurrent requests for the same location share one
+    fetch; fetches for different locations run concurrently up to
+    `max_concurrency`. Failed fetches are not cached.
+    """
+
+    def __init__(self, backend, *, ttl: float = TTL_SECONDS, timeout: float = TIMEOUT_SECONDS,
+                 max_concurrency: int = MAX_CONCURRENCY, max_entries: int = 256):
+        self.backend = backend
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # requests that joined a fetch already under way
+        self._cache = OrderedDict()  # key -> (expires, forecast), only touched on the loop
+        self._inflight = {}  # key -> Task
+        self._loop = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="weather-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._get_loop())
+
+    @staticmethod
+    def _key(location: str) -> str:
+        return " ".join(location.casefold().split())
+
+    async def _forecast(self, location: str) -> list[Day]:
+        key = self._key(location)
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._inflight[key] = asyncio.ensure_future(self._fetch(key, location))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, location: str) -> list[Day]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                forecast = await asyncio.wait_for(self.backend.fetch(location), self.timeout)
+            self._cache[key] = (time.monotonic() + self.ttl, forecast)
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            return forecast
+        finally:
+            del self._inflight[key]
+
+    async def _forecasts(self, locations: list[str]) -> dict:
+        results = await asyncio.gather(*(self._forecast(loc) for loc in locations), return_exceptions=True)
+        return dict(zip(locations, results))
+
+    async def forecast(self, location: str) -> list[Day]:
+        """Forecast for one location, from the cache if it is fresh."""
+        return await asyncio.wrap_future(self._submit(self._forecast(location)))
+
+    async def forecasts(self, locations: list[str]) -> dict:
+        """Forecasts for several locations fetched concurrently; failures map to the exception."""
+        return await asyncio.wrap_future(self._submit(self._forecasts(locations)))
+
+    def forecast_sync(self, location: str) -> list[Day]:
+        return self._submit(self._forecast(location)).result()
+
+    def forecasts_sync(self, locations: list[str]) -> dict:
+        return self._submit(self._forecasts(locations)).result()
+
+    def clear(self):
+        """Drop all cached forecasts."""
+        self._submit(self._clear()).result()
+
+    async def _clear(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+    def close(self):
+        """Close the backend client and stop the background loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(self.backend.close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+
+
+def format_forecast(forecast: list[Day], days: int | None = None) -> str:
+    """Hourly forecast as text, for the first `days` days (all by default)."""
+    results = ""
+    for daily in forecast[:days]:
+        results += f"Weather forecast for {daily.date}:\n"
+        results += "\tHourly Forecasts:\n"
+        for hourly in daily.hours:
+            results += f"\t\t{hourly.time}: {hourly.temperature}°C, {hourly.description}\n"
+    return results.strip()
+
+
+# --- Shared service and LangChain tools ---
+
+# WEATHER_BACKEND=stub serves made-up forecasts without network access
+weather_service = WeatherService(StubBackend() if os.getenv("WEATHER_BACKEND") == "stub" else PythonWeatherBackend())
+
+
+async def weather_report(location: str, days: int | None = None) -> str:
+    """Formatted forecast for a location, from the shared service."""
+    return format_forecast(await weather_service.forecast(location), days)
+
+
+def _weather(location: str, days: int | None = None) -> str:
+    return format_forecast(weather_service.forecast_sync(location), days)
+
+
+def _format_many(results: dict, days: int | None) -> str:
+    sections = []
+    for location, forecast in results.items():
+        if isinstance(forecast, Exception):
+            sections.append(f"{location}: weather unavailable ({type(forecast).__name__})")
+        else:
+            sections.append(f"{location}:\n{format_forecast(forecast, days)}")
+    return "\n\n".join(sections)
+
+
+def _weather_many(locations: list[str], days: int | None = 1) -> str:
+    return _format_many(weather_service.forecasts_sync(locations), days)
+
+
+async def _aweather_many(locations: list[str], days: int | None = 1) -> str:
+    return _format_many(await weather_service.forecasts(locations), days)
+
+
+get_weather = StructuredTool.from_function(
+    func=_weather,
+    coroutine=weather_report,
+    name="weather",
+    description="Call to get the current temperature. Optionally limit the hourly forecast to the next `days` days.",
+)
+
+get_weather_many = StructuredTool.from_function(
+    func=_weather_many,
+    coroutine=_aweather_many,
+    name="weather_many",
+    description="Get the hourly forecast for several locations at once (today only unless `days` is given).",
+)
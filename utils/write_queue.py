@@ -0,0 +1,146 @@
+import contextvars
+import functools
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitQueue:
+    """
+    Single writer thread that coalesces queued write operations into group commits.
+
+    An operation is a callable taking a cursor; `submit` returns a Future for
+    its result. The writer takes whatever is queued (up to `max_batch`; only if
+    several writers were queuing it waits at most `max_latency` seconds for
+    more, a single one is committed immediately) and runs it in one transaction,
+    each operation inside its own savepoint so a failing one is rolled back
+    and reported without affecting the others. If the database is locked by
+    another process the whole batch is retried with jittered backoff.
+
+    `before_commit(cur, results)` runs inside the transaction and its return
+    value is handed to `after_commit` once the batch is durable.
+    """
+
+    def __init__(self, pool, *, max_batch: int = 256, max_latency: float = 0.0,
+                 retries: int = 5, before_commit=None, after_commit=None):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_latency = max_latency
+        self.retries = retries
+        self.before_commit = before_commit
+        self.after_commit = after_commit
+        self.commits = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, op) -> Future:
+        future = Future()
+        # Run in the caller's context, so e.g. metrics attribute it to the calling tool
+        op = functools.partial(contextvars.copy_context().run, op)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sqlite-group-commit", daemon=True)
+                self._thread.start()
+            self._queue.put((op, future))
+        return future
+
+    def close(self, timeout: float | None = None):
+        """Flush pending operations, stop the writer and close its connection."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(_STOP)
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            stopping = False
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                # Take what is already queued; a lone writer is committed right
+                # away. Only when other writers are queuing too, linger up to
+                # max_latency for the ones about to arrive.
+                deadline = None
+                while len(batch) < self.max_batch:
+                    try:
+                        if deadline is None:
+                            item = self._queue.get_nowait()
+                        else:
+                            item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        if deadline is not None or len(batch) == 1 or not self.max_latency:
+                            break
+                        deadline = time.monotonic() + self.max_latency
+                        continue
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                self._commit(batch)
+        finally:
+            self.pool.release()
+
+    def _commit(self, batch):
+        for attempt in range(self.retries + 1):
+            try:
+                outcomes = []
+                with self.pool.transaction() as cur:
+                    for op, _ in batch:
+                        cur.execute("SAVEPOINT op")
+                        try:
+                            outcomes.append((op(cur), None))
+                        except sqlite3.OperationalError as e:
+                            if _is_locked(e):
+                                raise
+                            cur.execute("ROLLBACK TO op")
+                            outcomes.append((None, e))
+                        except Exception as e:
+                            cur.execute("ROLLBACK TO op")
+                            outcomes.append((None, e))
+                        cur.execute("RELEASE op")
+                    state = None
+                    if self.before_commit is not None:
+                        state = self.before_commit(cur, [r for r, e in outcomes if e is None])
+                break
+            except sqlite3.OperationalError as e:
+                if not _is_locked(e) or attempt == self.retries:
+                    for _, future in batch:
+                        future.set_exception(e)
+                    return
+                time.sleep(min(1.0, 0.01 * 2 ** attempt) * random.uniform(0.5, 1.5))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                return
+
+        self.commits += 1
+        self.operations += len(batch)
+        if self.after_commit is not None:
+            try:
+                self.after_commit(state)
+            except Exception:
+                logger.exception("after_commit hook failed")
+        for (_, future), (result, error) in zip(batch, outcomes):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def _is_locked(error: sqlite3.OperationalError) -> bool:
+    message = str(error)
+    return "locked" in message or "busy" in message
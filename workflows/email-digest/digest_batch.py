@@ -0,0 +1,69 @@
+"""
+Run a compiled LangGraph workflow over many inputs at once.
+
+`run_batch()` starts up to `max_concurrency` runs, gives each its own
+timeout, and yields a BatchResult per item as soon as it finishes, so the
+caller can write results incrementally. A failing or timed-out item is
+reported in its result and does not affect the others. Inputs are taken
+from the iterable lazily, as slots free up.
+
+    async for result in run_batch(workflow, threads, key=lambda t: t.key, to_input=...):
+        ...
+"""
+import asyncio
+import os
+import time
+from typing import NamedTuple
+
+MAX_CONCURRENCY = int(os.getenv("DIGEST_CONCURRENCY", "8"))
+TIMEOUT_SECONDS = float(os.getenv("DIGEST_TIMEOUT_SECONDS", "300"))
+
+
+class BatchResult(NamedTuple):
+    key: str
+    item: object
+    output: dict | None  # final graph state, None on failure
+    error: BaseException | None
+    seconds: float
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def run_batch(workflow, items, *, key, to_input, max_concurrency: int = MAX_CONCURRENCY,
+                    timeout: float | None = TIMEOUT_SECONDS, config: dict | None = None):
+    """
+    Yield a BatchResult for each of `items`, in completion order.
+
+    `key(item)` names the item in results, `to_input(item)` builds the graph
+    input (called on the event loop, so keep it cheap). Each run goes through
+    `workflow.ainvoke` and is cancelled after `timeout` seconds. Runs still
+    going when the caller stops early are cancelled; use
+    `contextlib.aclosing(run_batch(...))` so that happens right away.
+    """
+    async def run(item):
+        start = time.perf_counter()
+        try:
+            graph_input = to_input(item)
+            output = await asyncio.wait_for(workflow.ainvoke(graph_input, config), timeout)
+            return BatchResult(key(item), item, output, None, time.perf_counter() - start)
+        except Exception as exc:  # includes TimeoutError
+            return BatchResult(key(item), item, None, exc, time.perf_counter() - start)
+
+    pending = set()
+    try:
+        for item in items:
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+            pending.add(asyncio.ensure_future(run(item)))
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
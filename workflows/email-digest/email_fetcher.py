@@ -1,9 +1,35 @@
+"""
+Fetch mail as compact parsed records.
+
+    from email_fetcher import iter_messages
+    for record in iter_messages(since=datetime.date.today()):
+        ...
+
+`iter_messages()` logs in lazily, syncs the folder incrementally when given
+a SyncState (see mail_sync.py), and yields one EmailRecord per message:
+decoded headers, the text body and attachment metadata. Only the headers,
+structure and text parts are downloaded (see imap_fetch.py); attachments
+are streamed to disk in chunks when `save_dir` is given, under their
+content hash so duplicates are stored once.
+
+Run as a script to print new mail (IMAP_SERVER=stub for a synthetic mailbox).
+"""
+import base64
+import datetime
+import hashlib
 import imaplib
-import email
-from email.header import decode_header
 import os
+import quopri
+import tempfile
+from email.parser import BytesHeaderParser
+from email.utils import getaddresses, parsedate_to_datetime
+from pathlib import Path
+from typing import NamedTuple
+
 from dotenv import load_dotenv
-import datetime
+
+from imap_fetch import BATCH_SIZE, Part, decode_part, decode_text, fetch_messages, parse_fetch_response, text_parts
+from mail_sync import SyncState, sync_mailbox
 
 # Load environment variables
 load_dotenv()
@@ -11,66 +37,189 @@ load_dotenv()
 EMAIL = os.getenv("EMAIL_ADDRESS")
 PASSWORD = os.getenv("EMAIL_PASSWORD")
 IMAP_SERVER = os.getenv("IMAP_SERVER", "imap.gmail.com")  # fallback to Gmail
+ACCOUNT = EMAIL or IMAP_SERVER  # sync checkpoints are kept per account and folder
 SAVE_ATTACHMENTS = False
-
 SAVE_DIR = "./attachments"
-os.makedirs(SAVE_DIR, exist_ok=True)
-
-# Connect and login
-mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-mail.login(EMAIL, PASSWORD)
-mail.select("inbox")
-
-# Search for unread emails
-# FROM "string": Messages with the specified string in the envelope structure's FROM field.
-# status, messages = mail.search(None, '(UNSEEN)')
-# mail.select("inbox")  # Select only the "Primary" inbox
-
-date_string = (datetime.date.today() - datetime.timedelta(days=2)).strftime("%d-%b-%Y")
-status, messages = mail.search(None, 'SINCE', date_string)
-
-for num in messages[0].split():
-    _, data = mail.fetch(num, "(RFC822)")
-    msg = email.message_from_bytes(data[0][1])
-
-    subject, encoding = decode_header(msg["Subject"])[0]
-    if isinstance(subject, bytes):
-        subject = subject.decode(encoding or "utf-8")
-    print("\nSubject:", subject)
-
-    for part in msg.walk():
-        content_disposition = str(part.get("Content-Disposition"))
-        if "attachment" in content_disposition:
-            filename = part.get_filename()
-            if filename:
-                filename = decode_header(filename)[0][0]
-                if isinstance(filename, bytes):
-                    filename = filename.decode()
-                filepath = os.path.join(SAVE_DIR, filename)
-
-                with open(filepath, "wb") as f:
-                    f.write(part.get_payload(decode=True))
-                print(f"Saved attachment: {filepath}")
-
-
-    # Extract and print the body (text/plain only)
-    for part in msg.walk():
-        content_type = part.get_content_type()
-        content_disposition = str(part.get("Content-Disposition"))
-
-        if content_type == "text/plain" and "attachment" not in content_disposition:
-            body = part.get_payload(decode=True).decode(part.get_content_charset() or "utf-8", errors="ignore")
-            print(f"Body:    {body}"[:80])
-
-        # Save attachments only if enabled
-        elif "attachment" in content_disposition and SAVE_ATTACHMENTS:
-            filename = part.get_filename()
-            if filename:
-                filename = decode_header(filename)[0][0]
-                if isinstance(filename, bytes):
-                    filename = filename.decode()
-                filepath = os.path.join(SAVE_DIR, filename)
-
-                with open(filepath, "wb") as f:
-                    f.write(part.get_payload(decode=True))
-                print(f"Saved attachment: {filepath}")
+# Attachments are downloaded in pieces of this many (encoded) bytes
+CHUNK_SIZE = int(os.getenv("IMAP_ATTACHMENT_CHUNK", str(1 << 20)))
+
+
+class Attachment(NamedTuple):
+    filename: str
+    content_type: str
+    size: int  # encoded size reported by the server
+    section: str
+    sha256: str | None = None  # set once saved
+    path: str | None = None
+
+
+class EmailRecord(NamedTuple):
+    uid: int
+    message_id: str | None
+    subject: str
+    sender: str
+    to: list[str]
+    date: datetime.datetime | None
+    in_reply_to: str | None
+    references: list[str]
+    body: str
+    attachments: list[Attachment]
+    size: int
+
+
+def connect(server: str = IMAP_SERVER, user: str | None = EMAIL, password: str | None = PASSWORD):
+    """Logged-in IMAP connection (IMAP_SERVER=stub: local stand-in with a synthetic mailbox)."""
+    if server == "stub":
+        from imap_stub import FakeIMAP, synthetic_mailbox
+        mail = FakeIMAP(synthetic_mailbox(50, start=datetime.datetime.now() - datetime.timedelta(hours=12)))
+    else:
+        mail = imaplib.IMAP4_SSL(server)
+    mail.login(user, password)
+    return mail
+
+
+# --- Attachments ---
+
+class _StreamDecoder:
+    """Undo a content-transfer-encoding over consecutive chunks."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        self.pending = b""
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        if self.encoding == "base64":
+            data = self.pending + b"".join(chunk.split())
+            if final:
+                data += b"=" * (-len(data) % 4)
+            usable = len(data) - len(data) % 4
+            self.pending = data[usable:]
+            return base64.b64decode(data[:usable])
+        if self.encoding == "quoted-printable":
+            # Soft line breaks and =XX escapes never span a line end
+            data = self.pending + chunk
+            cut = len(data) if final else data.rfind(b"\n") + 1
+            self.pending = data[cut:]
+            return quopri.decodestring(data[:cut])
+        return chunk
+
+
+def save_attachment(mail, uid: int, part: Part, save_dir: str, chunk_size: int = CHUNK_SIZE) -> Attachment:
+    """
+    Download one attachment in `chunk_size` pieces (partial BODY.PEEK fetches),
+    decoding and hashing as it goes. The file is stored as
+    `<sha256><suffix>` in `save_dir`; a file with the same content is kept once.
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    decoder, digest = _StreamDecoder(part.encoding), hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=save_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            offset = 0
+            while True:
+                _, data = mail.uid("FETCH", str(uid), f"(BODY.PEEK[{part.section}]<{offset}.{chunk_size}>)")
+                message = parse_fetch_response(data)[0]
+                chunk = next((v for k, v in message.items() if k.startswith(f"BODY[{part.section}]")), None) or b""
+                offset += len(chunk)
+                final = len(chunk) < chunk_size
+                decoded = decoder.feed(chunk, final)
+                digest.update(decoded)
+                f.write(decoded)
+                if final:
+                    break
+        sha256 = digest.hexdigest()
+        path = os.path.join(save_dir, sha256 + Path(part.filename or "").suffix.lower())
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return Attachment(part.filename or "", part.content_type, part.size, part.section, sha256, path)
+
+
+# --- Records ---
+
+def _message_ids(value) -> list[str]:
+    return [f"<{m.strip('<>')}>" for m in (value or "").replace(">", "> ").split() if m.strip("<>")]
+
+
+def _record(mail, fetched, save_dir: str | None, chunk_size: int) -> EmailRecord:
+    header = BytesHeaderParser().parsebytes(fetched.header)
+    try:
+        date = parsedate_to_datetime(header["Date"]) if header["Date"] else None
+    except (TypeError, ValueError):
+        date = None
+    attachments = []
+    for part in fetched.parts:
+        if not part.is_attachment:
+            continue
+        if save_dir is not None:
+            attachments.append(save_attachment(mail, fetched.uid, part, save_dir, chunk_size))
+        else:
+            attachments.append(Attachment(part.filename or "", part.content_type, part.size, part.section))
+    in_reply_to = _message_ids(header["In-Reply-To"])
+    return EmailRecord(
+        uid=fetched.uid,
+        message_id=(_message_ids(header["Message-ID"]) or [None])[0],
+        subject=decode_text(header["Subject"] or ""),
+        sender=decode_text(header["From"] or ""),
+        to=[addr for _, addr in getaddresses([decode_text(v) for v in header.get_all("To", []) + header.get_all("Cc", [])])],
+        date=date,
+        in_reply_to=in_reply_to[0] if in_reply_to else None,
+        references=_message_ids(header["References"]),
+        body="\n\n".join(decode_part(p, fetched.bodies.get(p.section, b"")) for p in text_parts(fetched.parts)),
+        attachments=attachments,
+        size=fetched.size,
+    )
+
+
+def iter_messages(mail=None, folder: str = "inbox", *, since: datetime.date | None = None,
+                  state: SyncState | None = None, account: str | None = None, save_dir: str | None = None,
+                  batch_size: int = BATCH_SIZE, chunk_size: int = CHUNK_SIZE, advance: bool = True):
+    """
+    Yield an EmailRecord per message in `folder`, in UID order.
+
+    With a `state`, only mail that arrived since the last sync is fetched and
+    messages already marked processed are skipped; otherwise everything since
+    `since` (or the whole folder). With advance=False the sync checkpoint is
+    left for the caller to move (`state.advance()`) once the mail is handled.
+    Connects with `connect()` if no `mail` connection is given, and logs out
+    when done. Attachments are saved to `save_dir` if given, else only
+    described.
+    """
+    own_connection = mail is None
+    if own_connection:
+        mail = connect()
+    try:
+        if state is not None:
+            fetched_messages = sync_mailbox(mail, state, account or ACCOUNT, folder, since, batch_size, advance)
+        else:
+            mail.select(folder, readonly=True)
+            criteria = ("SINCE", since.strftime("%d-%b-%Y")) if since else ("ALL",)
+            _, data = mail.uid("SEARCH", None, *criteria)
+            fetched_messages = fetch_messages(mail, data[0].split(), batch_size)
+        for fetched in fetched_messages:
+            record = _record(mail, fetched, save_dir, chunk_size)
+            if state is not None and record.message_id and state.is_processed(record.message_id):
+                continue
+            yield record
+    finally:
+        if own_connection:
+            mail.logout()
+
+
+if __name__ == "__main__":
+    # Incremental sync: only mail that arrived since the last run (see mail_sync.py).
+    # The first run, and a run after the server reset UIDVALIDITY, goes back two days.
+    since = datetime.date.today() - datetime.timedelta(days=2)
+    for record in iter_messages(since=since, state=SyncState(), save_dir=SAVE_DIR if SAVE_ATTACHMENTS else None):
+        print("\nSubject:", record.subject)
+        print(f"Body:    {record.body}"[:80])
+        for attachment in record.attachments:
+            if attachment.path:
+                print(f"Saved attachment: {attachment.filename} -> {attachment.path}")
+            else:
+                print(f"Attachment: {attachment.filename} ({attachment.size} bytes)")
@@ -0,0 +1,99 @@
+"""
+Offline stand-in for ChatAnthropic (LLM_BACKEND=fake), for trying the
+workflows and testing the scheduler without an API key.
+
+`FakeChatModel` answers `invoke`/`ainvoke` after `latency` seconds with a
+canned AIMessage (with usage metadata), and `with_structured_output(schema)`
+returns a model that fills in the pydantic schema. With `rpm` set it
+behaves like a rate-limited provider: calls over the limit in a sliding
+minute fail with a 429 `RateLimitError` carrying `retry_after`.
+"""
+import asyncio
+import time
+import typing
+from collections import deque
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limit exceeded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class _Provider:
+    """State shared by a model and its structured-output variants."""
+
+    def __init__(self, rpm: int | None, latency: float, sections: int):
+        self.rpm = rpm
+        self.latency = latency
+        self.sections = sections
+        self.calls = 0
+        self.rate_limited = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+        self.sent = deque()  # monotonic times of accepted calls in the last minute
+
+    def admit(self):
+        now = time.monotonic()
+        while self.sent and now - self.sent[0] >= 60:
+            self.sent.popleft()
+        if self.rpm is not None and len(self.sent) >= self.rpm:
+            self.rate_limited += 1
+            raise RateLimitError(60 - (now - self.sent[0]))
+        self.sent.append(now)
+        self.calls += 1
+
+
+def _fake(schema, sections: int, n: int = 1):
+    values = {}
+    for name, field in schema.model_fields.items():
+        args = typing.get_args(field.annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            values[name] = [_fake(args[0], sections, i + 1) for i in range(sections)]
+        elif name == "decision":
+            values[name] = "True"
+        else:
+            values[name] = f"{schema.__name__} {name} {n}"
+    return schema(**values)
+
+
+class FakeChatModel:
+    def __init__(self, *, rpm: int | None = None, latency: float = 0.05, sections: int = 3,
+                 schema=None, provider: _Provider | None = None):
+        self.provider = provider or _Provider(rpm, latency, sections)
+        self.schema = schema
+        self.model = "fake-chat-model"
+
+    def with_structured_output(self, schema):
+        return FakeChatModel(schema=schema, provider=self.provider)
+
+    def _response(self, messages):
+        if self.schema is not None:
+            return _fake(self.schema, self.provider.sections)
+        prompt = " ".join(str(getattr(m, "content", m)) for m in messages)
+        content = f"Fake section for: {prompt[-80:]}"
+        return AIMessage(content=content, usage_metadata={
+            "input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4,
+            "total_tokens": (len(prompt) + len(content)) // 4,
+        })
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        provider = self.provider
+        provider.admit()
+        provider.concurrent += 1
+        provider.max_concurrent = max(provider.max_concurrent, provider.concurrent)
+        try:
+            await asyncio.sleep(provider.latency)
+        finally:
+            provider.concurrent -= 1
+        return self._response(messages)
+
+    def invoke(self, messages, config=None, **kwargs):
+        self.provider.admit()
+        time.sleep(self.provider.latency)
+        return self._response(messages)
@@ -0,0 +1,251 @@
+"""
+Batched IMAP fetching.
+
+Instead of one `FETCH n (RFC822)` round trip per message, which also
+downloads every attachment, messages are fetched by UID in batches:
+
+1. one FETCH per batch for the size, BODYSTRUCTURE and the headers we use,
+2. one FETCH per batch (per distinct set of sections) for just the text
+   parts, with BODY.PEEK so messages are not marked as read.
+
+Works with an `imaplib.IMAP4`/`IMAP4_SSL` connection or anything with the
+same `uid()` method (see imap_stub.py).
+"""
+import base64
+import os
+import quopri
+import re
+from email.header import decode_header, make_header
+from itertools import islice
+from typing import NamedTuple
+
+BATCH_SIZE = int(os.getenv("IMAP_FETCH_BATCH", "200"))
+HEADER_FIELDS = ("FROM", "TO", "CC", "SUBJECT", "DATE", "MESSAGE-ID", "IN-REPLY-TO", "REFERENCES")
+
+
+class Part(NamedTuple):
+    section: str  # IMAP section number, e.g. "1" or "2.1"
+    content_type: str  # e.g. "text/plain"
+    params: dict  # lower-case keys, e.g. {"charset": "utf-8"}
+    encoding: str  # content-transfer-encoding, lower case
+    size: int  # encoded size in bytes
+    disposition: str | None
+    filename: str | None
+
+    @property
+    def is_attachment(self) -> bool:
+        return self.disposition == "attachment" or (self.filename is not None and self.disposition != "inline")
+
+
+class FetchedMessage(NamedTuple):
+    uid: int
+    size: int
+    header: bytes  # raw header lines for HEADER_FIELDS
+    parts: list[Part]  # leaf parts of the MIME tree
+    bodies: dict  # section -> transfer-encoded bytes, for the text parts only
+
+
+# --- Response parsing ---
+
+_OPEN, _CLOSE = object(), object()
+_TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}$|([^\s()"\[]*(?:\[[^\]]*\][^\s()"\[]*)*))')
+
+
+def _tokens(data):
+    """Tokens of an imaplib FETCH response: _OPEN/_CLOSE, str atoms and strings, bytes literals, None for NIL."""
+    for item in data:
+        text, literal = (item if isinstance(item, tuple) else (item, None))
+        pos = 0
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if m is None or m.end() == pos:
+                if text[pos:].strip():
+                    raise ValueError(f"Cannot parse IMAP response near {text[pos:pos + 40]!r}")
+                break
+            pos = m.end()
+            lpar, rpar, quoted, literal_size, atom = m.groups()
+            if lpar:
+                yield _OPEN
+            elif rpar:
+                yield _CLOSE
+            elif quoted is not None:
+                yield re.sub(rb"\\(.)", rb"\1", quoted).decode("utf-8", "replace")
+            elif literal_size is not None:
+                yield literal
+            elif atom:
+                yield None if atom.upper() == b"NIL" else atom.decode("ascii", "replace")
+
+
+def _parse_list(tokens):
+    items = []
+    for token in tokens:
+        if token is _OPEN:
+            items.append(_parse_list(tokens))
+        elif token is _CLOSE:
+            return items
+        else:
+            items.append(token)
+    return items
+
+
+def parse_fetch_response(data) -> list[dict]:
+    """
+    Turn the data of `IMAP4.uid("FETCH", ...)` into one dict per message,
+    e.g. {"UID": "7", "BODYSTRUCTURE": [...], "BODY[1]": b"..."}. Keys are
+    upper case with BODY.PEEK reported as BODY, as servers do.
+    """
+    tokens = _tokens(item for item in data if item is not None)
+    messages = []
+    for token in tokens:
+        if token is _OPEN:
+            items = _parse_list(tokens)
+            messages.append({str(k).upper(): v for k, v in zip(items[::2], items[1::2])})
+        # other tokens are the sequence numbers in front of each message
+    return messages
+
+
+def _str(value):
+    """A BODYSTRUCTURE field as str; servers may send any string as a literal, which arrives as bytes."""
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+
+
+def _params(values) -> dict:
+    if not values:
+        return {}
+    return {str(_str(k)).lower(): _str(v) for k, v in zip(values[::2], values[1::2])}
+
+
+def _children(structure):
+    """The leading list items of a multipart BODYSTRUCTURE, i.e. its children."""
+    for item in structure:
+        if not isinstance(item, list):
+            return
+        yield item
+
+
+def parse_bodystructure(structure, section: str = "") -> list[Part]:
+    """Leaf parts of a parsed BODYSTRUCTURE, with their section numbers."""
+    if structure and isinstance(structure[0], list):  # multipart: children, then subtype
+        parts = []
+        for i, child in enumerate(_children(structure)):
+            parts.extend(parse_bodystructure(child, f"{section}.{i + 1}" if section else str(i + 1)))
+        return parts
+
+    main, sub = str(_str(structure[0])).lower(), str(_str(structure[1])).lower()
+    params = _params(structure[2])
+    # Extension fields follow a type-dependent number of basic fields
+    if main == "text":
+        disposition_at = 9
+    elif (main, sub) == ("message", "rfc822"):
+        disposition_at = 11
+    else:
+        disposition_at = 8
+    disposition, filename = None, None
+    if len(structure) > disposition_at and isinstance(structure[disposition_at], list):
+        disposition_field = structure[disposition_at]
+        disposition = str(_str(disposition_field[0])).lower()
+        filename = _params(disposition_field[1] if len(disposition_field) > 1 else None).get("filename")
+    filename = filename or params.get("name")
+    return [Part(
+        section=section or "1",
+        content_type=f"{main}/{sub}",
+        params=params,
+        encoding=str(_str(structure[5]) or "7bit").lower(),
+        size=int(structure[6] or 0),
+        disposition=disposition,
+        filename=decode_text(filename) if filename else None,
+    )]
+
+
+def text_parts(parts: list[Part]) -> list[Part]:
+    """The inline text/plain parts, or the text/html ones if there is no plain text."""
+    for content_type in ("text/plain", "text/html"):
+        found = [p for p in parts if p.content_type == content_type and not p.is_attachment]
+        if found:
+            return found
+    return []
+
+
+# --- Decoding ---
+
+def decode_text(value) -> str:
+    """Decode an RFC 2047 encoded header value ("=?utf-8?q?...?=")."""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", "replace")
+    try:
+        return str(make_header(decode_header(value)))
+    except (UnicodeError, LookupError, ValueError):
+        return value
+
+
+def decode_transfer(raw: bytes, encoding: str) -> bytes:
+    """Undo the content-transfer-encoding of a part."""
+    if encoding == "base64":
+        return base64.b64decode(raw, validate=False)
+    if encoding == "quoted-printable":
+        return quopri.decodestring(raw)
+    return raw
+
+
+def decode_part(part: Part, raw: bytes) -> str:
+    """Text of a part: transfer decoding, then its charset."""
+    data = decode_transfer(raw, part.encoding)
+    try:
+        return data.decode(part.params.get("charset") or "utf-8", errors="replace")
+    except LookupError:  # unknown charset name
+        return data.decode("utf-8", errors="replace")
+
+
+# --- Fetching ---
+
+def uid_set(uids) -> str:
+    """Compact IMAP set for UIDs, e.g. [1, 2, 3, 7] -> "1:3,7"."""
+    ranges = []
+    for uid in sorted(set(int(u) for u in uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def _uid_fetch(mail, uids, items: str) -> list[dict]:
+    status, data = mail.uid("FETCH", uid_set(uids), items)
+    if status != "OK":
+        raise RuntimeError(f"IMAP FETCH failed: {data}")
+    return parse_fetch_response(data)
+
+
+def _header_key(message: dict):
+    return next((k for k in message if k.startswith("BODY[HEADER")), None)
+
+
+def fetch_messages(mail, uids, batch_size: int = BATCH_SIZE):
+    """
+    Yield a FetchedMessage for each UID in the selected mailbox, in UID order,
+    with the raw headers and only the text parts downloaded.
+    """
+    uids = iter(sorted(int(u) for u in uids))
+    header_items = f"BODY.PEEK[HEADER.FIELDS ({' '.join(HEADER_FIELDS)})]"
+    while batch := list(islice(uids, batch_size)):
+        messages = {}
+        for m in _uid_fetch(mail, batch, f"(UID RFC822.SIZE BODYSTRUCTURE {header_items})"):
+            parts = parse_bodystructure(m["BODYSTRUCTURE"])
+            header_key = _header_key(m)
+            messages[int(m["UID"])] = (int(m.get("RFC822.SIZE") or 0), m.get(header_key) or b"", parts)
+
+        # FETCH applies the same items to every message, so group by the sections needed
+        groups = {}
+        for uid, (_, _, parts) in messages.items():
+            sections = tuple(p.section for p in text_parts(parts))
+            if sections:
+                groups.setdefault(sections, []).append(uid)
+        bodies = {}
+        for sections, group in groups.items():
+            items = " ".join(f"BODY.PEEK[{s}]" for s in sections)
+            for m in _uid_fetch(mail, group, f"(UID {items})"):
+                bodies[int(m["UID"])] = {s: m.get(f"BODY[{s}]") or b"" for s in sections}
+
+        for uid in sorted(messages):
+            size, header, parts = messages[uid]
+            yield FetchedMessage(uid, size, header, parts, bodies.get(uid, {}))
@@ -0,0 +1,284 @@
+"""
+Local IMAP stand-in and synthetic mailboxes, for trying the fetcher and
+benchmarking it without a mail account.
+
+`FakeIMAP` answers the subset of `imaplib.IMAP4` used here (select, search,
+fetch, uid SEARCH/FETCH, response) with responses shaped like imaplib's,
+and sleeps for a round trip per command plus transfer time per byte, so
+the number of round trips and bytes downloaded show up in timings.
+"""
+import email
+import random
+import re
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+
+
+def _quote(value) -> str:
+    if value is None:
+        return "NIL"
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _param_list(params) -> str:
+    if not params:
+        return "NIL"
+    return "(" + " ".join(f"{_quote(k.upper())} {_quote(v)}" for k, v in params) + ")"
+
+
+def _raw_payload(part) -> bytes:
+    """Body of a part as transmitted (still transfer-encoded); its length is the BODYSTRUCTURE size."""
+    if part.get_content_type() == "message/rfc822":
+        return part.get_payload(0).as_bytes()
+    return part.get_payload(decode=False).encode("utf-8", "surrogateescape")
+
+
+def _bodystructure(part) -> str:
+    """BODYSTRUCTURE of a compat32 Message (message/rfc822 parts are leaves, with the inner structure)."""
+    rfc822 = part.get_content_type() == "message/rfc822"
+    if part.is_multipart() and not rfc822:
+        children = "".join(_bodystructure(child) for child in part.get_payload())
+        params = [(k, v) for k, v in part.get_params()[1:]]
+        return f"({children} {_quote(part.get_content_subtype().upper())} {_param_list(params)} NIL NIL NIL)"
+    main, sub = part.get_content_maintype().upper(), part.get_content_subtype().upper()
+    params = [(k, v) for k, v in (part.get_params() or [])[1:]]
+    payload = _raw_payload(part)
+    encoding = _quote((part.get("Content-Transfer-Encoding") or "7bit").upper())
+    disposition = "NIL"
+    if part.get_content_disposition():
+        filename = part.get_param("filename", header="content-disposition")
+        disposition = f"({_quote(part.get_content_disposition().upper())} {_param_list([('filename', filename)] if filename else [])})"
+    fields = f"{_quote(main)} {_quote(sub)} {_param_list(params)} NIL NIL {encoding} {len(payload)}"
+    if rfc822:
+        # Envelope (not used by the client), inner body structure, lines
+        lines = payload.count(b"\n")
+        return f"({fields} NIL {_bodystructure(part.get_payload(0))} {lines} NIL {disposition} NIL NIL)"
+    if main == "TEXT":
+        lines = payload.count(b"\n")
+        return f"({fields} {lines} NIL {disposition} NIL NIL)"
+    return f"({fields} NIL {disposition} NIL NIL)"
+
+
+def _section(message, section: str):
+    """The part at an IMAP section number."""
+    part = message
+    for number in section.split("."):
+        if part.is_multipart() and part.get_content_type() != "message/rfc822":
+            part = part.get_payload()[int(number) - 1]
+        elif number != "1":
+            raise KeyError(section)
+    return part
+
+
+def _parse_set(spec: str, maximum: int) -> set:
+    numbers = set()
+    for item in spec.split(","):
+        lo, _, hi = item.partition(":")
+        lo = maximum if lo == "*" else int(lo)
+        hi = lo if not hi else (maximum if hi == "*" else int(hi))
+        numbers.update(range(min(lo, hi), max(lo, hi) + 1))
+    return numbers
+
+
+class FakeIMAP:
+    """One mailbox of raw RFC 822 messages, with UIDs assigned in order starting at `first_uid`."""
+
+    def __init__(self, messages: list[bytes], *, latency: float = 0.02, bandwidth: float = 10e6,
+                 uidvalidity: int = 1, first_uid: int = 1):
+        self.latency = latency  # seconds per command round trip
+        self.bandwidth = bandwidth  # bytes per second
+        self.uidvalidity = uidvalidity
+        self.raw = list(messages)
+        self.uids = list(range(first_uid, first_uid + len(self.raw)))
+        self.commands = 0
+        self.bytes_sent = 0
+        self._parsed = {}
+        self._structures = {}
+
+    def append(self, raw: bytes):
+        self.raw.append(raw)
+        self.uids.append((self.uids[-1] if self.uids else 0) + 1)
+
+    def _message(self, i):
+        if i not in self._parsed:
+            self._parsed[i] = email.message_from_bytes(self.raw[i])
+        return self._parsed[i]
+
+    def _structure(self, i) -> str:
+        if i not in self._structures:
+            self._structures[i] = _bodystructure(self._message(i))
+        return self._structures[i]
+
+    def index(self):
+        """Parse every message up front, as a real server has, so timings only show the client side."""
+        for i in range(len(self.raw)):
+            self._structure(i)
+
+    def _round_trip(self, data):
+        size = sum(len(x) for item in data if item for x in (item if isinstance(item, tuple) else (item,)))
+        self.commands += 1
+        self.bytes_sent += size
+        time.sleep(self.latency + size / self.bandwidth)
+        return data
+
+    # --- imaplib.IMAP4 subset ---
+
+    def login(self, user, password):
+        return "OK", [b"LOGIN completed"]
+
+    def logout(self):
+        return "BYE", [b"Logging out"]
+
+    def close(self):
+        return "OK", [b"CLOSE completed"]
+
+    def select(self, mailbox="INBOX", readonly=False):
+        self._round_trip([])
+        return "OK", [str(len(self.raw)).encode()]
+
+    def response(self, code):
+        if code.upper() == "UIDVALIDITY":
+            return code, [str(self.uidvalidity).encode()]
+        return code, [None]
+
+    def search(self, charset, *criteria):
+        indexes = self._search(criteria)
+        return "OK", self._round_trip([" ".join(str(i + 1) for i in indexes).encode()])
+
+    def fetch(self, message_set, items):
+        indexes = sorted(n - 1 for n in _parse_set(message_set.decode() if isinstance(message_set, bytes) else message_set, len(self.raw)))
+        return "OK", self._round_trip(self._fetch(indexes, items))
+
+    def uid(self, command, *args):
+        command = command.upper()
+        if command == "SEARCH":
+            indexes = self._search(args)
+            return "OK", self._round_trip([" ".join(str(self.uids[i]) for i in indexes).encode()])
+        if command == "FETCH":
+            message_set, items = args
+            wanted = _parse_set(message_set, self.uids[-1] if self.uids else 0)
+            indexes = [i for i, uid in enumerate(self.uids) if uid in wanted]
+            return "OK", self._round_trip(self._fetch(indexes, items, with_uid=True))
+        raise NotImplementedError(command)
+
+    # --- Commands ---
+
+    def _search(self, criteria) -> list[int]:
+        tokens = [c.decode() if isinstance(c, bytes) else c for c in criteria if c is not None]
+        tokens = " ".join(tokens).replace("(", " ").replace(")", " ").split()
+        indexes = list(range(len(self.raw)))
+        i = 0
+        while i < len(tokens):
+            key = tokens[i].upper()
+            if key == "ALL":
+                i += 1
+            elif key == "UID":
+                wanted = _parse_set(tokens[i + 1], self.uids[-1] if self.uids else 0)
+                indexes = [j for j in indexes if self.uids[j] in wanted]
+                i += 2
+            elif key == "SINCE":
+                since = datetime.strptime(tokens[i + 1], "%d-%b-%Y").date()
+                indexes = [j for j in indexes if email.utils.parsedate_to_datetime(self._message(j)["Date"]).date() >= since]
+                i += 2
+            else:
+                raise NotImplementedError(f"SEARCH {key}")
+        return indexes
+
+    def _fetch(self, indexes, items: str, with_uid: bool = False) -> list:
+        wanted = re.findall(r"BODY(?:\.PEEK)?\[[^\]]*\](?:<\d+\.\d+>)?|[A-Z0-9.]+", items.upper().strip("()"))
+        if with_uid and "UID" not in wanted:
+            wanted.insert(0, "UID")
+        data = []
+        for i in indexes:
+            text, literals = f"{i + 1} (", []
+            for item in wanted:
+                if item == "UID":
+                    text += f"UID {self.uids[i]} "
+                elif item == "RFC822.SIZE":
+                    text += f"RFC822.SIZE {len(self.raw[i])} "
+                elif item == "BODYSTRUCTURE":
+                    text += f"BODYSTRUCTURE {self._structure(i)} "
+                elif item in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+                    literals.append((text + f"{item.replace('.PEEK', '')} {{{len(self.raw[i])}}}", self.raw[i]))
+                    text = " "
+                elif item.startswith("BODY"):
+                    value, key = self._body(i, item)
+                    literals.append((text + f"{key} {{{len(value)}}}", value))
+                    text = " "
+            data.extend((prefix.encode(), value) for prefix, value in literals)
+            data.append((text.rstrip() + ")").encode())
+        return data
+
+    def _body(self, i, item: str):
+        m = re.match(r"BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", item)
+        spec, start, length = m.group(1), m.group(2), m.group(3)
+        raw = self.raw[i]
+        head, _, body = raw.partition(b"\r\n\r\n") if b"\r\n\r\n" in raw else raw.partition(b"\n\n")
+        if spec.startswith("HEADER.FIELDS"):
+            names = {n.upper() for n in re.findall(r"[\w-]+", spec[len("HEADER.FIELDS"):])}
+            lines = re.split(rb"\r?\n(?![ \t])", head)
+            value = b"".join(line + b"\r\n" for line in lines if line.split(b":", 1)[0].strip().upper().decode() in names) + b"\r\n"
+        elif spec == "HEADER":
+            value = head + b"\r\n\r\n"
+        elif spec == "TEXT":
+            value = body
+        else:
+            value = _raw_payload(_section(self._message(i), spec))
+        key = f"BODY[{spec}]"
+        if start is not None:
+            value = value[int(start):int(start) + int(length)]
+            key += f"<{start}>"
+        return value, key
+
+
+# --- Synthetic mailboxes ---
+
+WORDS = ("report dashboard meeting invoice budget review deadline security update customer release "
+         "draft slides figures approval travel quarter access server alert team plan schedule").split()
+SENDERS = ["alice@example.com", "bob@example.com", "carol@example.org", "newsletter@shop.example", "it-alerts@example.com"]
+
+
+def _sentence(rng) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + "."
+
+
+def synthetic_mailbox(count: int, *, seed: int = 0, reply_share: float = 0.4, html_share: float = 0.5,
+                      attachment_share: float = 0.2, attachment_kb: int = 200, start: datetime | None = None) -> list[bytes]:
+    """
+    `count` raw messages: plain or multipart/alternative bodies, some with a
+    binary attachment, and replies (with quoted history and a signature)
+    threaded through In-Reply-To / References.
+    """
+    rng = random.Random(seed)
+    start = start or datetime(2025, 7, 1, 8, 0)
+    messages, sent = [], []  # sent: (message_id, references, subject, body)
+    for n in range(count):
+        msg = EmailMessage()
+        sender = rng.choice(SENDERS)
+        msg["From"] = sender
+        msg["To"] = "me@example.com"
+        msg["Date"] = format_datetime((start + timedelta(minutes=7 * n)).astimezone())
+        msg["Message-ID"] = make_msgid(idstring=str(n), domain="example.com")
+        body = "\n\n".join(_sentence(rng) for _ in range(rng.randint(2, 6)))
+        if sent and rng.random() < reply_share:
+            parent_id, parent_refs, subject, parent_body = rng.choice(sent[-50:])
+            msg["Subject"] = subject if subject.startswith("Re: ") else f"Re: {subject}"
+            msg["In-Reply-To"] = parent_id
+            references = f"{parent_refs} {parent_id}".strip()
+            msg["References"] = references
+            quoted = "\n".join(f"> {line}" if line else ">" for line in parent_body.splitlines())
+            body = f"{body}\n\nBest,\n{sender.split('@')[0].title()}\n-- \nSent from my phone\n\nOn {msg['Date']}, someone wrote:\n{quoted}"
+        else:
+            msg["Subject"] = f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {n}"
+            references = ""
+        msg.set_content(body)
+        if rng.random() < html_share:
+            msg.add_alternative(f"<html><body><p>{body.replace(chr(10), '<br>')}</p></body></html>", subtype="html")
+        if rng.random() < attachment_share:
+            data = rng.randbytes(attachment_kb * 1024)
+            msg.add_attachment(data, maintype="application", subtype="pdf", filename=f"document-{n}.pdf")
+        sent.append((msg["Message-ID"], references, msg["Subject"], body))
+        messages.append(msg.as_bytes())
+    return messages
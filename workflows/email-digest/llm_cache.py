@@ -0,0 +1,170 @@
+"""
+Persistent LLM response cache.
+
+`LLMCache` is a LangChain cache backed by SQLite. Pass it as `cache=` to a
+chat model and identical calls (same model, parameters, bound tools/
+structured-output schema and messages) are answered from disk, across runs:
+retried runs, regenerated reports and repeated newsletters cost nothing.
+
+Entries expire after LLM_CACHE_MAX_AGE seconds; beyond LLM_CACHE_MAX_ENTRIES
+entries or LLM_CACHE_MAX_MB megabytes the least recently used ones are
+evicted. LLM_CACHE=off disables it, and `with llm_cache.bypass():` skips
+lookups for a block (fresh answers are still stored).
+"""
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", str(Path(__file__).with_name("llm_cache.db")))
+ENABLED = os.getenv("LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+MAX_BYTES = int(float(os.getenv("LLM_CACHE_MAX_MB", "200")) * 1e6)
+MAX_AGE_SECONDS = float(os.getenv("LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+_hit_counter = contextvars.ContextVar("llm_cache_hits", default=None)
+
+
+@contextmanager
+def count_hits():
+    """Count the cache hits of calls made in the block (also in the tasks and threads they start)."""
+    counter = [0]
+    token = _hit_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _hit_counter.reset(token)
+
+
+def cache_key(prompt: str, llm_string: str) -> str:
+    """Key of a call: the model description plus the messages with whitespace runs collapsed."""
+    normalized = " ".join(prompt.split())
+    return hashlib.sha256(f"{llm_string}\x00{normalized}".encode()).hexdigest()
+
+
+class LLMCache(BaseCache):
+    def __init__(self, path: str = CACHE_PATH, *, enabled: bool = ENABLED, max_entries: int = MAX_ENTRIES,
+                 max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE_SECONDS):
+        self.path = path
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._lock = threading.Lock()  # lookups also run on executor threads (alookup)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);
+            """)
+        return self._conn
+
+    @contextmanager
+    def bypass(self):
+        """Ignore cached answers inside the block (new answers still replace them)."""
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
+
+    # --- BaseCache ---
+
+    def lookup(self, prompt: str, llm_string: str):
+        if not self.enabled or _bypass.get():
+            return None
+        key, now = cache_key(prompt, llm_string), time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.max_age:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+            self.hits += 1
+        counter = _hit_counter.get()
+        if counter is not None:
+            counter[0] += 1
+        return loads(row[0], allowed_objects=[Generation, ChatGeneration, AIMessage])
+
+    def update(self, prompt: str, llm_string: str, return_val):
+        if not self.enabled:
+            return
+        value, now = dumps(list(return_val)), time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (cache_key(prompt, llm_string), value, len(value), now, now)
+            )
+            self._evict(conn, now)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._connection().execute("DELETE FROM responses")
+
+    # --- Eviction and stats ---
+
+    def _evict(self, conn, now: float):
+        deleted = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.max_age,)).rowcount
+        count, size = conn.execute("SELECT count(*), coalesce(sum(size), 0) FROM responses").fetchone()
+        if count > self.max_entries or size > self.max_bytes:
+            # Drop least recently used entries until both limits hold again
+            excess_bytes, oldest = size - self.max_bytes, 0
+            for (entry_size,) in conn.execute("SELECT size FROM responses ORDER BY last_used"):
+                if count - oldest <= self.max_entries and excess_bytes <= 0:
+                    break
+                oldest += 1
+                excess_bytes -= entry_size
+            deleted += conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)", (oldest,)
+            ).rowcount
+        self.evictions += deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, size = self._connection().execute(
+                "SELECT count(*), coalesce(sum(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": count,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by the workflows in this process
+llm_cache = LLMCache()
@@ -0,0 +1,150 @@
+"""
+Incremental mailbox sync.
+
+A small SQLite store remembers, per account and folder, the folder's
+UIDVALIDITY and the highest UID already fetched, so a run only fetches mail
+that arrived since the last one. If the server reports a different
+UIDVALIDITY, the old UIDs mean nothing anymore and the folder is synced
+again from the start window.
+
+The store also records which messages (by Message-ID) the digest workflow
+has processed, so a message seen again after a resync, or in another
+folder, is not classified twice.
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from imap_fetch import BATCH_SIZE, fetch_messages
+
+STATE_DB = os.getenv("MAIL_STATE_DB", str(Path(__file__).with_name("mail_state.db")))
+
+logger = logging.getLogger(__name__)
+
+
+class SyncState:
+    def __init__(self, path: str = STATE_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+        CREATE TABLE IF NOT EXISTS folders (
+            account TEXT NOT NULL,
+            folder TEXT NOT NULL,
+            uidvalidity INTEGER NOT NULL,
+            last_uid INTEGER NOT NULL,
+            synced_at REAL,
+            PRIMARY KEY (account, folder)
+        );
+        CREATE TABLE IF NOT EXISTS processed (
+            message_id TEXT PRIMARY KEY,
+            processed_at REAL NOT NULL,
+            result TEXT
+        );
+        """)
+
+    def checkpoint(self, account: str, folder: str):
+        """(uidvalidity, last_uid) of the last sync, or None."""
+        return self.conn.execute(
+            "SELECT uidvalidity, last_uid FROM folders WHERE account = ? AND folder = ?", (account, folder)
+        ).fetchone()
+
+    def save_checkpoint(self, account: str, folder: str, uidvalidity: int, last_uid: int):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO folders (account, folder, uidvalidity, last_uid, synced_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (account, folder) DO UPDATE SET "
+                "uidvalidity = excluded.uidvalidity, last_uid = excluded.last_uid, synced_at = excluded.synced_at",
+                (account, folder, uidvalidity, last_uid, time.time())
+            )
+
+    def advance(self, account: str, folder: str, uids, failed_uids=()):
+        """
+        Move the checkpoint past `uids` once they are handled, but not past the
+        first of `failed_uids`, so failed mail is fetched again by the next sync.
+        """
+        first_failed = min(failed_uids, default=None)
+        done = [uid for uid in uids if first_failed is None or uid < first_failed]
+        if not done:
+            return
+        with self.conn:
+            self.conn.execute(
+                "UPDATE folders SET last_uid = max(last_uid, ?), synced_at = ? WHERE account = ? AND folder = ?",
+                (max(done), time.time(), account, folder)
+            )
+
+    def reset(self, account: str, folder: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM folders WHERE account = ? AND folder = ?", (account, folder))
+
+    def is_processed(self, message_id: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM processed WHERE message_id = ?", (message_id,)).fetchone() is not None
+
+    def unprocessed(self, message_ids) -> list:
+        """The given Message-IDs that were not processed yet, in order."""
+        message_ids = list(message_ids)
+        seen = set()
+        for i in range(0, len(message_ids), 500):
+            chunk = message_ids[i:i + 500]
+            seen.update(row[0] for row in self.conn.execute(
+                f"SELECT message_id FROM processed WHERE message_id IN ({', '.join('?' * len(chunk))})", chunk
+            ))
+        return [m for m in message_ids if m not in seen]
+
+    def mark_processed(self, message_id: str, result: str | None = None):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO processed (message_id, processed_at, result) VALUES (?, ?, ?)",
+                (message_id, time.time(), result)
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def _uidvalidity(mail) -> int:
+    _, values = mail.response("UIDVALIDITY")
+    if not values or values[0] is None:
+        raise RuntimeError("Server did not report UIDVALIDITY")
+    return int(values[-1])
+
+
+def sync_mailbox(mail, state: SyncState, account: str, folder: str = "INBOX",
+                 since: datetime.date | None = None, batch_size: int = BATCH_SIZE, advance: bool = True):
+    """
+    Yield the messages of `folder` that arrived since the last sync, as
+    FetchedMessages in UID order. The first sync (or one after a UIDVALIDITY
+    change) starts at `since`, or takes the whole folder if it is None.
+
+    With `advance` the checkpoint moves forward after every fetched batch.
+    Pass advance=False to move it with `state.advance()` only once the
+    messages are handled, so mail whose processing failed (or was cut short)
+    is fetched again next time.
+    """
+    mail.select(folder, readonly=True)
+    uidvalidity = _uidvalidity(mail)
+    checkpoint = state.checkpoint(account, folder)
+    if checkpoint is not None and checkpoint[0] != uidvalidity:
+        logger.warning("UIDVALIDITY of %s/%s changed (%s -> %s), resyncing", account, folder, checkpoint[0], uidvalidity)
+        state.reset(account, folder)
+        checkpoint = None
+
+    if checkpoint is not None:
+        last_uid = checkpoint[1]
+        _, data = mail.uid("SEARCH", None, "UID", f"{last_uid + 1}:*")
+    else:
+        last_uid = 0
+        criteria = ("SINCE", since.strftime("%d-%b-%Y")) if since else ("ALL",)
+        _, data = mail.uid("SEARCH", None, *criteria)
+    # "n:*" always matches the newest message, even if its UID is below n
+    uids = sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
+    if checkpoint is None and uids:
+        # Record the UIDVALIDITY now; the next sync continues from the window's first UID
+        state.save_checkpoint(account, folder, uidvalidity, uids[0] - 1)
+
+    for i in range(0, len(uids), batch_size):
+        batch = uids[i:i + batch_size]
+        yield from fetch_messages(mail, batch, batch_size)
+        if advance:
+            state.save_checkpoint(account, folder, uidvalidity, batch[-1])
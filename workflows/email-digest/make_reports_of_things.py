@@ -19,12 +19,23 @@ logging.basicConfig(
 )
 
 # --- 2. LLM Setup ---
-from langchain_anthropic import ChatAnthropic
-
-llm = ChatAnthropic(
-    model="claude-3-5-sonnet-latest",
-    anthropic_api_key=os.getenv("ANTHROPIC_API_KEY")
-)
+# LLM_BACKEND=fake: offline stand-in without an API key (fake_llm.py)
+if os.getenv("LLM_BACKEND") == "fake":
+    from fake_llm import FakeChatModel
+    llm = FakeChatModel()
+else:
+    from langchain_anthropic import ChatAnthropic
+    from llm_cache import llm_cache
+
+    llm = ChatAnthropic(
+        model="claude-3-5-sonnet-latest",
+        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
+        max_retries=0,  # retries are left to the scheduler, which honours retry-after
+        cache=llm_cache,  # identical calls are answered from disk (llm_cache.py, LLM_CACHE=off to disable)
+    )
+
+# All LLM calls go through one scheduler with RPM/TPM budgets (rate_limit.py)
+from rate_limit import scheduler
 
 # --- 3. Pydantic Schema ---
 from pydantic import BaseModel, Field
@@ -57,16 +68,16 @@ class WorkerState(TypedDict):
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.constants import Send
 
-def orchestrator(state: State):
-    report_sections = planner.invoke([
+async def orchestrator(state: State):
+    report_sections = await scheduler.ainvoke(planner, [
         SystemMessage(content="Generate a plan for the report."),
         HumanMessage(content=f"Here is the report topic: {state['topic']}"),
     ])
     logging.info("Planning report: %s", report_sections.sections)
     return {"sections": report_sections.sections}
 
-def llm_call(state: WorkerState):
-    section = llm.invoke([
+async def llm_call(state: WorkerState):
+    section = await scheduler.ainvoke(llm, [
         SystemMessage(content="Write a report section."),
         HumanMessage(
             content=f"Section name: {state['section'].name}\nDescription: {state['section'].description}"
@@ -118,8 +129,10 @@ builder.add_edge("synthesizer", END)
 workflow = builder.compile()
 
 # --- 7. Run and Save Output ---
+import asyncio
+
 topic = "if all humans jump at the exact same time, what happens?"
-state = workflow.invoke({"topic": topic})
+state = asyncio.run(workflow.ainvoke({"topic": topic}))
 
 # Save as Markdown
 output_dir = Path("workflows/email-digest/report_output")
@@ -131,3 +144,4 @@ with open(output_file, "w", encoding="utf-8") as f:
     f.write(state["final_report"])
 
 print(f"Report saved to: {output_file.resolve()}")
+print(f"LLM calls: {scheduler.stats()}")
@@ -19,12 +19,23 @@ logging.basicConfig(
 )
 
 # --- 2. LLM Setup ---
-from langchain_anthropic import ChatAnthropic
-
-llm = ChatAnthropic(
-    model="claude-3-5-sonnet-latest",
-    anthropic_api_key=os.getenv("ANTHROPIC_API_KEY")
-)
+# LLM_BACKEND=fake: offline stand-in without an API key (fake_llm.py)
+if os.getenv("LLM_BACKEND") == "fake":
+    from fake_llm import FakeChatModel
+    llm = FakeChatModel()
+else:
+    from langchain_anthropic import ChatAnthropic
+    from llm_cache import llm_cache
+
+    llm = ChatAnthropic(
+        model="claude-3-5-sonnet-latest",
+        anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
+        max_retries=0,  # retries are left to the scheduler, which honours retry-after
+        cache=llm_cache,  # identical calls are answered from disk (llm_cache.py, LLM_CACHE=off to disable)
+    )
+
+# All LLM calls go through one scheduler with RPM/TPM budgets (rate_limit.py)
+from rate_limit import scheduler
 
 # --- 3. Pydantic Schema ---
 from pydantic import BaseModel, Field
@@ -63,9 +74,9 @@ class WorkerState(TypedDict):
 from langchain_core.messages import HumanMessage, SystemMessage
 from langgraph.constants import Send
 
-def spam_protection(state: State):
+async def spam_protection(state: State):
     email_body = state['topic']
-    spam_decision = spam_bot.invoke([
+    spam_decision = await scheduler.ainvoke(spam_bot, [
         SystemMessage(content="Decide whether the provided email is classified as Spam or not"),
         HumanMessage(content=f"Here is the Mail in question: {state['topic']}"),
     ])
@@ -76,16 +87,16 @@ def spam_protection(state: State):
     else:
         return {'decision': spam_decision.decision}
 
-def orchestrator(state: State):
-    report_sections = planner.invoke([
+async def orchestrator(state: State):
+    report_sections = await scheduler.ainvoke(planner, [
         SystemMessage(content="Generate a plan for the report."),
         HumanMessage(content=f"Here is the report topic: {state['topic']}"),
     ])
     logging.info("Planning report: %s", report_sections.sections)
     return {"tasks": report_sections.sections}
 
-def llm_call(state: WorkerState):
-    section = llm.invoke([
+async def llm_call(state: WorkerState):
+    section = await scheduler.ainvoke(llm, [
         SystemMessage(content="Write a report section."),
         HumanMessage(
             content=f"Task name: {state['task'].name}\nDescription: {state['task'].description}"
@@ -173,48 +184,74 @@ workflow = builder.compile()
 
 
 # --- 7. Run and Save Output ---
-topic = """Reminder to Think Before You Click!
-Dear Client,
-
-Our clients have seen a recent wave of “phishing” attempts in which scammers are impersonating Interactive Brokers. They send requests for urgent updates of client information (often tax or other key information) and include login links pointing to websites that appear legitimate but are actually fake websites.
-
-If you click those links, you may inadvertently give bad actors access to your account.
-
-The scammers continue to change their methods—sometimes sending texts, sometimes emails—but you can protect yourself by following a few simple rules:
-
-    Check the domain name in your browser to see whether it is the official website of Interactive Brokers; if not, it is likely fake.
-    When in doubt, directly access your account from the log in button on the Interactive Brokers website.
-
-
-Interactive Brokers
-Interactive Brokers (U.K.) Limited, FCA 208159. Unsubscribe
-
-Message Reference Number: 5-17535689319040473-745673, Sent Date: 2025.07.26 18:28:54 -0400
-MRN:GE3TKMZVGY4DSMZRHEYDIMBUG4ZXY3DFN5XC42DJNZSGK4TMNFXGOQDIN52G2YLJNQXGIZL4GV6DCNZVGM2TMOBZGMYTSMBUGA2DOMZNG42DKNRXGM%3D%3D%3D%3D%3D%3D:"""
-
-
-topic = """
-Hi Léon,
-
-I hope you're doing well.
-
-Could you please review the current version of the Security Dashboard and update it with the latest vulnerability data from the past two weeks? It would also be great if you could cross-check the EDR alerts to ensure they're accurately reflected in the risk scoring model.
-
-Ideally, we’d like to have this ready by Friday afternoon so we can include it in the monthly reporting cycle. Let me know if anything is unclear or if you need access to any additional data sources.
-
-Thanks in advance!
-
-Best,
-"""
-    
-state = workflow.invoke({"topic": topic})
+# New mail is fetched incrementally (mail_sync.py) and grouped into conversations
+# (threads.py), so a reply chain goes through the workflow once, not once per email.
+# Threads are digested concurrently (digest_batch.py); each report is saved as soon
+# as its run finishes. The sync checkpoint only moves once the batch is done, and not
+# past a failed or timed-out thread, so that thread is fetched and retried next run.
+import asyncio
+import datetime
+from contextlib import aclosing
+from digest_batch import MAX_CONCURRENCY, TIMEOUT_SECONDS, run_batch
+from email_fetcher import ACCOUNT, iter_messages
+from mail_sync import SyncState
+from threads import group_threads, thread_text
 
-# Save as Markdown
 output_dir = Path("workflows/email-digest/report_output")
-output_dir.mkdir(exist_ok=True)
-output_file = output_dir / (topic.replace('\n', ' ').replace(' ', '_')[:30] + '.md')
-with open(output_file, "w", encoding="utf-8") as f:
-    f.write(f"# Recovery Report\n\n## Topic: {topic}\n\n")
-    f.write(state["final_report"])
 
-print(f"Report saved to: {output_file.resolve()}")
+def save_report(thread, state):
+    # Save as Markdown, one file per thread
+    output_file = output_dir / f"{thread.key}.md"
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(f"# Recovery Report\n\n## Topic: {state['topic']}\n\n")
+        f.write(state["final_report"])
+    return output_file
+
+async def digest_mailbox(threads, sync_state, *, account=ACCOUNT, folder="inbox",
+                         max_concurrency=MAX_CONCURRENCY, timeout=TIMEOUT_SECONDS):
+    """Digest threads concurrently; returns the number of successful and failed threads."""
+    output_dir.mkdir(exist_ok=True)
+    counts = {"ok": 0, "failed": 0}
+    failed_uids = []
+    results = run_batch(
+        workflow, threads,
+        key=lambda thread: thread.key,
+        to_input=lambda thread: {"topic": thread_text(thread)},
+        max_concurrency=max_concurrency,
+        timeout=timeout,
+    )
+    # aclosing: if saving a report raises, the runs still in flight are cancelled
+    async with aclosing(results):
+        with open(output_dir / "digest_results.jsonl", "a", encoding="utf-8") as results_log:
+            async for result in results:
+                thread = result.item
+                entry = {"thread": thread.key, "subject": thread.subject, "emails": len(thread.messages),
+                         "seconds": round(result.seconds, 2)}
+                if result.ok:
+                    output_file = save_report(thread, result.output)
+                    # Emails already digested are skipped by iter_messages on later runs
+                    for message_id in thread.message_ids:
+                        sync_state.mark_processed(message_id, result.output["decision"])
+                    entry.update(status="ok", decision=result.output["decision"], report=str(output_file))
+                    print(f"Report saved to: {output_file.resolve()}")
+                else:
+                    error = f"{type(result.error).__name__}: {result.error}"
+                    logging.error("Digest of thread %s failed: %s", thread.key, error)
+                    failed_uids.extend(message.uid for message in thread.messages)
+                    entry.update(status="failed", error=error)
+                    print(f"Failed: {thread.subject} ({error})")
+                counts["ok" if result.ok else "failed"] += 1
+                results_log.write(json.dumps(entry) + "\n")
+                results_log.flush()
+    # Already digested mail below a failed thread is fetched again but skipped as processed
+    sync_state.advance(account, folder, [m.uid for t in threads for m in t.messages], failed_uids)
+    return counts
+
+if __name__ == "__main__":
+    sync_state = SyncState()
+    since = datetime.date.today() - datetime.timedelta(days=2)
+    threads = group_threads(iter_messages(since=since, state=sync_state, advance=False))
+    print(f"{sum(len(t.messages) for t in threads)} new emails in {len(threads)} threads")
+    counts = asyncio.run(digest_mailbox(threads, sync_state))
+    print(f"Digested {counts['ok']} threads, {counts['failed']} failed")
+    print(f"LLM calls: {scheduler.stats()}")
@@ -0,0 +1,160 @@
+"""
+Parallel parsing of whole raw messages, for backfills.
+
+Turning raw RFC 822 bytes into an EmailRecord (MIME parsing, header and
+charset decoding, hashing attachments) is pure Python and CPU bound.
+`parse_messages()` hands the raw messages to a process pool in chunks and
+yields the records in input order, while the caller's iterator keeps
+downloading: the next batches are fetched while earlier ones are parsed.
+
+    for record in parse_messages(fetch_raw(mail, uids)):
+        ...
+
+Sources: `fetch_raw()` for an IMAP folder (batched `UID FETCH BODY.PEEK[]`),
+`iter_mbox()` for an mbox file.
+"""
+import email
+import hashlib
+import mailbox
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import getaddresses, parsedate_to_datetime
+from itertools import islice
+
+from email_fetcher import Attachment, EmailRecord, _message_ids
+from imap_fetch import BATCH_SIZE, Part, decode_text, parse_fetch_response, text_parts, uid_set
+
+WORKERS = int(os.getenv("PARSE_WORKERS", "0")) or os.cpu_count() or 1
+CHUNK_SIZE = int(os.getenv("PARSE_CHUNK", "64"))
+
+
+# --- Parsing (runs in the worker processes) ---
+
+def _text(part) -> str:
+    data = part.get_payload(decode=True) or b""
+    try:
+        return data.decode(part.get_content_charset() or "utf-8", errors="replace")
+    except LookupError:  # unknown charset name
+        return data.decode("utf-8", errors="replace")
+
+
+def _encoded_payload(part) -> bytes:
+    """Body of a part as transmitted (still transfer-encoded), whose length IMAP reports as its size."""
+    if part.get_content_type() == "message/rfc822":
+        return part.get_payload(0).as_bytes()
+    return part.get_payload(decode=False).encode("utf-8", "surrogateescape")
+
+
+def _leaf_parts(part, section: str = "") -> list:
+    """
+    (Part, message part) for each leaf of the MIME tree, numbered like IMAP
+    sections ("1", "2.1", ...). A message/rfc822 part is a leaf, as in its
+    BODYSTRUCTURE, so a forwarded message's parts are not mixed in.
+    """
+    if part.is_multipart() and part.get_content_type() != "message/rfc822":
+        leaves = []
+        for i, child in enumerate(part.get_payload()):
+            leaves.extend(_leaf_parts(child, f"{section}.{i + 1}" if section else str(i + 1)))
+        return leaves
+    filename = part.get_filename()
+    return [(Part(
+        section=section or "1",
+        content_type=part.get_content_type(),
+        params={k.lower(): v for k, v in (part.get_params() or [])[1:]},
+        encoding=(part.get("Content-Transfer-Encoding") or "7bit").strip().lower(),
+        size=len(_encoded_payload(part)),
+        disposition=part.get_content_disposition(),
+        filename=decode_text(filename) if filename else None,
+    ), part)]
+
+
+def parse_raw(raw: bytes, uid: int = 0) -> EmailRecord:
+    """EmailRecord of a whole raw message, with the same parts and sizes the IMAP fetch path reports."""
+    msg = email.message_from_bytes(raw)
+    leaves = _leaf_parts(msg)
+    attachments = []
+    for part, message_part in leaves:
+        if part.is_attachment:
+            if part.content_type == "message/rfc822":
+                payload = _encoded_payload(message_part)
+            else:
+                payload = message_part.get_payload(decode=True) or b""
+            attachments.append(Attachment(
+                part.filename or "", part.content_type, part.size, part.section, hashlib.sha256(payload).hexdigest(),
+            ))
+    by_section = {part.section: message_part for part, message_part in leaves}
+    body = "\n\n".join(_text(by_section[part.section]) for part in text_parts([part for part, _ in leaves]))
+    try:
+        date = parsedate_to_datetime(msg["Date"]) if msg["Date"] else None
+    except (TypeError, ValueError):
+        date = None
+    in_reply_to = _message_ids(msg["In-Reply-To"])
+    return EmailRecord(
+        uid=uid,
+        message_id=(_message_ids(msg["Message-ID"]) or [None])[0],
+        subject=decode_text(msg["Subject"] or ""),
+        sender=decode_text(msg["From"] or ""),
+        to=[addr for _, addr in getaddresses([decode_text(v) for v in msg.get_all("To", []) + msg.get_all("Cc", [])])],
+        date=date,
+        in_reply_to=in_reply_to[0] if in_reply_to else None,
+        references=_message_ids(msg["References"]),
+        body=body,
+        attachments=attachments,
+        size=len(raw),
+    )
+
+
+def _parse_chunk(chunk: list) -> list[EmailRecord]:
+    return [parse_raw(raw, uid) for uid, raw in chunk]
+
+
+# --- Pipeline ---
+
+def parse_messages(raw_messages, *, workers: int = WORKERS, chunk_size: int = CHUNK_SIZE, max_pending: int | None = None):
+    """
+    Yield an EmailRecord for each (uid, raw bytes) pair, in input order.
+
+    Chunks of `chunk_size` messages are parsed in a pool of `workers`
+    processes; at most `max_pending` chunks (default 2 per worker) are in
+    flight, so memory stays bounded however long the input is. With
+    workers=1 messages are parsed in this process.
+    """
+    raw_messages = iter(raw_messages)
+    if workers <= 1:
+        for uid, raw in raw_messages:
+            yield parse_raw(raw, uid)
+        return
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(workers) as pool:
+        pending = deque()
+        while chunk := list(islice(raw_messages, chunk_size)):
+            pending.append(pool.submit(_parse_chunk, chunk))
+            while len(pending) >= max_pending or (pending and pending[0].done()):
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+# --- Sources of raw messages ---
+
+def fetch_raw(mail, uids, batch_size: int = BATCH_SIZE):
+    """(uid, raw bytes) for each UID in the selected mailbox, in batches of `batch_size` per FETCH."""
+    uids = iter(sorted(int(u) for u in uids))
+    while batch := list(islice(uids, batch_size)):
+        status, data = mail.uid("FETCH", uid_set(batch), "(UID BODY.PEEK[])")
+        if status != "OK":
+            raise RuntimeError(f"IMAP FETCH failed: {data}")
+        messages = {int(m["UID"]): m["BODY[]"] for m in parse_fetch_response(data)}
+        for uid in sorted(messages):
+            yield uid, messages[uid]
+
+
+def iter_mbox(path: str):
+    """(index, raw bytes) for each message of an mbox file, starting at 1."""
+    box = mailbox.mbox(path, create=False)
+    try:
+        for i, key in enumerate(box.iterkeys(), start=1):
+            yield i, box.get_bytes(key)
+    finally:
+        box.close()
@@ -0,0 +1,163 @@
+"""
+Shared rate-limit-aware scheduler for LLM calls.
+
+Every call goes through `scheduler.ainvoke(model, messages)`, which waits
+for room in two token buckets, requests per minute and tokens per minute,
+and for a free concurrency slot before sending. When the provider still
+answers 429/529 (or a transient 5xx), the call is retried after the
+server's retry-after, or after an exponential backoff with full jitter.
+
+The token cost of a call is estimated up front (prompt characters / 4 plus
+the expected output) and corrected with the actual usage when the response
+reports it; calls answered from the response cache (llm_cache.py) are
+refunded in full. Budgets come from LLM_RPM / LLM_TPM / LLM_MAX_CONCURRENCY.
+"""
+import asyncio
+import logging
+import os
+import random
+import time
+
+from llm_cache import count_hits
+
+RPM = float(os.getenv("LLM_RPM", "50"))
+TPM = float(os.getenv("LLM_TPM", "40000"))
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+OUTPUT_TOKENS = int(os.getenv("LLM_OUTPUT_TOKENS", "1024"))  # reserved per call until usage is known
+RETRY_STATUS = {429, 500, 502, 503, 504, 529}
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """`rate` units per minute, bursting up to `capacity` (a minute's worth by default)."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate / 60
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock, self._loop = None, None
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1):
+        """Wait until `amount` units are available and take them (callers are served in order)."""
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # asyncio locks belong to one event loop
+            self._lock, self._loop = asyncio.Lock(), loop
+        async with self._lock:
+            self._refill()
+            while self.tokens < amount:
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= amount
+
+    def adjust(self, amount: float):
+        """Give back (positive) or take (negative) units after the fact; may go below zero."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def pause(self, seconds: float):
+        """Empty the bucket so the next unit is available in `seconds` (after a 429)."""
+        self._refill()
+        self.tokens = min(self.tokens, 1 - seconds * self.rate)
+
+
+def _status(exc) -> int | None:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return int(status) if status else None
+
+
+def retry_after(exc) -> float | None:
+    """Seconds the server asked us to wait, from a retry-after header or attribute."""
+    value = getattr(exc, "retry_after", None)
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if value is None and headers is not None:
+        value = headers.get("retry-after")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(exc) -> bool:
+    return _status(exc) in RETRY_STATUS or isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def estimate_tokens(messages) -> int:
+    text = messages if isinstance(messages, str) else " ".join(str(getattr(m, "content", m)) for m in messages)
+    return len(text) // 4 + 1
+
+
+class RateLimiter:
+    def __init__(self, rpm: float = RPM, tpm: float = TPM, max_concurrency: int = MAX_CONCURRENCY, *,
+                 max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 60.0,
+                 output_tokens: int = OUTPUT_TOKENS):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.output_tokens = output_tokens
+        self.calls = 0
+        self.retries = 0
+        self.cached = 0
+        self._semaphore, self._loop = None, None
+
+    def backoff(self, attempt: int, exc=None) -> float:
+        """Delay before retry `attempt` (1-based): the server's retry-after, else full-jitter exponential."""
+        server = retry_after(exc) if exc is not None else None
+        if server is not None:
+            return server + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    async def ainvoke(self, model, messages, **kwargs):
+        """`await model.ainvoke(messages)` within the budgets, retrying rate limits and transient errors."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore, self._loop = asyncio.Semaphore(self.max_concurrency), loop
+        estimate = estimate_tokens(messages) + self.output_tokens
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire()
+            await self.tokens.acquire(estimate)
+            try:
+                async with self._semaphore:
+                    self.calls += 1
+                    with count_hits() as cache_hits:
+                        response = await model.ainvoke(messages, **kwargs)
+            except Exception as exc:
+                # A failed call used no tokens; the retry takes its estimate again
+                self.tokens.adjust(estimate)
+                if attempt == self.max_retries or not is_retryable(exc):
+                    raise
+                delay = self.backoff(attempt + 1, exc)
+                self.retries += 1
+                logger.warning("LLM call failed (%s), retry %d in %.1fs", type(exc).__name__, attempt + 1, delay)
+                if _status(exc) == 429:
+                    # Everyone waits, not just this call: the retry waits in requests.acquire()
+                    self.requests.pause(delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+            usage = getattr(response, "usage_metadata", None)
+            if cache_hits[0]:
+                # Nothing was sent to the provider
+                self.cached += 1
+                self.requests.adjust(1)
+                self.tokens.adjust(estimate)
+            elif usage and usage.get("total_tokens"):
+                self.tokens.adjust(estimate - usage["total_tokens"])
+            return response
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "retries": self.retries, "cached": self.cached}
+
+
+# Shared by all workflows in this process
+scheduler = RateLimiter()
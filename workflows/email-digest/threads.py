@@ -0,0 +1,113 @@
+"""
+Group emails into conversations, so a reply chain goes through the digest
+workflow once instead of once per message.
+
+Messages are linked through Message-ID / In-Reply-To / References; mail
+without any of those falls back to its normalized subject. Each thread gets
+a stable key derived from its root Message-ID (the first entry of
+References, which every later reply repeats), so new replies in a later
+run map to the same key. `thread_text` builds the workflow input from the
+messages with quoted history and signatures stripped.
+"""
+import hashlib
+import re
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+_SUBJECT_PREFIX = re.compile(r"^\s*((re|fw|fwd|aw|wg|sv)\s*(\[\d+\])?\s*:\s*)+", re.IGNORECASE)
+# "On Mon, 1 Jul 2025 at 10:00, Alice <alice@example.com> wrote:", possibly wrapped over two lines
+_ATTRIBUTION = re.compile(r"^On\b.{0,200}\bwrote:\s*$", re.IGNORECASE | re.DOTALL)
+_FORWARD_MARKERS = ("-----Original Message-----", "________________________________")
+_EPOCH = datetime.min.replace(tzinfo=timezone.utc)
+
+
+class Thread(NamedTuple):
+    key: str
+    subject: str
+    messages: list  # EmailRecords, oldest first
+
+    @property
+    def message_ids(self) -> list[str]:
+        return [m.message_id for m in self.messages if m.message_id]
+
+
+def normalize_subject(subject: str) -> str:
+    """Subject without Re:/Fwd: prefixes, case and whitespace, for matching."""
+    return " ".join(_SUBJECT_PREFIX.sub("", subject or "").casefold().split())
+
+
+def strip_quoted(body: str) -> str:
+    """
+    The new text of a reply: drops quoted lines ("> ..."), the attribution
+    line before them, forwarded/original message blocks and the signature
+    (everything after a "-- " line).
+    """
+    lines = body.replace("\r\n", "\n").split("\n")
+    kept = []
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if line.rstrip("\n") in ("-- ", "--") or stripped in _FORWARD_MARKERS:
+            break
+        if stripped.startswith(">"):
+            continue
+        if _ATTRIBUTION.match(stripped) or (
+            stripped.startswith("On ") and i + 1 < len(lines) and _ATTRIBUTION.match(f"{stripped} {lines[i + 1].strip()}")
+        ):
+            break
+        kept.append(line)
+    return "\n".join(kept).strip()
+
+
+def _thread_date(record):
+    return record.date if record.date and record.date.tzinfo else (record.date or _EPOCH).replace(tzinfo=timezone.utc)
+
+
+def group_threads(records) -> list[Thread]:
+    """Threads of the given EmailRecords, ordered by their latest message."""
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(a, b):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[rb] = ra
+
+    records = list(records)
+    roots = {}  # record index -> root Message-ID candidate
+    for i, record in enumerate(records):
+        ids = [*record.references, record.in_reply_to, record.message_id]
+        ids = [m for m in ids if m]
+        node = ids[0] if ids else f"subject:{normalize_subject(record.subject)}"
+        for other in ids[1:]:
+            union(node, other)
+        find(node)
+        roots[i] = node
+
+    groups = {}
+    for i, record in enumerate(records):
+        groups.setdefault(find(roots[i]), []).append(record)
+
+    threads = []
+    for members in groups.values():
+        members.sort(key=lambda r: (_thread_date(r), r.uid))
+        # The root is the oldest reference any member knows about
+        root = next((m.references[0] for m in members if m.references), None) or members[0].message_id \
+            or f"subject:{normalize_subject(members[0].subject)}"
+        key = hashlib.sha1(root.encode()).hexdigest()[:16]
+        threads.append(Thread(key, _SUBJECT_PREFIX.sub("", members[0].subject).strip(), members))
+    threads.sort(key=lambda t: (_thread_date(t.messages[-1]), t.key))
+    return threads
+
+
+def thread_text(thread: Thread) -> str:
+    """The conversation as one text: subject, then each message's new content, oldest first."""
+    parts = [f"Subject: {thread.subject}"]
+    for record in thread.messages:
+        date = f" on {record.date:%Y-%m-%d %H:%M}" if record.date else ""
+        parts.append(f"From {record.sender}{date}:\n{strip_quoted(record.body)}")
+    return "\n\n".join(parts)